@@ -0,0 +1,281 @@
+"""
+Prebuilt metadata catalog of the benchmark cases.
+
+Selecting cases used to mean an os.listdir per category and one metadata.json
+read per case. benchmark/catalog.json holds, for every case, what runners and
+evaluators select and score on:
+
+  {"case_id": "service/1", "category", "case", "namespace", "query",
+   "fault_taxonomy", "fault_object", "root_cause",
+   "expert_paths": {"path1": [...], ...}, "expert_path_lengths": [7, 5],
+   "snapshot_bytes": {"tool_cache", "logs", "metrics", "alerts", "k8s_states", "total"},
+   "metadata_sha1": "<sha1 of metadata.json>"}
+
+load_catalog reads that one file and hashes every metadata.json (a raw read,
+no JSON parsing; repeated loads in a process only stat the files). A case whose
+metadata.json changed since the catalog was written, or that is not in it yet,
+is re-read from disk; removed cases are dropped. The ground truth therefore
+always matches metadata.json. The hashes do not depend on the checkout, so a
+fresh clone uses the committed entries as they are. Loading never writes: the
+file is (re)written only by `python catalog.py --rebuild`.
+Catalog.filter and Catalog.sample select cases without touching the case
+directories:
+
+    load_catalog().filter(root_cause="oom_killed").case_ids()
+    load_catalog().sample(40, by="category", seed=1)
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+
+# Snapshot files whose sizes are recorded, by catalog key
+SNAPSHOT_FILES = {
+    "tool_cache": "tool_cache.json",
+    "logs": os.path.join("raw_data", "logs.json"),
+    "metrics": os.path.join("raw_data", "metrics.csv"),
+    "alerts": os.path.join("raw_data", "alert.json"),
+    "k8s_states": os.path.join("raw_data", "k8s_states.json"),
+}
+
+
+def _case_sort_key(case_id: str):
+    category, _, case = case_id.partition("/")
+    return category, int(case) if case.isdigit() else float("inf"), case
+
+
+def _scan_case_ids(benchmark_root: str) -> List[str]:
+    case_ids = []
+    for category in os.listdir(benchmark_root):
+        category_path = os.path.join(benchmark_root, category)
+        if not os.path.isdir(category_path):
+            continue
+        for case in os.listdir(category_path):
+            if os.path.isfile(os.path.join(category_path, case, "metadata.json")):
+                case_ids.append(f"{category}/{case}")
+    return sorted(case_ids, key=_case_sort_key)
+
+
+def _metadata_sha1(benchmark_root: str, case_id: str) -> str:
+    path = os.path.join(benchmark_root, *case_id.split("/"), "metadata.json")
+    stat = os.stat(path)
+    return _file_sha1(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _file_sha1(path: str, mtime_ns: int, size: int) -> str:
+    # mtime/size only key the in-process cache; the catalog stores the content hash
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def catalog_entry(benchmark_root: str, case_id: str) -> Dict[str, Any]:
+    """Catalog record of one case, read from its metadata.json and file sizes."""
+    case_path = os.path.join(benchmark_root, *case_id.split("/"))
+    metadata_sha1 = _metadata_sha1(benchmark_root, case_id)
+    with open(os.path.join(case_path, "metadata.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    result = metadata.get("result", {})
+    expert_paths = metadata.get("process", {})
+    sizes = {}
+    for key, name in SNAPSHOT_FILES.items():
+        path = os.path.join(case_path, name)
+        sizes[key] = os.path.getsize(path) if os.path.exists(path) else 0
+    sizes["total"] = sum(sizes.values())
+    category, _, case = case_id.partition("/")
+    return {
+        "case_id": case_id,
+        "category": category,
+        "case": case,
+        "namespace": metadata.get("namespace", ""),
+        "query": metadata.get("query", ""),
+        "fault_taxonomy": result.get("fault_taxonomy", ""),
+        "fault_object": result.get("fault_object", ""),
+        "root_cause": result.get("root_cause", ""),
+        "expert_paths": expert_paths,
+        "expert_path_lengths": [len(steps) for steps in expert_paths.values()],
+        "snapshot_bytes": sizes,
+        "metadata_sha1": metadata_sha1,
+    }
+
+
+def build_catalog(benchmark_root: str = "benchmark", write: bool = False) -> "Catalog":
+    catalog = Catalog([catalog_entry(benchmark_root, case_id) for case_id in _scan_case_ids(benchmark_root)])
+    if write:
+        catalog.write(os.path.join(benchmark_root, CATALOG_FILE))
+    return catalog
+
+
+@functools.lru_cache(maxsize=8)
+def _read_catalog(path: str, mtime_ns: int, size: int) -> Optional[List[Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("cases") if data.get("version") == CATALOG_VERSION else None
+
+
+def load_catalog(benchmark_root: str = "benchmark") -> "Catalog":
+    """
+    The catalog of `benchmark_root`, with every case whose metadata.json is missing from
+    catalog.json or changed since it was written re-read from disk. Never writes.
+    """
+    path = os.path.join(benchmark_root, CATALOG_FILE)
+    stored: Dict[str, Dict[str, Any]] = {}
+    try:
+        stat = os.stat(path)
+        stored = {entry["case_id"]: entry for entry in _read_catalog(path, stat.st_mtime_ns, stat.st_size) or ()}
+    except (FileNotFoundError, ValueError):
+        pass
+    entries = []
+    for case_id in _scan_case_ids(benchmark_root):
+        entry = stored.get(case_id)
+        if entry is None or entry.get("metadata_sha1") != _metadata_sha1(benchmark_root, case_id):
+            entry = catalog_entry(benchmark_root, case_id)
+        entries.append(entry)
+    return Catalog(entries)
+
+
+class Catalog:
+    """An ordered selection of catalog entries; filter and sample return new Catalogs."""
+
+    def __init__(self, entries: Iterable[Dict[str, Any]]):
+        self.entries = list(entries)
+        self._by_id = {entry["case_id"]: entry for entry in self.entries}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.entries)
+
+    def __contains__(self, case_id: str) -> bool:
+        return case_id in self._by_id
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(case_id)
+
+    def case_ids(self) -> List[str]:
+        return [entry["case_id"] for entry in self.entries]
+
+    def paths(self, benchmark_root: str = "benchmark") -> List[str]:
+        return [os.path.join(benchmark_root, entry["category"], entry["case"]) for entry in self.entries]
+
+    def filter(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None, **fields) -> "Catalog":
+        """
+        Entries matching every field condition (and `predicate`, when given). A condition is a
+        value (strings compare case-insensitively), a list/tuple/set of accepted values, or a
+        callable on the field value, e.g. filter(category="performance", root_cause=["oom_killed",
+        "cpu_stress"], snapshot_bytes=lambda s: s["logs"] > 0).
+        """
+        known = self.entries[0].keys() if self.entries else fields.keys()
+        unknown = [name for name in fields if name not in known]
+        if unknown:
+            raise ValueError(f"Unknown catalog field(s): {', '.join(unknown)}")
+
+        def matches(condition, value) -> bool:
+            if callable(condition):
+                return bool(condition(value))
+            if isinstance(condition, (list, tuple, set, frozenset)):
+                return any(matches(c, value) for c in condition)
+            if isinstance(condition, str) and isinstance(value, str):
+                return condition.lower() == value.lower()
+            return condition == value
+
+        return Catalog(entry for entry in self.entries
+                       if all(matches(condition, entry[name]) for name, condition in fields.items())
+                       and (predicate is None or predicate(entry)))
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        counts: Dict[Any, int] = {}
+        for entry in self.entries:
+            counts[entry[field]] = counts.get(entry[field], 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))))
+
+    def sample(self, n: Optional[int] = None, by: str = "category", per_stratum: Optional[int] = None,
+               seed: Optional[int] = None) -> "Catalog":
+        """
+        Stratified random sample over the values of `by`. With `n`, strata get seats in proportion
+        to their size (largest remainder, at least one each while n allows); with `per_stratum`,
+        every stratum gets that many. A stratum smaller than its share is taken whole.
+        """
+        if (n is None) == (per_stratum is None):
+            raise ValueError("Give exactly one of n and per_stratum")
+        rng = random.Random(seed)
+        strata: Dict[Any, List[Dict[str, Any]]] = {}
+        for entry in self.entries:
+            strata.setdefault(entry[by], []).append(entry)
+        if per_stratum is not None:
+            quotas = {key: min(per_stratum, len(group)) for key, group in strata.items()}
+        else:
+            quotas = _proportional_quotas({key: len(group) for key, group in strata.items()}, min(n, len(self)))
+        chosen = set()
+        for key, group in strata.items():
+            chosen.update(entry["case_id"] for entry in rng.sample(group, quotas[key]))
+        return Catalog(entry for entry in self.entries if entry["case_id"] in chosen)
+
+    def write(self, path: str):
+        tmp_path = path + ".tmp"
+        # One case per line keeps the file small and its diffs readable
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f'{{"version": {CATALOG_VERSION}, "cases": [\n')
+            f.write(",\n".join(json.dumps(entry, ensure_ascii=False) for entry in self.entries))
+            f.write("\n]}\n")
+        os.replace(tmp_path, path)
+
+
+def _proportional_quotas(sizes: Dict[Any, int], n: int) -> Dict[Any, int]:
+    total = sum(sizes.values())
+    if not total or n <= 0:
+        return {key: 0 for key in sizes}
+    if n < len(sizes):
+        # Fewer seats than strata: the largest strata get one each
+        largest = sorted(sizes, key=lambda k: (-sizes[k], str(k)))[:n]
+        return {key: int(key in largest) for key in sizes}
+    # Every stratum gets one seat first, so small categories are never dropped
+    quotas = {key: 1 for key in sizes}
+    remaining = n - sum(quotas.values())
+    spare = {key: size - quotas[key] for key, size in sizes.items()}
+    spare_total = sum(spare.values())
+    if remaining and spare_total:
+        shares = {key: remaining * size / spare_total for key, size in spare.items()}
+        for key, share in shares.items():
+            quotas[key] += int(share)
+        leftover = n - sum(quotas.values())
+        for key in sorted(shares, key=lambda k: (-(shares[k] - int(shares[k])), str(k))):
+            if leftover <= 0:
+                break
+            if quotas[key] < sizes[key]:
+                quotas[key] += 1
+                leftover -= 1
+    return quotas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the benchmark case catalog")
+    parser.add_argument("--benchmark-root", default="benchmark")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild catalog.json from the metadata files")
+    parser.add_argument("--category", nargs="*")
+    parser.add_argument("--root-cause", nargs="*")
+    parser.add_argument("--taxonomy", nargs="*")
+    parser.add_argument("--sample", type=int, help="Stratified sample of this many cases")
+    parser.add_argument("--per-stratum", type=int, help="Stratified sample of this many cases per stratum")
+    parser.add_argument("--by", default="category", help="Stratification field of --sample/--per-stratum")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--counts", help="Print the number of selected cases per value of this field")
+    cli_args = parser.parse_args()
+
+    catalog = build_catalog(cli_args.benchmark_root, write=True) if cli_args.rebuild else load_catalog(cli_args.benchmark_root)
+    conditions = {"category": cli_args.category, "root_cause": cli_args.root_cause, "fault_taxonomy": cli_args.taxonomy}
+    catalog = catalog.filter(**{name: values for name, values in conditions.items() if values})
+    if cli_args.sample is not None or cli_args.per_stratum is not None:
+        catalog = catalog.sample(cli_args.sample, cli_args.by, cli_args.per_stratum, cli_args.seed)
+    if cli_args.counts:
+        for value, count in catalog.counts(cli_args.counts).items():
+            print(f"{count:>5}  {value}")
+    else:
+        print("\n".join(catalog.case_ids()))
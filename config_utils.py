@@ -8,6 +8,7 @@ class GlobalConfig(BaseModel):
     llm: dict
     langfuse: dict
     diagnosis: dict
+    metrics: dict = {}
 
 def load_config(config_path: str = "config.yaml") -> GlobalConfig:
 
@@ -1,8 +1,12 @@
 
+import argparse
 import os
 import re
 import json
+import time
 from util import extract_completed_info_to_result,batch_extract_traces,process_llm_traj_to_evaluation,count_llm_output_abnormal,calculate_redundancy_rate
+from trace_reader import load_trace_index, trace_cost
+from catalog import load_catalog
 import shutil
 from pathlib import Path
 
@@ -18,10 +22,14 @@ def calculate_in_order_match(expert_seq, llm_seq):
                 return 1.0
     return 0.0
 
-def process_eval(ground_truth_file, llm_trace_file):
+def process_eval(ground_truth_file, llm_trace_file, prefix_steps=(), expert_paths=None):
+    """`expert_paths` (the metadata "process", e.g. from the catalog) saves reading ground_truth_file."""
     try:
-        with open(ground_truth_file, 'r', encoding='utf-8') as f:
-            ground_truth_data = json.load(f)["process"]
+        if expert_paths is not None:
+            ground_truth_data = expert_paths
+        else:
+            with open(ground_truth_file, 'r', encoding='utf-8') as f:
+                ground_truth_data = json.load(f)["process"]
         with open(llm_trace_file, 'r', encoding='utf-8') as f:
             llm_data = json.load(f)
     except FileNotFoundError as e:
@@ -31,7 +39,8 @@ def process_eval(ground_truth_file, llm_trace_file):
         print(f"❌ reading file error: {e}")
         return 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0
 
-    llm_seq = llm_data.get("step", [])
+    # warm-start runs saw these observations before their first tool call
+    llm_seq = list(prefix_steps) + llm_data.get("step", [])
     llm_actions = set(llm_seq)
     llm_seq_len = len(llm_seq)
 
@@ -85,37 +94,327 @@ def process_eval(ground_truth_file, llm_trace_file):
 
     return best_recall, best_precision, best_f1, best_order_match, best_exact_match, best_any_order_match, llm_seq_len
 
+def load_run_config(b_root_dir):
+    """run_config.json written by main.py next to the case directories ({} for older runs)."""
+    try:
+        with open(os.path.join(b_root_dir, "run_config.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def evaluate_case(a_case_path, b_case_path, prices=None, prefix_steps=(), groundtruth=None):
+    """
+    Score one diagnosed case against its ground truth.
+    :param a_case_path: groundtruth case directory
+    :param b_case_path: LLM result directory of the same case
+    :param prices: optional {"input_per_1m", "output_per_1m"} used when the trace has no cost
+    :param prefix_steps: steps supplied up front by a warm start, counted before the agent's own
+    :param groundtruth: the case's catalog entry; metadata.json is read only without it
+    :return: per-case record consumed by IncrementalEvaluator
+    """
+    fault_case_name = os.path.basename(os.path.normpath(b_case_path))
+    a_metadata_path = os.path.join(a_case_path, "metadata.json")
+    b_result_path = os.path.join(b_case_path, "result.json")
+    b_trace_path = os.path.join(b_case_path, "llm_trace_evaluation.json")
+    b_trace_detail = os.path.join(b_case_path, "llm_traj.json")
+
+    record = {
+        "case": fault_case_name,
+        "status": "ok",
+        "result_exists": os.path.exists(b_result_path),
+        "missing_result": False,
+        "empty_predictions": False,
+        "invalid_format": False,
+        "error_detail": "",
+    }
+
+    if groundtruth is None:
+        if not os.path.isdir(a_case_path):
+            record["status"] = "missing_groundtruth"
+            return record
+        try:
+            if not os.path.exists(a_metadata_path):
+                record["status"] = "missing_metadata"
+                return record
+            with open(a_metadata_path, 'r', encoding='utf-8') as f:
+                a_metadata = json.load(f)
+            groundtruth = a_metadata.get("result", {})
+        except Exception as e:
+            record["status"] = "invalid_metadata"
+            return record
+    # Catalog entries carry the same keys as the metadata "result"
+    a_taxonomy = groundtruth.get("fault_taxonomy", "")
+    a_object = groundtruth.get("fault_object", "")
+    a_root_cause = groundtruth.get("root_cause", "")
+
+    rank1_flag = False
+    rank3_flag = False
+    partial_rank1_flag = False
+    partial_rank3_flag = False
+    error_tool_use_count = count_llm_output_abnormal(b_trace_detail)
+    redundancy = calculate_redundancy_rate(b_trace_path) if os.path.exists(b_trace_path) else 0.0
+
+    latency_value = 0.0
+    usage = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost": 0.0}
+    trace_index = load_trace_index(b_case_path)
+    if trace_index:
+        latency_value = trace_index.get("latency", 0.0)
+        usage = {
+            "llm_calls": len(trace_index.get("llm_calls", [])),
+            "prompt_tokens": trace_index.get("prompt_tokens", 0),
+            "completion_tokens": trace_index.get("completion_tokens", 0),
+            "total_tokens": trace_index.get("total_tokens", 0),
+            "cost": trace_cost(trace_index, prices),
+        }
+
+    b_predictions = []
+    try:
+        if not os.path.exists(b_result_path):
+            record["missing_result"] = True
+        else:
+            with open(b_result_path, 'r', encoding='utf-8') as f:
+                b_result = json.load(f)
+            b_predictions = b_result.get("top_3_predictions", [])
+
+        if not b_predictions:
+            record["empty_predictions"] = True
+            error_tool_use_count += 1
+            record["error_detail"] = f"【{fault_case_name}】- top_3_predictions is null | groundtruth：taxonomy={a_taxonomy}, object={a_object}, root_cause={a_root_cause},invalid action={error_tool_use_count}"
+        else:
+            for idx, pred in enumerate(b_predictions[:3]):
+                p_taxonomy = pred.get("fault_taxonomy", "").lower()
+                p_object = pred.get("fault_object", "").lower()
+                p_root_cause = pred.get("root_cause", "").lower()
+
+                full_match = (p_taxonomy == a_taxonomy.lower() and
+                            p_object == a_object.lower() and
+                            p_root_cause == a_root_cause.lower())
+                partial_match = (p_object == a_object.lower() and p_root_cause == a_root_cause.lower())
+
+                if full_match:
+                    if idx == 0:
+                        rank1_flag = True
+                    rank3_flag = True
+                if partial_match:
+                    if idx == 0:
+                        partial_rank1_flag = True
+                    partial_rank3_flag = True
+
+            # incorrect details
+            if not rank1_flag or not rank3_flag:
+                error_detail = f"【{fault_case_name}】\n"
+                error_detail += f"  ground truth: taxonomy={a_taxonomy}, object={a_object}, root_cause={a_root_cause}\n"
+                error_detail += f"  rank1 result: "
+                rank1_pred = b_predictions[0] if len(b_predictions) > 0 else {}
+                r1_tax = rank1_pred.get("fault_taxonomy", "null")
+                r1_obj = rank1_pred.get("fault_object", "null")
+                r1_root = rank1_pred.get("root_cause", "null")
+                error_detail += f"taxonomy={r1_tax}, object={r1_obj}, root_cause={r1_root} (匹配：{rank1_flag})\n"
+                error_detail += f" rank3 result:{rank3_flag}）\n"
+                record["error_detail"] = error_detail
+    except Exception as e:
+        record["invalid_format"] = True
+        record["error_detail"] = f"【{fault_case_name}】- reading result.json error：{str(e)}"
+
+    recall, precision, f1, in_order_match, exact_match, any_order_match, llm_step = process_eval(
+        a_metadata_path, b_trace_path, prefix_steps, groundtruth.get("expert_paths"))
+    record.update({
+        "rank1": int(rank1_flag),
+        "rank3": int(rank3_flag),
+        "partial_rank1": int(partial_rank1_flag),
+        "partial_rank3": int(partial_rank3_flag),
+        "recall": recall,
+        "precision": precision,
+        "f1": f1,
+        "in_order": in_order_match,
+        "exact": exact_match,
+        "any_order": any_order_match,
+        "steps": llm_step,
+        "invalid_actions": error_tool_use_count,
+        "latency": latency_value,
+        "redundancy": redundancy,
+        "valid_trace": int(llm_step > len(prefix_steps)),
+        **usage,
+    })
+    return record
+
+
+class IncrementalEvaluator:
+    """
+    Running aggregates over per-case records. Adding (or re-scoring) a case is O(1):
+    every metric is kept as a sum, and a re-scored case first subtracts its old record.
+    """
+    SUM_KEYS = ("rank1", "rank3", "partial_rank1", "partial_rank3", "recall", "precision", "f1",
+                "in_order", "exact", "any_order", "steps", "invalid_actions", "latency", "redundancy",
+                "valid_trace", "result_exists", "llm_calls", "prompt_tokens", "completion_tokens",
+                "total_tokens", "cost")
+    FLAG_KEYS = ("missing_result", "empty_predictions", "invalid_format")
+    STATUS_KEYS = ("missing_groundtruth", "missing_metadata", "invalid_metadata")
+
+    def __init__(self, warm_start_steps=(), memoize=False):
+        # Non-empty for warm-start runs, whose results are reported separately
+        self.warm_start_steps = list(warm_start_steps)
+        # Memoized runs answered repeated calls with references, so their observations differ too
+        self.memoize = bool(memoize)
+        self.records = {}
+        self.sums = {key: 0.0 for key in self.SUM_KEYS}
+        # Case names per failure kind; insertion-ordered dicts so re-scoring can remove them
+        self.flagged = {key: {} for key in self.FLAG_KEYS + self.STATUS_KEYS}
+        self.total_cases = 0
+
+    def _apply(self, record, sign):
+        self.total_cases += sign
+        case = record["case"]
+        def update(names, case):
+            if sign > 0:
+                names[case] = None
+            else:
+                names.pop(case, None)
+        if record["status"] != "ok":
+            update(self.flagged[record["status"]], case)
+            self.sums["result_exists"] += sign * record["result_exists"]
+            return
+        for key in self.SUM_KEYS:
+            self.sums[key] += sign * record[key]
+        for key in self.FLAG_KEYS:
+            if record[key]:
+                update(self.flagged[key], case)
+
+    def add(self, record):
+        previous = self.records.get(record["case"])
+        if previous is not None:
+            self._apply(previous, -1)
+        self.records[record["case"]] = record
+        self._apply(record, +1)
+
+    def error_cases(self):
+        return [r["error_detail"] for r in self.records.values() if r.get("error_detail")]
+
+    def summary(self):
+        total_cases = self.total_cases
+        s = self.sums
+        result_exist_count = int(s["result_exists"])
+        valid_trace_count = int(s["valid_trace"])
+        empty_predictions = len(self.flagged["empty_predictions"])
+        missing = (len(self.flagged["missing_groundtruth"]) + len(self.flagged["missing_metadata"])
+                   + len(self.flagged["missing_result"]) + len(self.flagged["invalid_format"])
+                   + len(self.flagged["invalid_metadata"]))
+        completed = result_exist_count - empty_predictions
+
+        def avg(key, digits=3):
+            return round(s[key] / total_cases, digits) if total_cases > 0 else 0.0
+
+        def per(key, denominator, digits=3):
+            return round(s[key] / denominator, digits) if denominator > 0 else 0.0
+
+        return {
+            "warm_start": bool(self.warm_start_steps),
+            "memoize": self.memoize,
+            "total_cases": total_cases,
+            "valid_cases": total_cases - missing,
+            "rank1_correct": int(s["rank1"]),
+            "rank3_correct": int(s["rank3"]),
+            "partial_rank1_correct": int(s["partial_rank1"]),
+            "partial_rank3_correct": int(s["partial_rank3"]),
+            "rank1_accuracy": avg("rank1"),
+            "rank3_accuracy": avg("rank3"),
+            "partial_rank1_accuracy": avg("partial_rank1"),
+            "partial_rank3_accuracy": avg("partial_rank3"),
+            "result_exist_count": result_exist_count,
+            "valid_trace_count": valid_trace_count,
+            "redundancy_avg": round(s["redundancy"] / valid_trace_count, 3) if valid_trace_count > 0 else 0.0,
+            "tool_precision_avg": avg("precision"),
+            "tool_recall_avg": avg("recall"),
+            "tool_f1_avg": avg("f1"),
+            "tool_exact_avg": avg("exact"),
+            "tool_inorder_avg": avg("in_order"),
+            "tool_anyorder_avg": avg("any_order"),
+            "tool_len_avg": avg("steps", 2),
+            "tool_invalid_avg": avg("invalid_actions", 2),
+            "latency_avg": round(s["latency"] / completed, 3) if completed > 0 else 0.0,
+            "task_complete_rate": round(completed / total_cases, 2) if total_cases > 0 else 0.0,
+            "no_tool_use": round(1 - (valid_trace_count / total_cases), 2) if total_cases > 0 else 0.0,
+            # efficiency: what a diagnosis costs, and what a correct one costs
+            "llm_calls_avg": avg("llm_calls", 2),
+            "prompt_tokens_avg": avg("prompt_tokens", 1),
+            "completion_tokens_avg": avg("completion_tokens", 1),
+            "tokens_per_case": avg("total_tokens", 1),
+            "tokens_per_correct": per("total_tokens", s["rank1"], 1),
+            "tokens_per_step": per("total_tokens", s["steps"], 1),
+            "latency_per_step": per("latency", s["steps"]),
+            "cost_total": round(s["cost"], 6),
+            "cost_per_case": avg("cost", 6),
+            "cost_per_correct": per("cost", s["rank1"], 6),
+        }
+
+    def print_report(self):
+        print("\n❌ Error case")
+        print("-" * 120)
+        for idx, error in enumerate(self.error_cases(), 1):
+            print(f"{idx}. {error}")
+        print("-" * 60)
+
+        m = self.summary()
+        total_cases = m["total_cases"]
+        missing_result_files = list(self.flagged["missing_result"])
+        invalid_format_files = list(self.flagged["invalid_metadata"]) + list(self.flagged["invalid_format"])
+        empty_predictions_files = list(self.flagged["empty_predictions"])
+        print(f"【Basic Statistics】")
+        print(f"Total fault cases of LLM diagnose: {total_cases}")
+        print(f"Valid comparison cases (accuracy calculable): {m['valid_cases']}")
+        print(f"Number of existing result.json files: {m['result_exist_count']} (Total cases: {total_cases})")
+        print(f"Valid LLM step count (trace length > 0): {m['valid_trace_count']} (Total cases: {total_cases})")
+        if self.warm_start_steps:
+            print(f"⚠️ Warm-start run: {', '.join(self.warm_start_steps)} were supplied up front and count as the first steps")
+        if self.memoize:
+            print("⚠️ Memoized run: repeated tool calls were answered with references; not comparable to baseline runs")
+
+        print(f"  - missing LLM diagnosis results: {len(missing_result_files)} → {', '.join(missing_result_files) if missing_result_files else 'None'}")
+        print(f"  - Missing fields/format errors: {len(invalid_format_files)} → {', '.join(invalid_format_files) if invalid_format_files else 'None'}")
+        print(f"  - {len(empty_predictions_files)} empty results → {', '.join(empty_predictions_files) if empty_predictions_files else 'None'}")
+        print("-" * 60)
+        print(f"【Outcome-based Metrics】")
+        print(f"Task Completion Rate (TCR):{m['task_complete_rate']}")
+        print(f"Top-1 Accuracy Rate:{m['rank1_correct']}/{total_cases} = {m['rank1_accuracy']}")
+        print(f"Top-3 Accuracy Rate:{m['rank3_correct']}/{total_cases} = {m['rank3_accuracy']}")
+        print(f"Part-1 Accuracy Rate:{m['partial_rank1_correct']}/{total_cases} = {m['partial_rank1_accuracy']}")
+        print(f"Part-3 Accuracy Rate:{m['partial_rank3_correct']}/{total_cases} = {m['partial_rank3_accuracy']}")
+        print("=" * 60)
+        print(f"【Process-based Metrics】")
+        print(f"Exact Match:{m['tool_exact_avg']}")
+        print(f"In-Order Match:{m['tool_inorder_avg']}")
+        print(f"Any-Order Match:{m['tool_anyorder_avg']}")
+        print(f"Tool Relevance:{m['tool_precision_avg']}")
+        print(f"Tool Coverage:{m['tool_recall_avg']}")
+        print(f"Tool F1:{m['tool_f1_avg']}")
+        print(f"Avg Steps:{m['tool_len_avg']}")
+        print(f"Invalid Action Count (IAC):{m['tool_invalid_avg']}")
+        print(f"MIIT:{m['latency_avg']}")
+        print(f"Redundant Action Rate (RAR):{m['redundancy_avg']}")
+        print(f"Zero-Tool Diagnosis Rate (ZTDR):{m['no_tool_use']}")
+        print("=" * 60)
+        print(f"【Efficiency Metrics】")
+        print(f"LLM Calls per Case:{m['llm_calls_avg']}")
+        print(f"Tokens per Case:{m['tokens_per_case']} (prompt {m['prompt_tokens_avg']} / completion {m['completion_tokens_avg']})")
+        print(f"Tokens per Correct Diagnosis (Top-1):{m['tokens_per_correct']}")
+        print(f"Tokens per Step:{m['tokens_per_step']}")
+        print(f"Latency per Step:{m['latency_per_step']}")
+        print(f"Cost per Case:{m['cost_per_case']} | per Correct Diagnosis:{m['cost_per_correct']} | Total:{m['cost_total']}")
+
+    def progress_line(self):
+        m = self.summary()
+        return (f"cases={m['total_cases']} A@1={m['rank1_accuracy']} A@3={m['rank3_accuracy']} "
+                f"TCR={m['task_complete_rate']} InO={m['tool_inorder_avg']} Cov={m['tool_recall_avg']} "
+                f"Steps={m['tool_len_avg']} MTTI={m['latency_avg']} Tok/case={m['tokens_per_case']}")
+
+
 def evaluation(a_root_dir, b_root_dir):
     """
     :param a_root_dir: groundtruth
     :param b_root_dir: LLM
     :return: metrics
     """
-  
-    total_cases = 0          
-    rank1_correct = 0        
-    rank3_correct = 0   
-    partial_rank1_correct = 0  
-    partial_rank3_correct = 0       
-    empty_predictions_files = []
-    missing_a_case_files = []
-    missing_metadata_files = []
-    missing_result_files = []
-    invalid_format_files = []  
-    trace_recall=[]
-    trace_precision=[]
-    trace_f1=[]
-    trace_exact=[]
-    trace_anyorder=[]
-    trace_len=[]
-    trace_inorder=[]
-    trace_invalid_action=[]
-    trace_latency=[]
-    trace_redundancy=[]
-    valid_trace_count = 0
-    result_exist_count = 0
-
-
     if not os.path.isdir(a_root_dir):
         print(f"❌ error {a_root_dir} not exist")
         return None
@@ -123,251 +422,165 @@ def evaluation(a_root_dir, b_root_dir):
         print(f"❌ error: {b_root_dir} not exist")
         return None
 
-    b_fault_cases = [
-        d for d in os.listdir(b_root_dir)
-        if os.path.isdir(os.path.join(b_root_dir, d))
-    ]
-    
-
-    error_cases = []
-    
-    for fault_case_name in b_fault_cases:
-        total_cases += 1
-     
-        a_case_path = os.path.join(a_root_dir, fault_case_name)
-        a_metadata_path = os.path.join(a_case_path, "metadata.json")
-        b_case_path = os.path.join(b_root_dir, fault_case_name)
-        b_result_path = os.path.join(b_case_path, "result.json")
-        b_trace_path=os.path.join(b_case_path, "llm_trace_evaluation.json")
-        b_trace_detail=os.path.join(b_case_path, "llm_traj.json")
-        b_raw_trace=os.path.join(b_case_path, "trace.json")
-        
-        
-        rank1_flag = False
-        rank3_flag = False
-        partial_rank1_flag = False
-        partial_rank3_flag = False
-        error_tool_use_count = 0
-        redundancy = 0.0
-        valid_trace = []
-        
-        if os.path.exists(b_result_path):
-            result_exist_count += 1
-
-        if not os.path.isdir(a_case_path):
-            missing_a_case_files.append(fault_case_name)
-            continue
+    evaluator = score_directory(a_root_dir, b_root_dir)
+    evaluator.print_report()
+    return evaluator.summary()
 
-        try:
-            if not os.path.exists(a_metadata_path):
-                missing_metadata_files.append(fault_case_name)
-                continue
 
-            with open(a_metadata_path, 'r', encoding='utf-8') as f:
-                a_metadata = json.load(f)
-            a_result = a_metadata.get("result", {})
-            a_taxonomy = a_result.get("fault_taxonomy", "")
-            a_object = a_result.get("fault_object", "")
-            a_root_cause = a_result.get("root_cause", "")
+def load_groundtruth(a_root_dir, case_filter=None):
+    """
+    {case name: catalog entry} of a groundtruth category directory, from the benchmark catalog;
+    `case_filter` (diagnosis.case_filter of the run) keeps only the cases the run diagnoses.
+    """
+    benchmark_root, category = os.path.split(os.path.normpath(a_root_dir))
+    return {entry["case"]: entry for entry in load_catalog(benchmark_root).filter(category=category, **(case_filter or {}))}
 
-            
 
-        except Exception as e:
-            invalid_format_files.append(fault_case_name)
-            continue
+def score_directory(a_root_dir, b_root_dir):
+    run_config = load_run_config(b_root_dir)
+    prices, warm_steps = run_config.get("prices"), run_config.get("warm_start_steps") or []
+    groundtruth = load_groundtruth(a_root_dir)
+    evaluator = IncrementalEvaluator(warm_steps, run_config.get("memoize", False))
+    for fault_case_name in os.listdir(b_root_dir):
+        b_case_path = os.path.join(b_root_dir, fault_case_name)
+        if os.path.isdir(b_case_path):
+            evaluator.add(evaluate_case(os.path.join(a_root_dir, fault_case_name), b_case_path, prices, warm_steps,
+                                        groundtruth.get(fault_case_name)))
+    return evaluator
 
- 
-        error_tool_use_count = count_llm_output_abnormal(b_trace_detail)
-    
-        if os.path.exists(b_trace_path):
-            redundancy = calculate_redundancy_rate(b_trace_path)
-        trace_redundancy.append(redundancy)
 
-        latency_value = 0.0
-        
-   
-        if os.path.exists(b_raw_trace):
-            with open(b_raw_trace, "r", encoding="utf-8") as f:
-                raw_trace = json.load(f)
-            latency_value = raw_trace.get("latency", 0.0)
-        trace_latency.append(latency_value)
+EFFICIENCY_COLUMNS = (("A@1", "rank1_accuracy"), ("Steps", "tool_len_avg"), ("Calls", "llm_calls_avg"),
+                      ("Tok/case", "tokens_per_case"), ("Tok/correct", "tokens_per_correct"),
+                      ("Lat/step", "latency_per_step"), ("Cost/case", "cost_per_case"),
+                      ("Cost/correct", "cost_per_correct"))
 
 
-        b_predictions = []
+def compare_strategies(workspace, category, model, methods):
+    """
+    Score every prompt strategy run of a model and print their efficiency side by side.
+    The strategy name is taken from each run's run_config.json when it exists.
+    """
+    a_root_dir = f"{workspace}/benchmark/{category}"
+    rows = {}
+    for method in methods:
+        b_root_dir = f"{workspace}/{model}_{method}/{category}"
+        if not os.path.isdir(b_root_dir):
+            print(f"⚠️ skip {method}: {b_root_dir} not exist")
+            continue
+        extract_completed_info_to_result(b_root_dir)
+        batch_extract_traces(b_root_dir)
+        process_llm_traj_to_evaluation(b_root_dir)
+        run_config = load_run_config(b_root_dir)
+        strategy = (run_config.get("prompt_strategy", method) + ("+warm" if run_config.get("warm_start") else "")
+                    + ("+memo" if run_config.get("memoize") else ""))
+        rows[strategy] = score_directory(a_root_dir, b_root_dir).summary()
+
+    print(f"\n【Efficiency by prompt_strategy】 model={model} category={category}")
+    print(f"{'strategy':<10}" + "".join(f"{title:>14}" for title, _ in EFFICIENCY_COLUMNS))
+    for strategy, m in rows.items():
+        print(f"{strategy:<10}" + "".join(f"{m[key]:>14}" for _, key in EFFICIENCY_COLUMNS))
+    return rows
+
+
+def _case_fingerprint(b_case_path):
+    # A case is (re)scored when any of its evaluation inputs changes
+    fingerprint = []
+    for name in ("trace.json", "trace_error.json", "result.json", "llm_traj.json", "llm_trace_evaluation.json"):
         try:
-            if not os.path.exists(b_result_path):
-                missing_result_files.append(fault_case_name)
-            else:
-                with open(b_result_path, 'r', encoding='utf-8') as f:
-                    b_result = json.load(f)
-                b_predictions = b_result.get("top_3_predictions", [])
+            stat = os.stat(os.path.join(b_case_path, name))
+            fingerprint.append((name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            continue
+    return tuple(fingerprint)
 
-            
-            error_detail = ""
-            if not b_predictions:
-                empty_predictions_files.append(fault_case_name)
-                error_tool_use_count += 1
-                error_detail = f"【{fault_case_name}】- top_3_predictions is null | groundtruth：taxonomy={a_taxonomy}, object={a_object}, root_cause={a_root_cause},invalid action={error_tool_use_count}"
-                error_cases.append(error_detail)
-            else:
-                for idx, pred in enumerate(b_predictions[:3]):
-                    p_taxonomy = pred.get("fault_taxonomy", "").lower()
-                    p_object = pred.get("fault_object", "").lower()
-                    p_root_cause = pred.get("root_cause", "").lower()
-
-                    full_match = (p_taxonomy == a_taxonomy.lower() and 
-                                p_object == a_object.lower() and 
-                                p_root_cause == a_root_cause.lower())
-                    partial_match = (p_object == a_object.lower() and p_root_cause == a_root_cause.lower())
-
-                    if full_match:
-                        if idx == 0:
-                            rank1_flag = True
-                        rank3_flag = True
-                    if partial_match:
-                        if idx == 0:
-                            partial_rank1_flag = True
-                        partial_rank3_flag = True
-
-                # incorrect details
-                if not rank1_flag or not rank3_flag:
-                    error_detail = f"【{fault_case_name}】\n"
-                    error_detail += f"  ground truth: taxonomy={a_taxonomy}, object={a_object}, root_cause={a_root_cause}\n"
-                    error_detail += f"  rank1 result: "
-                    rank1_pred = b_predictions[0] if len(b_predictions) > 0 else {}
-                    r1_tax = rank1_pred.get("fault_taxonomy", "null")
-                    r1_obj = rank1_pred.get("fault_object", "null")
-                    r1_root = rank1_pred.get("root_cause", "null")
-                    error_detail += f"taxonomy={r1_tax}, object={r1_obj}, root_cause={r1_root} (匹配：{rank1_flag})\n"
-                    error_detail += f" rank3 result:{rank3_flag}）\n"
-                    error_cases.append(error_detail)
-
-       
-            if rank1_flag:
-                rank1_correct += 1
-            if rank3_flag:
-                rank3_correct += 1
-            if partial_rank1_flag:
-                partial_rank1_correct += 1
-            if partial_rank3_flag:
-                partial_rank3_correct += 1
 
-        except Exception as e:
-            invalid_format_files.append(fault_case_name)
-            error_detail = f"【{fault_case_name}】- reading result.json error：{str(e)}"
-            error_cases.append(error_detail)
+def write_live_metrics(evaluator, live_path):
+    tmp_path = live_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **evaluator.summary()}, f, indent=2)
+    os.replace(tmp_path, live_path)
 
-        
-        recall, precision, f1, in_order_match,exact_match,any_order_match, llm_step = process_eval(a_metadata_path, b_trace_path)
-        trace_precision.append(precision)
-        trace_recall.append(recall)
-        trace_f1.append(f1)
-        trace_inorder.append(in_order_match)
-        trace_exact.append(exact_match)
-        trace_anyorder.append(any_order_match)
-        trace_len.append(llm_step)
-        trace_invalid_action.append(error_tool_use_count)
-        
-        if llm_step > 0:
-            valid_trace_count += 1
-
-    print("\n❌ Error case")
-    print("-" * 120)
-    if error_cases:
-        for idx, error in enumerate(error_cases, 1):
-            print(f"{idx}. {error}")
-    
-    print("-" * 60)
-
-
-    missing_a_case = len(missing_a_case_files)
-    missing_metadata = len(missing_metadata_files)
-    missing_result = len(missing_result_files)
-    invalid_format = len(invalid_format_files)
-    empty_predictions = len(empty_predictions_files)
-    
-    valid_cases = total_cases - missing_a_case - missing_metadata - missing_result - invalid_format
-    rank1_accuracy = round(rank1_correct / total_cases , 3) if total_cases > 0 else 0.0
-    rank3_accuracy = round(rank3_correct / total_cases , 3) if total_cases > 0 else 0.0
-    parti_rank1_accuracy = round(partial_rank1_correct / total_cases , 3) if total_cases > 0 else 0.0
-    parti_rank3_accuracy = round(partial_rank3_correct / total_cases ,3) if total_cases > 0 else 0.0
-    
-    tool_precision_avg = round(sum(trace_precision) / total_cases , 3) if total_cases > 0 else 0.0
-    tool_recall_avg = round(sum(trace_recall) / total_cases ,3) if total_cases > 0 else 0.0
-    tool_f1_avg = round(sum(trace_f1) / total_cases, 3) if total_cases > 0 else 0.0
-    latency_avg = round(sum(trace_latency) / (result_exist_count - empty_predictions), 3) if total_cases > 0 else 0.0
-    tool_inorder_avg = round(sum(trace_inorder) / total_cases, 3) if total_cases > 0 else 0.0
-    tool_exact_avg = round(sum(trace_exact) / total_cases, 3) if total_cases > 0 else 0.0
-    tool_anyorder_avg = round(sum(trace_anyorder) / total_cases, 3) if total_cases > 0 else 0.0
-    tool_len_avg = round(sum(trace_len) / total_cases, 2) if total_cases > 0 else 0.0
-    tool_invalid_avg = round(sum(trace_invalid_action) / total_cases, 2) if total_cases > 0 else 0.0
-    
-    redundancy_avg = round(sum(trace_redundancy) / valid_trace_count, 3) if valid_trace_count > 0 else 0.0
-    
-    
-    task_complete_rate=round((result_exist_count - empty_predictions) / total_cases, 2) if total_cases > 0 else 0.0
-    no_tool_use= round(1-(valid_trace_count/ total_cases), 2) if total_cases > 0 else 0.0
-   
-  
-    print(f"【Basic Statistics】")
-    print(f"Total fault cases of LLM diagnose: {len(b_fault_cases)}")
-    print(f"Valid comparison cases (accuracy calculable): {valid_cases}")
-    print(f"Number of existing result.json files: {result_exist_count} (Total cases: {total_cases})")
-    print(f"Valid LLM step count (trace length > 0): {valid_trace_count} (Total cases: {total_cases})")
-
-    print(f"  - missing LLM diagnosis results: {missing_result} → {', '.join(missing_result_files) if missing_result_files else 'None'}")
-    print(f"  - Missing fields/format errors: {invalid_format} → {', '.join(invalid_format_files) if invalid_format_files else 'None'}")
-    print(f"  - {empty_predictions} empty results → {', '.join(empty_predictions_files) if empty_predictions_files else 'None'}")
-    print("-" * 60)
-    print(f"【Outcome-based Metrics】")
-    print(f"Task Completion Rate (TCR):{task_complete_rate}")
-    print(f"Top-1 Accuracy Rate:{rank1_correct}/{total_cases} = {rank1_accuracy}")
-    print(f"Top-3 Accuracy Rate:{rank3_correct}/{total_cases} = {rank3_accuracy}")
-    print(f"Part-1 Accuracy Rate:{partial_rank1_correct}/{total_cases} = {parti_rank1_accuracy}")
-    print(f"Part-3 Accuracy Rate:{partial_rank3_correct}/{total_cases} = {parti_rank3_accuracy}")
-    print("=" * 60)
-    print(f"【Process-based Metrics】")
-    print(f"Exact Match:{tool_exact_avg}")
-    print(f"In-Order Match:{tool_inorder_avg}")
-    print(f"Any-Order Match:{tool_anyorder_avg}")
-    print(f"Tool Relevance:{tool_precision_avg}")
-    print(f"Tool Coverage:{tool_recall_avg}")
-    print(f"Tool F1:{tool_f1_avg}")
-    print(f"Avg Steps:{tool_len_avg}")
-    print(f"Invalid Action Count (IAC):{tool_invalid_avg}")
-    print(f"MIIT:{latency_avg}")
-    print(f"Redundant Action Rate (RAR):{redundancy_avg}")
-    print(f"Zero-Tool Diagnosis Rate (ZTDR):{no_tool_use}")
-  
-    
-    return {
-        "total_cases": total_cases,
-        "valid_cases": valid_cases,
-        "rank1_accuracy": rank1_accuracy,
-        "rank3_accuracy": rank3_accuracy,
-        "partial_rank1_accuracy": parti_rank1_accuracy,
-        "partial_rank3_accuracy": parti_rank3_accuracy,
-        "result_exist_count": result_exist_count,
-        "valid_trace_count": valid_trace_count,
-        "redundancy_avg": redundancy_avg,
-        "tool_precision_avg": tool_precision_avg,
-        "tool_recall_avg": tool_recall_avg,
-        "tool_f1_avg": tool_f1_avg,
-        "task_complete_rate": task_complete_rate
-    }
 
+def watch(a_root_dir, b_root_dir, interval=10.0, live_path=None, postprocess=True):
+    """
+    Score cases as the diagnosis run finishes them. A case counts as finished once
+    main.py has written trace.json or trace_error.json. Running metrics are printed
+    per case and written to `live_path` (default: <b_root_dir>/live_metrics.json).
+    Stops when every case the run diagnoses (the category narrowed by the run's
+    case_filter) is scored, or on Ctrl-C.
+    """
+    live_path = live_path or os.path.join(b_root_dir, "live_metrics.json")
+    run_config = load_run_config(b_root_dir)
+    groundtruth = load_groundtruth(a_root_dir, run_config.get("case_filter"))
+    expected = len(groundtruth)
+    prices, warm_steps = run_config.get("prices"), run_config.get("warm_start_steps") or []
+    evaluator = IncrementalEvaluator(warm_steps, run_config.get("memoize", False))
+    fingerprints = {}
+    print(f"👀 Watching {b_root_dir} ({expected} groundtruth cases), live metrics → {live_path}")
+    try:
+        while True:
+            os.makedirs(b_root_dir, exist_ok=True)
+            if not run_config and not evaluator.total_cases:
+                # Started before main.py wrote run_config.json: apply its settings once it exists
+                run_config = load_run_config(b_root_dir)
+                if run_config:
+                    prices, warm_steps = run_config.get("prices"), run_config.get("warm_start_steps") or []
+                    evaluator = IncrementalEvaluator(warm_steps, run_config.get("memoize", False))
+                    groundtruth = load_groundtruth(a_root_dir, run_config.get("case_filter"))
+                    expected = len(groundtruth)
+            if postprocess:
+                extract_completed_info_to_result(b_root_dir)
+                batch_extract_traces(b_root_dir)
+                process_llm_traj_to_evaluation(b_root_dir)
+            changed = False
+            for fault_case_name in sorted(os.listdir(b_root_dir)):
+                b_case_path = os.path.join(b_root_dir, fault_case_name)
+                if not os.path.isdir(b_case_path):
+                    continue
+                fingerprint = _case_fingerprint(b_case_path)
+                names = {name for name, _, _ in fingerprint}
+                if not names & {"trace.json", "trace_error.json"} or fingerprints.get(fault_case_name) == fingerprint:
+                    continue
+                fingerprints[fault_case_name] = fingerprint
+                evaluator.add(evaluate_case(os.path.join(a_root_dir, fault_case_name), b_case_path, prices, warm_steps,
+                                            groundtruth.get(fault_case_name)))
+                changed = True
+                print(f"[{evaluator.total_cases}/{expected}] {fault_case_name}: {evaluator.progress_line()}")
+            if changed:
+                write_live_metrics(evaluator, live_path)
+            if evaluator.total_cases >= expected:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n⏹️  Watch stopped")
+    evaluator.print_report()
+    return evaluator.summary()
 
 
 if __name__ == "__main__":
-    fault_category='startup'
-    model='qwen3-14b'
-    method='icl'
-    A_ROOT_DIRECTORY = f"/root/k8srca/Cloud-OpsBench/benchmark/{fault_category}" # groundtruth path
-    B_ROOT_DIRECTORY = f"/root/k8srca/Cloud-OpsBench/qwen3-14b_icl/{fault_category}"  # diagnose result path
-
-    extract_completed_info_to_result(B_ROOT_DIRECTORY) # for root
-    batch_extract_traces(B_ROOT_DIRECTORY)  # extract trace
-    process_llm_traj_to_evaluation(B_ROOT_DIRECTORY) # pure trace
-    # find_empty_trace_json_non_recursive(B_ROOT_DIRECTORY)
-    print("\n===== calculating result metric =====")
-    stats = evaluation(A_ROOT_DIRECTORY, B_ROOT_DIRECTORY)
+    parser = argparse.ArgumentParser(description="Evaluate Cloud-OpsBench diagnosis results")
+    parser.add_argument("--workspace", default="/root/k8srca/Cloud-OpsBench")
+    parser.add_argument("--category", default="startup")
+    parser.add_argument("--model", default="qwen3-14b")
+    parser.add_argument("--method", default="icl", help="prompt_strategy of the run; append _warm for warm-start runs (e.g. icl_warm)")
+    parser.add_argument("--watch", action="store_true", help="Score cases incrementally while main.py is running")
+    parser.add_argument("--interval", type=float, default=10.0, help="Polling interval of --watch in seconds")
+    parser.add_argument("--compare", default="", help="Comma-separated strategies to compare on tokens/cost, e.g. base,cot,rag,icl")
+    cli_args = parser.parse_args()
+
+    fault_category = cli_args.category
+    A_ROOT_DIRECTORY = f"{cli_args.workspace}/benchmark/{fault_category}" # groundtruth path
+    B_ROOT_DIRECTORY = f"{cli_args.workspace}/{cli_args.model}_{cli_args.method}/{fault_category}"  # diagnose result path
+
+    if cli_args.compare:
+        stats = compare_strategies(cli_args.workspace, fault_category, cli_args.model,
+                                   [m.strip() for m in cli_args.compare.split(",") if m.strip()])
+    elif cli_args.watch:
+        stats = watch(A_ROOT_DIRECTORY, B_ROOT_DIRECTORY, cli_args.interval)
+    else:
+        extract_completed_info_to_result(B_ROOT_DIRECTORY) # for root
+        batch_extract_traces(B_ROOT_DIRECTORY)  # extract trace
+        process_llm_traj_to_evaluation(B_ROOT_DIRECTORY) # pure trace
+        # find_empty_trace_json_non_recursive(B_ROOT_DIRECTORY)
+        print("\n===== calculating result metric =====")
+        stats = evaluation(A_ROOT_DIRECTORY, B_ROOT_DIRECTORY)
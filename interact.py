@@ -1,9 +1,14 @@
-from tools.implement import KubernetesTools
+from tools.store import load_case
+from catalog import load_catalog
+import argparse
+import inspect
 import json
 import os
+import sys
+import time
 import datetime
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, TextIO
 
 # Keep the original service list and namespace configuration
 BOUTIQUE=['adservice','cartservice','checkoutservice','currencyservice','emailservice','frontend','paymentservice','productcatalogservice','recommendationservice','redis-cart','shippingservice']
@@ -12,7 +17,7 @@ DEFAULT_NAMESPACE='boutique'
 class DiagnosticTester:
     """Diagnostic tool used only for interaction testing (no logging or persistence)"""
     def __init__(self, snapshot_path: str, query: str):
-        self.k8s_tools = KubernetesTools(snapshot_path)
+        self.k8s_tools = load_case(snapshot_path)
         self.query = query
         self.snapshot_path = snapshot_path
         # Remove all trace/statistics related attributes
@@ -25,19 +30,38 @@ class DiagnosticTester:
              "description": "Get application's YAML configuration (e.g., deployment config, environment variables)"},
             {"name": "GetServiceDependencies", "method": self.k8s_tools.GetServiceDependencies,
              "description": "Get upstream/downstream service dependencies (who calls it / what it calls)"},
+            {"name": "GetServiceCallChains", "method": self.k8s_tools.GetServiceCallChains,
+             "description": "Get every upstream/downstream call chain through a service, with fan-in/fan-out"},
             {"name": "GetRecentLogs", "method": self.k8s_tools.GetRecentLogs,
              "description": "Get Pod logs (including previous crash logs)"},
+            {"name": "GetLogsInTimeRange", "method": self.k8s_tools.GetLogsInTimeRange,
+             "description": "Get the log lines of a service within a time window (e.g., an alert's time_range; default: the alerts' time range, else the last lines of the service's log span)"},
             {"name": "CheckServiceConnectivity", "method": self.k8s_tools.CheckServiceConnectivity,
              "description": "Check service network connectivity (TCP-based)"},
             {"name": "GetClusterConfiguration", "method": self.k8s_tools.GetClusterConfiguration,
              "description": "Get cluster node configuration (resources, labels, taints, etc.)"},
             {"name": "GetAlerts", "method": self.k8s_tools.GetAlerts,
              "description": "Get business alerts (triggered by abnormal metrics)"},
+            {"name": "GetAnomalyRanking", "method": self.k8s_tools.GetAnomalyRanking,
+             "description": "Rank all services and nodes by alert, metric and error-log evidence"},
             {"name": "GetErrorLogs", "method": self.k8s_tools.GetErrorLogs,
              "description": "Get error logs (mainly for performance issues with complex logs)"},
             {"name": "CheckNodeServiceStatus", "method": self.k8s_tools.CheckNodeServiceStatus,
-             "description": "Get status of key Kubernetes components"}
+             "description": "Get status of key Kubernetes components"},
+            {"name": "SearchSnapshot", "method": self.k8s_tools.SearchSnapshot,
+             "description": "Full-text search over all recorded outputs and log lines (e.g., 'FailedScheduling')"}
         ]
+        self.tool_map = {tool["name"]: tool["method"] for tool in self.tools}
+
+    def invoke(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Call a tool by name with keyword arguments (used by the scripted mode)"""
+        if tool_name not in self.tool_map:
+            raise ValueError(f"Unknown tool '{tool_name}'. Available: {', '.join(self.tool_map)}")
+        method = self.tool_map[tool_name]
+        args = dict(args or {})
+        if "namespace" in inspect.signature(method).parameters:
+            args.setdefault("namespace", DEFAULT_NAMESPACE)
+        return method(**args)
     
     def print_welcome(self):
         """Simplified welcome info, only shows test-related content"""
@@ -109,11 +133,22 @@ class DiagnosticTester:
             print(f"Allowed service names: {', '.join(BOUTIQUE)}")
             args["service_name"] = input("Enter service name: ").strip()
         
+        elif tool_name == "GetServiceCallChains":
+            print(f"Allowed service names: {', '.join(BOUTIQUE)}")
+            args["service_name"] = input("Enter service name: ").strip()
+            args["direction"] = input("Enter direction (both/upstream/downstream, press Enter for both): ").strip() or "both"
+
         elif tool_name == "GetRecentLogs":
             args["namespace"] = DEFAULT_NAMESPACE
             args["service_name"] = input("Enter service name: ").strip()
             args["lines"] = int(input("Enter number of log lines: ").strip())
         
+        elif tool_name == "GetLogsInTimeRange":
+            args["namespace"] = DEFAULT_NAMESPACE
+            args["service_name"] = input("Enter service name: ").strip()
+            args["time_range"] = input("Enter time range 'YYYY-MM-DD HH:MM:SS ~ YYYY-MM-DD HH:MM:SS' (press Enter for the alerts' range): ").strip() or None
+            args["lines"] = int(input("Enter maximum number of lines (press Enter for 100): ").strip() or 100)
+
         elif tool_name == "GetErrorLogs":
             args["namespace"] = DEFAULT_NAMESPACE
             args["service_name"] = input("Enter service name: ").strip()
@@ -134,9 +169,16 @@ class DiagnosticTester:
         elif tool_name == "GetAlerts":
             print("⚠️  GetAlerts requires no parameters and will directly return alert information")
         
+        elif tool_name == "GetAnomalyRanking":
+            args["top"] = int(input("Enter number of suspects to list (press Enter for 10): ").strip() or 10)
+
         elif tool_name == "CheckNodeServiceStatus":
             args["node_name"] = input("Enter node name: ").strip()
             args["service_name"] = input("Enter service name: ").strip()
+
+        elif tool_name == "SearchSnapshot":
+            args["query"] = input("Enter search words (e.g., 'FailedScheduling'): ").strip()
+            args["limit"] = int(input("Enter maximum number of matches (press Enter for 20): ").strip() or 20)
         
         return args
     
@@ -233,40 +275,108 @@ class DiagnosticTester:
             except ValueError:
                 print("Please enter a valid number")
 
-def get_random_fault_case(fault_path):
-    """Randomly select a fault case"""
-    # Filter all fault directories
-    fault_cases = [
-        d for d in os.listdir(fault_path)
-        if os.path.isdir(os.path.join(fault_path, d))
-    ]
+def get_random_fault_case(fault_path, **case_filter):
+    """Randomly select a fault case of the category at fault_path; case_filter narrows it by catalog fields"""
+    benchmark_root, category = os.path.split(os.path.normpath(fault_path))
+    fault_cases = load_catalog(benchmark_root).filter(category=category, **case_filter).entries
     if not fault_cases:
         print(f"❌ No valid fault cases under directory {fault_path}")
         return None, None
     
     # Randomly choose one
-    random_case = random.choice(fault_cases)
-    case_path = os.path.join(fault_path, random_case)
-    
-    # Read query from metadata
-    meta_path = os.path.join(case_path, "metadata.json")
-    if not os.path.exists(meta_path):
-        print(f"⚠️  Fault case {random_case} is missing metadata.json, using default query")
-        query = "test fault query"
-    else:
-        with open(meta_path, 'r', encoding='utf-8') as f:
-            metadata_data = json.load(f)
-        query = metadata_data.get("query", "test fault query")
+    case_entry = random.choice(fault_cases)
+    case_path = os.path.join(fault_path, case_entry["case"])
+    query = case_entry["query"] or "test fault query"
     
-    print(f"\n🎲 Randomly selected fault case: {random_case}")
+    print(f"\n🎲 Randomly selected fault case: {case_entry['case']}")
     return case_path, query
 
+def run_script(stream: TextIO, out: TextIO, benchmark_root: str = "benchmark") -> Dict[str, Any]:
+    """
+    Scripted (non-interactive) mode: read one JSON tool invocation per line and
+    write one JSON result per line.
+
+    Input line:  {"case": "scheduling/3", "tool": "GetResources", "args": {"resource_type": "pods"}, "id": "optional"}
+    Output line: {"id": ..., "case": ..., "tool": ..., "ok": true, "elapsed_ms": 0.02, "load_ms": 0.0, "result": ...}
+
+    Cases are loaded on first use and kept for the rest of the stream; `load_ms`
+    is only non-zero on the call that loaded the case.
+    """
+    testers: Dict[str, DiagnosticTester] = {}
+    stats = {"calls": 0, "errors": 0, "cases_loaded": 0, "tool_ms": 0.0, "load_ms": 0.0}
+    started = time.perf_counter()
+
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        record: Dict[str, Any] = {"line": line_no}
+        load_ms = 0.0
+        try:
+            request = json.loads(line)
+            record["id"] = request.get("id")
+            case = request["case"]
+            tool_name = request["tool"]
+            record.update({"case": case, "tool": tool_name})
+
+            tester = testers.get(case)
+            if tester is None:
+                case_path = case if os.path.isdir(case) else os.path.join(benchmark_root, case)
+                if not os.path.isdir(case_path):
+                    raise FileNotFoundError(f"Fault case not found: {case_path}")
+                t0 = time.perf_counter()
+                tester = DiagnosticTester(case_path, query="")
+                load_ms = (time.perf_counter() - t0) * 1000
+                testers[case] = tester
+                stats["cases_loaded"] += 1
+                stats["load_ms"] += load_ms
+
+            t0 = time.perf_counter()
+            result = tester.invoke(tool_name, request.get("args"))
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            record.update({"ok": True, "elapsed_ms": round(elapsed_ms, 4), "load_ms": round(load_ms, 4), "result": result})
+            stats["tool_ms"] += elapsed_ms
+        except Exception as e:
+            record.update({"ok": False, "load_ms": round(load_ms, 4), "error": f"{type(e).__name__}: {e}"})
+            stats["errors"] += 1
+        stats["calls"] += 1
+        out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    out.flush()
+    wall = time.perf_counter() - started
+    stats["wall_s"] = round(wall, 4)
+    stats["calls_per_s"] = round(stats["calls"] / wall, 2) if wall > 0 else 0.0
+    stats["tool_ms"] = round(stats["tool_ms"], 4)
+    stats["load_ms"] = round(stats["load_ms"], 4)
+    return stats
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive / scripted tester for the Cloud-OpsBench tool layer")
+    parser.add_argument("--category", default="scheduling", help="Fault category used for the interactive mode")
+    parser.add_argument("--root-cause", help="Only pick cases with this root cause (interactive mode)")
+    parser.add_argument("--benchmark-root", default="benchmark", help="Root directory of the fault cases")
+    parser.add_argument("--script", help="Run non-interactively from a JSON-lines file of tool invocations ('-' for stdin)")
+    parser.add_argument("--output", help="Write JSON-lines results to this file instead of stdout")
+    cli_args = parser.parse_args()
+
+    if cli_args.script:
+        in_stream = sys.stdin if cli_args.script == "-" else open(cli_args.script, "r", encoding="utf-8")
+        out_stream = open(cli_args.output, "w", encoding="utf-8") if cli_args.output else sys.stdout
+        try:
+            summary = run_script(in_stream, out_stream, cli_args.benchmark_root)
+        finally:
+            if in_stream is not sys.stdin:
+                in_stream.close()
+            if out_stream is not sys.stdout:
+                out_stream.close()
+        print(json.dumps(summary), file=sys.stderr)
+        sys.exit(0)
+
     # Root directory of fault cases
-    fault_path='benchmark/scheduling'
+    fault_path = os.path.join(cli_args.benchmark_root, cli_args.category)
     
     # 1. Randomly select a fault case
-    case_path, query = get_random_fault_case(fault_path)
+    case_path, query = get_random_fault_case(fault_path, **({"root_cause": cli_args.root_cause} if cli_args.root_cause else {}))
     if not case_path:
         exit(0)
     
@@ -5,41 +5,92 @@ from typing import Any, Dict, List, Optional
 import json
 import time
 import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from RCA_candidate import expected_output,agent_prompt
 from langfuse import Langfuse, get_client
 from tools.definition import create_k8s_tools
+from tools.metrics import configure_metrics, tool_metrics
+from tools.budget import StepBudget, litellm_usage_callback
+from tools.store import case_cache
 from openinference.instrumentation.crewai import CrewAIInstrumentor
 from config_utils import load_config, init_langfuse_env
-from prompt_optimization import get_cot_prompt,get_icl_prompt,get_rag_prompt
+from prompt_optimization import get_cot_prompt,get_icl_prompt,get_rag_prompt,get_warm_start_bundle,WARM_START_STEPS
+from trace_reader import write_trace_index
+from catalog import load_catalog
+from scheduler import CostModel, longest_first, makespan
+from mock_llm import CASE_HEADER
 # -----configuration----
 config = load_config()
 init_langfuse_env(config)
 llm_conf = config.llm
 diag_conf = config.diagnosis
 MODEL_NAME = llm_conf['model']
-myllm = LLM(
-    model=llm_conf['model'],
-    api_base=llm_conf['api_base'],
-    api_key=llm_conf['api_key'],
-    temperature=llm_conf['temperature'],
-    max_tokens=llm_conf['max_tokens'],
-    timeout=llm_conf['timeout'],
-    extra_body={"enable_thinking": False},
-    stream=True
-)
+# Cases diagnosed in parallel (diagnosis.workers), dispatched longest-first by scheduler.py
+workers = max(1, diag_conf.get('workers', 1))
+# Optional per-case step/token/time budget; one controller, reset for every case.
+# LiteLLM reports token usage process-wide, so with workers > 1 it cannot be attributed
+# to a case: every case gets its own controller and token budgeting is off
+budget_conf = dict(diag_conf.get('budget') or {})
+if workers > 1 and budget_conf.get('enabled') and budget_conf.get('max_tokens'):
+    print("⚠️ budget.max_tokens is ignored with workers > 1: token usage cannot be attributed to a case")
+    budget_conf['max_tokens'] = 0
+step_budget = StepBudget.from_config(budget_conf)
+# One logger instance for every case's LLM: CrewAI replaces a registered callback of the same type instead of adding another
+usage_callbacks = [litellm_usage_callback(step_budget)] if step_budget and workers == 1 else []
+
+
+def build_llm(case_id):
+    """LLM client of one case; the case id header lets mock_llm.py replay that exact case (real endpoints ignore it)."""
+    return LLM(
+        model=llm_conf['model'],
+        api_base=llm_conf['api_base'],
+        api_key=llm_conf['api_key'],
+        temperature=llm_conf['temperature'],
+        max_tokens=llm_conf['max_tokens'],
+        timeout=llm_conf['timeout'],
+        extra_body={"enable_thinking": False},
+        stream=True,
+        stream_options={"include_usage": True},  # streamed responses report token usage only when asked
+        callbacks=usage_callbacks,
+        extra_headers={CASE_HEADER: case_id},
+    )
 
 workspace_path=diag_conf["workspace_path"]
 fault_category = diag_conf['fault_category']
 fault_path = f'{workspace_path}/benchmark/{fault_category}' # benchmark path
 prompt_eng=diag_conf['prompt_strategy']
-diag_path = f'{workspace_path}/{MODEL_NAME}_{prompt_eng}/{fault_category}' # model result path
+warm_start = diag_conf.get('warm_start', False)
+# warm-start runs get their own result directory so they are never scored as cold runs
+run_name = f'{MODEL_NAME}_{prompt_eng}_warm' if warm_start else f'{MODEL_NAME}_{prompt_eng}'
+diag_path = f'{workspace_path}/{run_name}/{fault_category}' # model result path
 
 max_iterations = diag_conf['max_iterations']
+configure_metrics(config.metrics)
+metrics_jsonl_path = config.metrics.get("jsonl_path")
+if diag_conf.get('case_cache_mb') is not None:
+    case_cache.max_bytes = int(diag_conf['case_cache_mb'] * 1024 * 1024) or None
 
 print("✅ Configuration loading completed, with the following parameters")
 print(f"Model：{MODEL_NAME} | Fault type：{fault_category} | Max iter：{max_iterations}")
 print(f"workspace path：{workspace_path} | output path：{diag_path}")
 
+# Run settings next to the results, so evaluation can group token/cost figures by strategy
+os.makedirs(diag_path, exist_ok=True)
+with open(os.path.join(diag_path, "run_config.json"), "w", encoding="utf-8") as f:
+    json.dump({
+        "model": MODEL_NAME,
+        "prompt_strategy": prompt_eng,
+        "fault_category": fault_category,
+        "max_iterations": max_iterations,
+        "temperature": llm_conf['temperature'],
+        "max_tokens": llm_conf['max_tokens'],
+        "prices": llm_conf.get('prices') or {},
+        "warm_start": warm_start,
+        "warm_start_steps": WARM_START_STEPS if warm_start else [],
+        "memoize": bool((diag_conf.get('memoize') or {}).get('enabled', False)),
+        "case_filter": diag_conf.get('case_filter') or {},
+    }, f, indent=2)
+
 
 
 langfuse = get_client()
@@ -54,88 +105,125 @@ except Exception as e:
 CrewAIInstrumentor().instrument(skip_dep_check=True)
 
 
-dir_contents = os.listdir(fault_path)
-print(dir_contents)
-for fault_case in dir_contents:
+# Cases come from the prebuilt catalog; diagnosis.case_filter narrows them, e.g. {root_cause: oom_killed}
+case_catalog = load_catalog(f'{workspace_path}/benchmark').filter(category=fault_category, **(diag_conf.get('case_filter') or {}))
+print(case_catalog.case_ids())
+
+# The system prompt is the same for every case of the category
+if prompt_eng=='base':prompt=agent_prompt
+elif prompt_eng=='cot':prompt=get_cot_prompt()
+elif prompt_eng=='rag':prompt=get_rag_prompt()
+elif prompt_eng=='icl':
+    demo_path=f'{workspace_path}/expert-trajectory/{fault_category}'
+    prompt=get_icl_prompt(demo_path,fault_path)
+else:
+    print('choose correct prompt_strategy')
+print(prompt)
+
+
+def run_case(case_entry):
+    """Diagnose one catalog case; writes its trace.json (or trace_error.json) under diag_path."""
+    fault_case = case_entry["case"]
     path = os.path.join(fault_path, fault_case)
-    meta_path = os.path.join(path, "metadata.json")
-
-    if prompt_eng=='base':prompt=agent_prompt
-    elif prompt_eng=='cot':prompt=get_cot_prompt()
-    elif prompt_eng=='rag':prompt=get_rag_prompt()
-    elif prompt_eng=='icl':
-        demo_path=f'{workspace_path}/expert-trajectory/{fault_category}'
-        prompt=get_icl_prompt(demo_path,fault_path)
-    else:
-        print('choose correct prompt_strategy')
-    print(prompt)
-    tools_list = create_k8s_tools(path)
     diag_case_path=os.path.join(diag_path,fault_case)
     os.makedirs(diag_case_path,exist_ok=True)
     trace_path=os.path.join(diag_case_path, "trace.json")
-    if os.path.exists(trace_path): 
-        continue
-    else:
-        trace_errir_path=os.path.join(diag_case_path, "trace_error.json")
-        with open(meta_path, 'r', encoding='utf-8') as f:
-            metadata_data = json.load(f)
-        query=metadata_data.get("query", "")
-        ns=metadata_data.get("namespace", "")
-        k8s_diagnoser_agent = Agent(
-            role="Kubernetes Troubleshooting Expert",
-            goal="Identify the root cause of Kubernetes microservice failures using a systematic diagnostic methodology",
-            backstory=prompt,
-            tools=tools_list,
-            llm=myllm,
-            max_iter=max_iterations,
-            allow_delegation=False,
-            verbose=True
-        )
-        
-        diagnostic_task = Task(
-            description = f"""
-                The Kubernetes environment in namespace `{ns}` is experiencing a fault. A high-level symptom has been reported: '{query}'
-                """,
-            expected_output =expected_output,
-            agent=k8s_diagnoser_agent
-        )
-
-        k8s_crew = Crew(
-            agents=[k8s_diagnoser_agent],
-            tasks=[diagnostic_task],
-            process=Process.sequential,
-            verbose=True
-        )
-
-        print(f"=== Start Kubernetes Diagnosis Crew , Fault Case: {path} ===")
-
-        try:
-            with langfuse.start_as_current_span(name="k8s_diag") as span:
-                crewResult = k8s_crew.kickoff()
-                trace_id = span.trace_id
-                print(f"[Langfuse] Trace created with ID: {trace_id}")
-        except Exception as span_error:
-            print(f"[Langfuse] Failed to create span: {span_error}")
+    trace_errir_path=os.path.join(diag_case_path, "trace_error.json")
+    # Parallel cases cannot share the one budget controller; each gets its own
+    budget = StepBudget.from_config(budget_conf) if workers > 1 else step_budget
+    tools_list = create_k8s_tools(path, budget, diag_conf.get('memoize'), diag_conf.get('parallel_tools', False))
+    query=case_entry["query"]
+    ns=case_entry["namespace"]
+    k8s_diagnoser_agent = Agent(
+        role="Kubernetes Troubleshooting Expert",
+        goal="Identify the root cause of Kubernetes microservice failures using a systematic diagnostic methodology",
+        backstory=prompt,
+        tools=tools_list,
+        llm=build_llm(case_entry["case_id"]),
+        max_iter=max_iterations,
+        allow_delegation=False,
+        verbose=True
+    )
+    
+    task_description = f"""
+            The Kubernetes environment in namespace `{ns}` is experiencing a fault. A high-level symptom has been reported: '{query}'
+            """
+    if warm_start:
+        task_description += get_warm_start_bundle(path, ns or "boutique")[0]
+    diagnostic_task = Task(
+        description = task_description,
+        expected_output =expected_output,
+        agent=k8s_diagnoser_agent
+    )
+
+    k8s_crew = Crew(
+        agents=[k8s_diagnoser_agent],
+        tasks=[diagnostic_task],
+        process=Process.sequential,
+        verbose=True
+    )
+
+    print(f"=== Start Kubernetes Diagnosis Crew , Fault Case: {path} ===")
+    if budget:
+        budget.start()
+
+    trace_id = None
+    try:
+        with langfuse.start_as_current_span(name="k8s_diag") as span:
             crewResult = k8s_crew.kickoff()
-        print(crewResult)
-        langfuse.flush()
-        if trace_id:
-            max_retries = 5
-            retry_delay = 2
-            for attempt in range(max_retries):
-                try:
-                    langfuse_client = get_client()
-                    trace = langfuse_client.api.trace.get(trace_id)
-
-                    if trace:
-                        with open(trace_path, "w") as f:
-                            json.dump(trace.dict() if hasattr(trace, "dict") else trace,f, indent=2, default=str)
-                        break
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                    else:
-                        with open(trace_errir_path, "w") as f:
-                            f.write(f"Failed to retrieve trace: {e}")
+            trace_id = span.trace_id
+            print(f"[Langfuse] Trace created with ID: {trace_id}")
+    except Exception as span_error:
+        print(f"[Langfuse] Failed to create span: {span_error}")
+        crewResult = k8s_crew.kickoff()
+    print(crewResult)
+    if budget:
+        with open(os.path.join(diag_case_path, "budget.json"), "w", encoding="utf-8") as f:
+            json.dump(budget.summary(), f, indent=2)
+    langfuse.flush()
+    if trace_id:
+        max_retries = 5
+        retry_delay = 2
+        for attempt in range(max_retries):
+            try:
+                langfuse_client = get_client()
+                trace = langfuse_client.api.trace.get(trace_id)
 
-    
+                if trace:
+                    trace_data = trace.dict() if hasattr(trace, "dict") else trace
+                    with open(trace_path, "w") as f:
+                        json.dump(trace_data,f, indent=2, default=str)
+                    # compact sidecar so evaluation never has to parse the full dump
+                    write_trace_index(diag_case_path, trace_data)
+                    break
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    time.sleep(retry_delay)
+                else:
+                    with open(trace_errir_path, "w") as f:
+                        f.write(f"Failed to retrieve trace: {e}")
+    if metrics_jsonl_path:
+        # Only this case's calls: other cases may be running alongside it
+        tool_metrics.write_jsonl(metrics_jsonl_path, case=f"{fault_category}/{fault_case}", model=MODEL_NAME,
+                                 case_cache=case_cache.stats())
+
+
+# Cases that already have a trace are done
+pending = [entry for entry in case_catalog if not os.path.exists(os.path.join(diag_path, entry["case"], "trace.json"))]
+if workers == 1:
+    for case_entry in pending:
+        run_case(case_entry)
+else:
+    # Longest first, so no worker is left running a long case alone at the end of the sweep
+    schedule = longest_first([entry["case_id"] for entry in pending], CostModel.from_workspace(workspace_path, case_catalog))
+    print(f"{len(schedule)} cases on {workers} workers, estimated makespan {makespan(schedule, workers):.0f}s")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_case, case_catalog.get(case_id)): case_id for case_id, _ in schedule}
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                print(f"❌ {futures[future]} failed: {future.exception()}")
+                # Mark the case finished, so `evaluation.py --watch` does not wait for it forever
+                failed_case_path = os.path.join(diag_path, case_catalog.get(futures[future])["case"])
+                os.makedirs(failed_case_path, exist_ok=True)
+                with open(os.path.join(failed_case_path, "trace_error.json"), "w") as f:
+                    f.write(f"Diagnosis failed: {future.exception()}")
@@ -0,0 +1,289 @@
+"""
+OpenAI-compatible stand-in LLM for offline load tests of the diagnosis loop.
+
+The server replays the expert trajectories in expert-trajectory/ as ReAct tool calls
+(Thought / Action / Action Input), one call per turn, and finishes with a
+`top_3_predictions` JSON following RCA_candidate.expected_output.
+
+The case is taken from the `X-OpsBench-Case` header ("scheduling/3"), which main.py
+sends. Without it, the namespace and symptom in the task description must match exactly
+one case; most symptoms are shared by many cases, so such a request is rejected (HTTP 400)
+rather than answered with a guessed case's trajectory and ground truth.
+
+Run:   python mock_llm.py --port 8001 --latency-ms 200 --tokens-per-s 80
+Then set in config.yaml:  llm.api_base: "http://127.0.0.1:8001/v1", llm.model: "openai/mock-expert", llm.api_key: "mock"
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalog import load_catalog
+from tools.store import parse_expert_call
+
+MODEL_ID = "mock-expert"
+CASE_HEADER = "X-OpsBench-Case"
+_SYMPTOM_RE = re.compile(r"symptom has been reported: '(.*?)'", re.S)
+_NAMESPACE_RE = re.compile(r"namespace `([^`]+)`")
+
+
+class CaseNotResolved(ValueError):
+    pass
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough BPE ratio; good enough for load accounting
+    return max(1, len(text) // 4)
+
+
+class ExpertReplay:
+    """Index of the benchmark cases and their expert trajectories."""
+
+    def __init__(self, benchmark_root: str = "benchmark", trajectory_root: str = "expert-trajectory",
+                 accuracy: float = 1.0, seed: int = 0):
+        self.benchmark_root = benchmark_root
+        self.trajectory_root = trajectory_root
+        self.accuracy = accuracy
+        self.seed = seed
+        self.cases: Dict[str, Dict[str, Any]] = {}
+        self.by_symptom: Dict[Tuple[str, str], List[str]] = {}
+        self.root_causes: Dict[str, List[Dict[str, str]]] = {}
+
+        for entry in load_catalog(benchmark_root):
+            case_id, category = entry["case_id"], entry["category"]
+            result = {key: entry[key] for key in ("fault_taxonomy", "fault_object", "root_cause")}
+            self.cases[case_id] = {"namespace": entry["namespace"], "query": entry["query"], "result": result}
+            key = (entry["namespace"], entry["query"].strip())
+            self.by_symptom.setdefault(key, []).append(case_id)
+            if result not in self.root_causes.setdefault(category, []):
+                self.root_causes[category].append(result)
+        for case_ids in self.by_symptom.values():
+            case_ids.sort()
+
+    def resolve_case(self, messages: List[Dict[str, Any]], header_case: Optional[str] = None) -> str:
+        """The case of a conversation; raises CaseNotResolved unless exactly one case matches."""
+        if header_case:
+            if header_case not in self.cases:
+                raise CaseNotResolved(f"Unknown case in {CASE_HEADER}: {header_case}")
+            return header_case
+        text = "\n".join(_content_text(m) for m in messages if m.get("role") in ("system", "user"))
+        match = _SYMPTOM_RE.search(text)
+        ns_match = _NAMESPACE_RE.search(text)
+        candidates = []
+        if match:
+            candidates = self.by_symptom.get((ns_match.group(1) if ns_match else "boutique", match.group(1).strip()), [])
+        if not candidates:
+            candidates = sorted(case_id for (ns, query), ids in self.by_symptom.items()
+                                if query and query in text for case_id in ids)
+        if len(candidates) != 1:
+            found = f"{len(candidates)} cases match the symptom" if candidates else "no case matches the symptom"
+            raise CaseNotResolved(f"Cannot identify the fault case ({found}); send it in the {CASE_HEADER} header")
+        return candidates[0]
+
+    @functools.lru_cache(maxsize=4096)
+    def expert_calls(self, case_id: str) -> Tuple[Tuple[str, str], ...]:
+        """(tool name, JSON arguments) of the case's first expert path."""
+        path = os.path.join(self.trajectory_root, *case_id.split("/"), "path1.json")
+        if not os.path.exists(path):
+            return ()
+        with open(path, "r", encoding="utf-8") as f:
+            trace = json.load(f).get("diagnostic_trace", [])
+        calls = []
+        for step in trace:
+            tool_name, args = parse_expert_call(step["calling"])
+            args = {k: v for k, v in args.items() if v is not None}
+            calls.append((tool_name, json.dumps(args, ensure_ascii=False)))
+        return tuple(calls)
+
+    def final_answer(self, case_id: str) -> Dict[str, Any]:
+        metadata = self.cases[case_id]
+        truth = metadata.get("result", {})
+        category = case_id.split("/")[0]
+        rng = random.Random(f"{self.seed}:{case_id}")
+        alternatives = [r for r in self.root_causes.get(category, []) if r != truth]
+        rng.shuffle(alternatives)
+        ranked = [truth] + alternatives[:2]
+        if len(ranked) > 1 and rng.random() >= self.accuracy:
+            ranked[0], ranked[1] = ranked[1], ranked[0]
+        return {
+            "key_evidence_summary": f"Replayed expert diagnosis for symptom: {metadata.get('query', '')}",
+            "top_3_predictions": [
+                {"rank": i, "fault_taxonomy": r.get("fault_taxonomy", ""),
+                 "fault_object": r.get("fault_object", ""), "root_cause": r.get("root_cause", "")}
+                for i, r in enumerate(ranked, 1)
+            ],
+        }
+
+    def next_turn(self, case_id: str, step: int) -> str:
+        """ReAct text for the given turn: the step-th expert call, then the final answer."""
+        calls = self.expert_calls(case_id)
+        if step < len(calls):
+            tool_name, args = calls[step]
+            return (f"Thought: I should use {tool_name} to collect evidence for the next step.\n"
+                    f"Action: {tool_name}\n"
+                    f"Action Input: {args}")
+        answer = json.dumps(self.final_answer(case_id), ensure_ascii=False, indent=2)
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+def _content_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    replay: ExpertReplay = None
+    latency_ms: float = 0.0
+    tokens_per_s: float = 0.0
+    completion_tokens: Optional[int] = None
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": MODEL_ID, "object": "model", "owned_by": "cloud-opsbench"}]})
+        elif self.path == "/health":
+            with self.stats["lock"]:
+                self._send_json(200, {"status": "ok", **{k: v for k, v in self.stats.items() if k != "lock"}})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request["messages"]
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": {"message": f"Malformed request: {e}"}})
+            return
+
+        try:
+            case_id = self.replay.resolve_case(messages, self.headers.get(CASE_HEADER))
+        except CaseNotResolved as e:
+            print(f"❌ Rejected request: {e}", file=sys.stderr)
+            self._send_json(400, {"error": {"message": str(e)}})
+            return
+        # Each finished ReAct turn leaves one assistant message in the history
+        step = sum(1 for m in messages if m.get("role") == "assistant")
+        text = self.replay.next_turn(case_id, step)
+        prompt_tokens = sum(estimate_tokens(_content_text(m)) for m in messages)
+        completion_tokens = self.completion_tokens or estimate_tokens(text)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get("model", MODEL_ID)
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            self._stream(completion_id, model, text, completion_tokens, usage if include_usage else None)
+            return
+        if self.tokens_per_s:
+            time.sleep(completion_tokens / self.tokens_per_s)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, completion_id: str, model: str, text: str, completion_tokens: int, usage: Optional[Dict[str, int]]):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if extra:
+                payload.update(extra)
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        # About 4 characters per token, paced at tokens_per_s
+        pieces = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        delay = (completion_tokens / self.tokens_per_s) / len(pieces) if self.tokens_per_s else 0.0
+        chunk({"role": "assistant", "content": ""})
+        for piece in pieces:
+            if delay:
+                time.sleep(delay)
+            chunk({"content": piece})
+        chunk({}, finish_reason="stop")
+        if usage:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def create_mock_server(replay: ExpertReplay, host: str = "127.0.0.1", port: int = 8001, latency_ms: float = 0.0,
+                       tokens_per_s: float = 0.0, completion_tokens: Optional[int] = None) -> ThreadingHTTPServer:
+    stats = {"lock": threading.Lock(), "requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    handler = type("BoundMockLLMHandler", (MockLLMHandler,), {
+        "replay": replay, "latency_ms": latency_ms, "tokens_per_s": tokens_per_s,
+        "completion_tokens": completion_tokens, "stats": stats,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM replaying Cloud-OpsBench expert trajectories")
+    parser.add_argument("--benchmark-root", default="benchmark")
+    parser.add_argument("--trajectory-root", default="expert-trajectory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before the first token of every response")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="Generation speed; 0 returns the whole answer at once")
+    parser.add_argument("--completion-tokens", type=int, help="Report this completion token count instead of an estimate")
+    parser.add_argument("--accuracy", type=float, default=1.0, help="Share of cases whose rank-1 prediction is the ground truth")
+    parser.add_argument("--seed", type=int, default=0)
+    cli_args = parser.parse_args()
+
+    expert_replay = ExpertReplay(cli_args.benchmark_root, cli_args.trajectory_root, cli_args.accuracy, cli_args.seed)
+    mock_server = create_mock_server(expert_replay, cli_args.host, cli_args.port, cli_args.latency_ms,
+                                     cli_args.tokens_per_s, cli_args.completion_tokens)
+    print(f"✅ Indexed {len(expert_replay.cases)} fault cases")
+    print(f"Mock LLM listening on http://{cli_args.host}:{cli_args.port}/v1 (model '{MODEL_ID}')")
+    try:
+        mock_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock_server.server_close()
@@ -0,0 +1,353 @@
+"""
+Performance benchmark for the harness itself (no real LLM calls).
+
+Stages, run over the whole benchmark/ tree:
+  load        KubernetesTools(case_path) per case
+  tool_calls  replay of the expert trajectories against each case
+  tools_setup create_k8s_tools(case_path) per case (needs crewai)
+  icl_prompt  get_icl_prompt() per category
+  evaluation  evaluation() per category on synthetic LLM outputs built from the ground truth
+  agent_loop  one CrewAI diagnosis of a fixed case against mock_llm.py, per repeat (needs crewai)
+
+Usage:
+  python perf_bench.py --output perf.json
+  python perf_bench.py --stages load tool_calls --baseline perf.json   # exit 1 on p95 regression
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tools.implement import KubernetesTools
+from tools.store import call_tool, parse_expert_call
+
+STAGES = ("load", "tool_calls", "tools_setup", "icl_prompt", "evaluation", "agent_loop")
+
+
+class StageSkipped(Exception):
+    pass
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_stage(fn: Callable[[Any], int], items: List[Any], memory: bool) -> Dict[str, Any]:
+    """
+    Time fn over items; fn returns how many units of work (cases, calls) it did.
+    With memory=True a second pass runs under tracemalloc, so timings are not skewed by it.
+    """
+    samples = []
+    units = 0
+    gc.collect()
+    # Stage code prints progress; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for item in items:
+            t0 = time.perf_counter()
+            units += fn(item)
+            samples.append((time.perf_counter() - t0) * 1000)
+        wall = time.perf_counter() - started
+
+        peak_kb = None
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            for item in items:
+                fn(item)
+            peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "units": units,
+        "wall_s": round(wall, 4),
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+        "max_ms": round(samples[-1], 4) if samples else 0.0,
+        "mean_ms": round(sum(samples) / len(samples), 4) if samples else 0.0,
+        "units_per_s": round(units / wall, 2) if wall > 0 else 0.0,
+        "peak_mem_kb": peak_kb,
+    }
+
+
+def list_cases(benchmark_root: str, categories: Iterable[str]) -> List[str]:
+    case_paths = []
+    for category in categories:
+        category_path = os.path.join(benchmark_root, category)
+        for case in sorted(os.listdir(category_path), key=lambda n: (len(n), n)):
+            case_path = os.path.join(category_path, case)
+            if os.path.exists(os.path.join(case_path, "tool_cache.json")):
+                case_paths.append(case_path)
+    return case_paths
+
+
+def load_expert_calls(trajectory_root: str, case_path: str) -> List[Any]:
+    """Tool calls of every expert path recorded for a case."""
+    category, case = os.path.normpath(case_path).split(os.sep)[-2:]
+    trajectory_dir = os.path.join(trajectory_root, category, case)
+    calls = []
+    if not os.path.isdir(trajectory_dir):
+        return calls
+    for name in sorted(os.listdir(trajectory_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(trajectory_dir, name), "r", encoding="utf-8") as f:
+            for step in json.load(f).get("diagnostic_trace", []):
+                calls.append(parse_expert_call(step["calling"]))
+    return calls
+
+
+def stage_load(case_paths: List[str], **_):
+    return lambda case_path: KubernetesTools(case_path) and 1, case_paths
+
+
+def stage_tool_calls(case_paths: List[str], trajectory_root: str, repeat: int, **_):
+    workloads = []
+    for case_path in case_paths:
+        calls = load_expert_calls(trajectory_root, case_path)
+        if calls:
+            workloads.append((KubernetesTools(case_path), calls * repeat))
+    if not workloads:
+        raise StageSkipped(f"no expert trajectories under {trajectory_root}")
+
+    def replay(workload):
+        k8s_tools, calls = workload
+        for tool_name, args in calls:
+            try:
+                call_tool(k8s_tools, tool_name, args)
+            except (ValueError, TypeError):
+                # Invalid calls in a trajectory still count; the tool layer rejected them
+                pass
+        return len(calls)
+    return replay, workloads
+
+
+def stage_tools_setup(case_paths: List[str], **_):
+    try:
+        from tools.definition import create_k8s_tools
+    except ImportError as e:
+        raise StageSkipped(f"crewai not importable: {e}")
+    from tools.store import case_cache
+    # The first call builds the tool prototypes; keep that out of the per-case numbers
+    create_k8s_tools(case_paths[0])
+
+    def setup(case_path):
+        # Measure a cold setup; the process-wide case cache would turn repeats into hits
+        case_cache.clear()
+        return create_k8s_tools(case_path) and 1
+    return setup, case_paths
+
+
+def stage_icl_prompt(categories: List[str], benchmark_root: str, trajectory_root: str, **_):
+    from prompt_optimization import get_icl_prompt
+    pairs = [
+        (os.path.join(trajectory_root, c), os.path.join(benchmark_root, c))
+        for c in categories if os.path.isdir(os.path.join(trajectory_root, c))
+    ]
+    if not pairs:
+        raise StageSkipped(f"no expert trajectories under {trajectory_root}")
+    return lambda pair: get_icl_prompt(*pair) and 1, pairs
+
+
+def write_mock_results(case_paths: List[str], trajectory_root: str, out_root: str):
+    """
+    Synthetic LLM outputs for evaluation(): the expert path as the agent trace and the
+    ground truth as the top-1 prediction, laid out like a main.py result directory.
+    """
+    rng = random.Random(0)
+    for case_path in case_paths:
+        category, case = os.path.normpath(case_path).split(os.sep)[-2:]
+        out_dir = os.path.join(out_root, category, case)
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(case_path, "metadata.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        path1 = metadata.get("process", {}).get("path1", [])
+        trajectory_file = os.path.join(trajectory_root, category, case, "path1.json")
+        expert_trajectory = {"statistics": {}, "diagnostic_trace": []}
+        if os.path.exists(trajectory_file):
+            with open(trajectory_file, "r", encoding="utf-8") as f:
+                expert_trajectory = json.load(f)
+        files = {
+            "result.json": {"top_3_predictions": [metadata.get("result", {})]},
+            "llm_trace_evaluation.json": {"step": path1},
+            "llm_traj.json": expert_trajectory,
+            "trace.json": {"latency": round(rng.uniform(5, 60), 3)},
+        }
+        for name, content in files.items():
+            with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+                json.dump(content, f, ensure_ascii=False)
+
+
+def stage_evaluation(case_paths: List[str], categories: List[str], benchmark_root: str, trajectory_root: str, workdir: str, **_):
+    try:
+        from evaluation import evaluation
+    except ImportError as e:
+        raise StageSkipped(f"evaluation not importable: {e}")
+    mock_root = os.path.join(workdir, "mock_results")
+    write_mock_results(case_paths, trajectory_root, mock_root)
+    counts = {c: len(os.listdir(os.path.join(mock_root, c))) for c in categories if os.path.isdir(os.path.join(mock_root, c))}
+
+    def evaluate_category(category):
+        evaluation(os.path.join(benchmark_root, category), os.path.join(mock_root, category))
+        return counts[category]
+    return evaluate_category, list(counts)
+
+
+def stage_agent_loop(case_paths: List[str], benchmark_root: str, trajectory_root: str, repeat: int,
+                     cleanup: contextlib.ExitStack, **_):
+    try:
+        from crewai import Agent, Crew, Process, Task
+        from crewai.llm import LLM
+        from RCA_candidate import agent_prompt, expected_output
+        from tools.definition import create_k8s_tools
+    except ImportError as e:
+        raise StageSkipped(f"crewai not importable: {e}")
+    from mock_llm import CASE_HEADER, MODEL_ID, ExpertReplay, create_mock_server
+    # A fixed case, so runs are comparable: the first one with an expert trajectory
+    case_path = next((p for p in case_paths if load_expert_calls(trajectory_root, p)), None)
+    if case_path is None:
+        raise StageSkipped(f"no expert trajectories under {trajectory_root}")
+    case_id = "/".join(os.path.normpath(case_path).split(os.sep)[-2:])
+
+    server = create_mock_server(ExpertReplay(benchmark_root, trajectory_root), port=0)
+    threading.Thread(target=server.serve_forever, name="opsbench-mock-llm", daemon=True).start()
+    cleanup.callback(server.server_close)
+    cleanup.callback(server.shutdown)
+    llm = LLM(model=f"openai/{MODEL_ID}", api_base=f"http://127.0.0.1:{server.server_address[1]}/v1",
+              api_key="mock", temperature=0, extra_headers={CASE_HEADER: case_id})
+    with open(os.path.join(case_path, "metadata.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    def diagnose(_):
+        agent = Agent(role="Kubernetes Troubleshooting Expert", goal="Identify the root cause of the fault",
+                      backstory=agent_prompt, tools=create_k8s_tools(case_path), llm=llm,
+                      max_iter=30, allow_delegation=False, verbose=False)
+        task = Task(description=f"The Kubernetes environment in namespace `{metadata.get('namespace', 'boutique')}` "
+                                f"is experiencing a fault. A high-level symptom has been reported: '{metadata.get('query', '')}'",
+                    expected_output=expected_output, agent=agent)
+        Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False).kickoff()
+        return 1
+    return diagnose, list(range(max(1, repeat)))
+
+
+STAGE_BUILDERS = {
+    "load": stage_load,
+    "tool_calls": stage_tool_calls,
+    "tools_setup": stage_tools_setup,
+    "icl_prompt": stage_icl_prompt,
+    "evaluation": stage_evaluation,
+    "agent_loop": stage_agent_loop,
+}
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Stages whose p95 grew by more than `threshold` (a fraction) relative to the baseline."""
+    regressions = []
+    for stage, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or "p95_ms" not in current or not previous.get("p95_ms"):
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"]
+        current["p95_change"] = round(change, 3)
+        if change > threshold:
+            regressions.append(f"{stage}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms (+{change:.0%})")
+    return regressions
+
+
+def run_benchmark(benchmark_root: str = "benchmark", trajectory_root: str = "expert-trajectory",
+                  categories: Optional[List[str]] = None, stages: Iterable[str] = STAGES,
+                  repeat: int = 1, memory: bool = True, seed: int = 0) -> Dict[str, Any]:
+    random.seed(seed)
+    if not categories:
+        categories = sorted(d for d in os.listdir(benchmark_root) if os.path.isdir(os.path.join(benchmark_root, d)))
+    case_paths = list_cases(benchmark_root, categories)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "categories": categories,
+        "cases": len(case_paths),
+        "stages": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="opsbench-perf-")
+    # Stages register teardown (e.g. the mock LLM server) here
+    cleanup = contextlib.ExitStack()
+    context = dict(case_paths=case_paths, categories=categories, benchmark_root=benchmark_root,
+                   trajectory_root=trajectory_root, repeat=repeat, workdir=workdir, cleanup=cleanup)
+    try:
+        for stage in stages:
+            print(f"▶ {stage} ...", file=sys.stderr)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn, items = STAGE_BUILDERS[stage](**context)
+                report["stages"][stage] = run_stage(fn, items, memory)
+            except StageSkipped as e:
+                report["stages"][stage] = {"skipped": str(e)}
+    finally:
+        cleanup.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"Cases: {report['cases']} | Python {report['python']}")
+    print(f"{'stage':<12} {'iters':>6} {'units':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'units/s':>10} {'peak KB':>10}")
+    print("-" * 80)
+    for stage, r in report["stages"].items():
+        if "skipped" in r:
+            print(f"{stage:<12} skipped: {r['skipped']}")
+            continue
+        peak = r["peak_mem_kb"] if r["peak_mem_kb"] is not None else "-"
+        print(f"{stage:<12} {r['iterations']:>6} {r['units']:>7} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['units_per_s']:>10} {peak:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Cloud-OpsBench harness (no real LLM calls)")
+    parser.add_argument("--benchmark-root", default="benchmark")
+    parser.add_argument("--trajectory-root", default="expert-trajectory")
+    parser.add_argument("--categories", nargs="*", help="Fault categories to include (default: all)")
+    parser.add_argument("--stages", nargs="*", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=1, help="Replay each expert trajectory (and run the agent loop) this many times")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare p95 latencies against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p95 growth over the baseline (fraction)")
+    cli_args = parser.parse_args()
+
+    result = run_benchmark(cli_args.benchmark_root, cli_args.trajectory_root, cli_args.categories,
+                           cli_args.stages, cli_args.repeat, not cli_args.no_memory, cli_args.seed)
+    regressions = []
+    if cli_args.baseline:
+        with open(cli_args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(result, json.load(f), cli_args.threshold)
+        result["regressions"] = regressions
+    print_report(result)
+    if cli_args.output:
+        with open(cli_args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Report written to {cli_args.output}")
+    if regressions:
+        print("❌ Regressions against the baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
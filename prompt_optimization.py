@@ -8,6 +8,7 @@ from typing import List, Dict, Any
 # get_icl_prompt(case_path)
 # get_rag_prompt()
 # get_cot_prompt()
+# plus an optional warm start for any of them: get_warm_start_bundle(case_path)
 
 rag_context="""
 ## I. Pod Failure Category
@@ -350,4 +351,74 @@ IMPORTANT: When classifying the fault stage, you MUST strictly follow this defin
 Begin your investigation now.
 """.strip()
 
-    return agent_prompt
\ No newline at end of file
+    return agent_prompt
+
+
+# Steps the warm-start bundle stands in for, in the metadata.json `process` label format
+WARM_START_STEPS = ["GetResources::pods", "GetResources::nodes", "GetAlerts::"]
+
+
+def _compact_pod_table(table: str) -> str:
+    # Keep the header and every pod that is not Running with all containers ready
+    lines = [line for line in table.strip().splitlines() if line.strip()]
+    if len(lines) < 2:
+        return table.strip()
+    abnormal = []
+    for line in lines[1:]:
+        cols = line.split()
+        ready = cols[1].split("/") if len(cols) > 2 else []
+        if len(cols) < 3 or cols[2] != "Running" or len(ready) != 2 or ready[0] != ready[1]:
+            abnormal.append(line)
+    healthy = len(lines) - 1 - len(abnormal)
+    if not abnormal:
+        return "\n".join([lines[0], f"(all {healthy} pods Running with all containers ready)"])
+    return "\n".join([lines[0]] + abnormal + [f"({healthy} other pods Running with all containers ready)"])
+
+
+def _alert_summary(alerts: Any) -> str:
+    if isinstance(alerts, str):
+        try:
+            alerts = json.loads(alerts)
+        except ValueError:
+            return alerts.strip()
+    items = alerts.get("alerts", []) if isinstance(alerts, dict) else []
+    if not items:
+        return "No active alerts."
+    lines = []
+    for alert in items:
+        evidence = "; ".join(alert.get("evidence", []))
+        lines.append(f"- [{alert.get('type', '')}] {alert.get('name', '')} {alert.get('status', '')} "
+                     f"({alert.get('time_range', '')}): {evidence}")
+    return "\n".join(lines)
+
+
+def get_warm_start_bundle(case_path: str, namespace: str = "boutique"):
+    """
+    "Initial situation" of a case, read from its tool_cache.json: abnormal pods, node
+    status and an alert summary. Appended to the task description, it replaces the
+    first survey calls (WARM_START_STEPS) almost every expert trajectory starts with.
+    :return: (bundle text, WARM_START_STEPS)
+    """
+    from tools.metrics import tool_metrics
+    from tools.store import load_case
+
+    # The agent's tools load the same case; both get one instance from the case cache
+    k8s_tools = load_case(case_path)
+    # These are not agent tool calls; keep them out of the call and hit-rate metrics
+    with tool_metrics.paused():
+        pods = k8s_tools.GetResources(resource_type="pods", namespace=namespace)
+        nodes = k8s_tools.GetResources(resource_type="nodes", namespace=namespace)
+        alerts = k8s_tools.GetAlerts()
+    bundle = f"""
+Initial situation (collected automatically before the diagnosis started; no need to re-run these queries):
+[Pods in namespace `{namespace}` (GetResources pods)]
+{_compact_pod_table(pods)}
+
+[Nodes (GetResources nodes)]
+{nodes.strip()}
+
+[Active alerts (GetAlerts)]
+{_alert_summary(alerts)}
+"""
+    return bundle, list(WARM_START_STEPS)
+
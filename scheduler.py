@@ -0,0 +1,141 @@
+"""
+Cost-aware ordering of benchmark cases for parallel diagnosis sweeps.
+
+Case costs differ a lot: performance cases carry large logs and long expert
+paths, startup cases are short. Dispatched in directory order, a long case that
+starts last keeps one worker busy while the others sit idle. Dispatching
+longest-first (LPT) to whichever worker frees up next keeps the makespan within
+4/3 of the optimum when the costs are exact.
+
+CostModel estimates a case's wall-clock seconds from earlier runs in the
+workspace, i.e. the trace_index.json next to every <run>/<category>/<case>/trace.json
+(trace_reader.load_trace_index):
+
+  1. the median latency of the case's own past runs, when it has any
+  2. otherwise seconds per tool step x expected steps. The rate comes from the past
+     runs of the same root cause, else the category, else all runs, else
+     DEFAULT_SECONDS_PER_STEP. The steps are the mean expert path length from the catalog.
+
+    python scheduler.py --workspace . --category performance --workers 4
+"""
+import argparse
+import heapq
+import os
+import statistics
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from catalog import Catalog, load_catalog
+from trace_reader import load_trace_index
+
+# Rate used when the workspace holds no finished runs at all
+DEFAULT_SECONDS_PER_STEP = 10.0
+
+
+def load_history(workspace_path: str, case_ids: Iterable[str]) -> Dict[str, List[Tuple[float, int]]]:
+    """{case_id: [(latency seconds, tool steps), ...]} of every finished run of the cases in the workspace."""
+    wanted = {}
+    for case_id in case_ids:
+        category, _, case = case_id.partition("/")
+        wanted.setdefault(category, set()).add(case)
+    history: Dict[str, List[Tuple[float, int]]] = {}
+    for run in sorted(os.listdir(workspace_path)):
+        for category, cases in wanted.items():
+            run_path = os.path.join(workspace_path, run, category)
+            if not os.path.isdir(run_path):
+                continue
+            for case in os.listdir(run_path):
+                if case not in cases:
+                    continue
+                index = load_trace_index(os.path.join(run_path, case))
+                if index and index.get("latency"):
+                    history.setdefault(f"{category}/{case}", []).append(
+                        (float(index["latency"]), len(index.get("tool_calls", []))))
+    return history
+
+
+class CostModel:
+    def __init__(self, catalog: Catalog, history: Dict[str, List[Tuple[float, int]]]):
+        self.catalog = catalog
+        self.history = history
+        # (field, value) -> [total seconds, total steps] over the past runs of that group
+        self._rates: Dict[Tuple[str, Any], List[float]] = {}
+        for case_id, runs in history.items():
+            entry = catalog.get(case_id)
+            if entry is None:
+                continue
+            for group in (("root_cause", entry["root_cause"]), ("category", entry["category"]), ("all", None)):
+                totals = self._rates.setdefault(group, [0.0, 0])
+                for latency, steps in runs:
+                    totals[0] += latency
+                    totals[1] += steps
+
+    @classmethod
+    def from_workspace(cls, workspace_path: str, catalog: Optional[Catalog] = None) -> "CostModel":
+        catalog = catalog if catalog is not None else load_catalog(os.path.join(workspace_path, "benchmark"))
+        return cls(catalog, load_history(workspace_path, catalog.case_ids()))
+
+    def seconds_per_step(self, entry: Dict[str, Any]) -> float:
+        for group in (("root_cause", entry["root_cause"]), ("category", entry["category"]), ("all", None)):
+            seconds, steps = self._rates.get(group, (0.0, 0))
+            if steps:
+                return seconds / steps
+        return DEFAULT_SECONDS_PER_STEP
+
+    def estimate(self, case_id: str) -> float:
+        """Expected wall-clock seconds of one diagnosis of the case."""
+        runs = self.history.get(case_id)
+        if runs:
+            return statistics.median(latency for latency, _ in runs)
+        entry = self.catalog.get(case_id)
+        if entry is None:
+            return self.seconds_per_step({"root_cause": None, "category": None})
+        lengths = entry["expert_path_lengths"] or [1]
+        return self.seconds_per_step(entry) * statistics.mean(lengths)
+
+
+def longest_first(case_ids: Iterable[str], cost_model: CostModel) -> List[Tuple[str, float]]:
+    """(case_id, estimated seconds), most expensive first; a worker pool draining this order runs LPT."""
+    costs = [(case_id, cost_model.estimate(case_id)) for case_id in case_ids]
+    return sorted(costs, key=lambda item: (-item[1], item[0]))
+
+
+def simulate(costs: Sequence[Tuple[str, float]], workers: int) -> List[Tuple[float, List[str]]]:
+    """
+    Dispatch the cases in the given order, each to the worker that frees up first.
+    Returns (busy seconds, case_ids) per worker; the largest busy time is the makespan.
+    """
+    queue = [(0.0, worker) for worker in range(max(1, workers))]
+    assigned: List[List[str]] = [[] for _ in queue]
+    loads = [0.0] * len(queue)
+    for case_id, cost in costs:
+        load, worker = heapq.heappop(queue)
+        assigned[worker].append(case_id)
+        loads[worker] = load + cost
+        heapq.heappush(queue, (loads[worker], worker))
+    return list(zip(loads, assigned))
+
+
+def makespan(costs: Sequence[Tuple[str, float]], workers: int) -> float:
+    return max(load for load, _ in simulate(costs, workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate case costs from past runs and plan a longest-first sweep")
+    parser.add_argument("--workspace", default=".", help="Directory holding benchmark/ and the <model>_<strategy> result trees")
+    parser.add_argument("--category", nargs="*", help="Categories of the sweep (default: all)")
+    parser.add_argument("--workers", type=int, default=4)
+    cli_args = parser.parse_args()
+
+    case_catalog = load_catalog(os.path.join(cli_args.workspace, "benchmark"))
+    if cli_args.category:
+        case_catalog = case_catalog.filter(category=cli_args.category)
+    model = CostModel(case_catalog, load_history(cli_args.workspace, case_catalog.case_ids()))
+    ordered = longest_first(case_catalog.case_ids(), model)
+    position = {case_id: i for i, case_id in enumerate(case_catalog.case_ids())}
+    in_catalog_order = sorted(ordered, key=lambda item: position[item[0]])
+    print(f"{len(ordered)} cases, {len(model.history)} with past runs, {cli_args.workers} workers")
+    print(f"Estimated makespan: catalog order {makespan(in_catalog_order, cli_args.workers):.0f}s, "
+          f"longest-first {makespan(ordered, cli_args.workers):.0f}s "
+          f"(total work {sum(cost for _, cost in ordered):.0f}s)")
+    for case_id, cost in ordered:
+        print(f"{cost:>8.1f}s  {case_id}")
@@ -0,0 +1,212 @@
+"""
+Cross-signal anomaly ranking of the services and nodes of a case.
+
+Performance and infrastructure evidence is spread over raw_data/alert.json,
+raw_data/metrics.csv and the per-service error-log summaries. Without this
+module the agent reads it with one GetAlerts/GetErrorLogs call per service.
+rank_anomalies scores every entity on three signals, each in [0, 1]:
+
+  * alert   - the entity has an ABNORMAL alert, scaled by its largest deviation
+  * metric  - the largest robust deviation of its metrics.csv columns inside the
+              anomaly window (the alert time range, else the last two thirds of
+              the samples) from the rows before it: |median shift| / (1.4826 * MAD)
+  * logs    - the error ratio of its error-log summary, damped for few errors
+
+and ranks them by a weighted sum. Scores that round to the same value are
+ordered by the call graph, most downstream anomalous service first, since
+cascading faults start downstream. Each service is shown with the node it runs
+on, so faults shared by co-located services point at the node.
+metrics.csv is small (about 50 rows x 111 columns), so the columns are plain
+float lists and the statistics come from the standard library.
+"""
+import csv
+import json
+import math
+import re
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+from .k8s_model import render_table
+
+WEIGHTS = {"alert": 0.4, "metric": 0.4, "logs": 0.2}
+# Entities scoring at least this much count as anomalous for the call-graph tie-break
+ANOMALOUS_SCORE = 0.3
+# Metrics where only one direction is a symptom
+_ONLY_DROP = ("success_rate",)
+_ONLY_RISE = ("latency",)
+_PERCENT = re.compile(r"\(([+-]?\d+(?:\.\d+)?)%\)")
+_TIME_RANGE = re.compile(r"^\s*(.+?)\s*~\s*(.+?)\s*$")
+
+
+def load_metrics(path: str) -> Tuple[List[str], Dict[str, List[Optional[float]]]]:
+    """metrics.csv -> (timestamps, {column: values}); empty cells are None."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return [], {}
+    header, body = rows[0], [row for row in rows[1:] if row]
+    times = [row[0] for row in body]
+    columns = {}
+    for i, column in enumerate(header[1:], 1):
+        columns[column] = [float(row[i]) if i < len(row) and row[i] != "" else None for row in body]
+    return times, columns
+
+
+def split_entity(column: str) -> Tuple[str, str]:
+    """`worker-01-cpu` -> ("worker-01", "cpu")."""
+    entity, _, metric = column.rpartition("-")
+    return entity, metric
+
+
+def alert_window(alerts: List[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+    # Timestamps share one "YYYY-MM-DD HH:MM:SS" format, so strings compare in time order
+    windows = []
+    for alert in alerts:
+        match = _TIME_RANGE.match(alert.get("time_range") or "")
+        if match:
+            windows.append(match.groups())
+    if not windows:
+        return None
+    return min(w[0] for w in windows), max(w[1] for w in windows)
+
+
+def metric_deviations(times: List[str], columns: Dict[str, List[Optional[float]]],
+                      window: Optional[Tuple[str, str]] = None) -> Dict[str, Tuple[float, Optional[float]]]:
+    """
+    {column: (robust deviation, relative change of the median)} of the anomaly window against
+    the baseline; the change is None when the baseline median is 0.
+    """
+    if window is not None:
+        baseline_rows = [i for i, t in enumerate(times) if t < window[0]]
+        anomaly_rows = [i for i, t in enumerate(times) if window[0] <= t <= window[1]]
+    else:
+        cut = len(times) // 3
+        baseline_rows, anomaly_rows = list(range(cut)), list(range(cut, len(times)))
+    deviations = {}
+    if len(baseline_rows) < 3 or not anomaly_rows:
+        return deviations
+    for column, values in columns.items():
+        baseline = [values[i] for i in baseline_rows if values[i] is not None]
+        anomaly = [values[i] for i in anomaly_rows if values[i] is not None]
+        if len(baseline) < 3 or not anomaly:
+            continue
+        base = statistics.median(baseline)
+        shift = statistics.median(anomaly) - base
+        metric = split_entity(column)[1]
+        if (metric.endswith(_ONLY_DROP) and shift > 0) or (metric.endswith(_ONLY_RISE) and shift < 0):
+            continue
+        mad = statistics.median(abs(v - base) for v in baseline)
+        # The relative floor keeps near-constant baselines from turning noise into huge scores
+        scale = 1.4826 * mad + 0.05 * abs(base) + 1e-9
+        deviations[column] = (abs(shift) / scale, shift / abs(base) if base else None)
+    return deviations
+
+
+def _deviation(deviation: float) -> str:
+    return f"{deviation:.1f}" if deviation < 1000 else ">999"
+
+
+def _change(change: Optional[float]) -> str:
+    return "up from 0" if change is None else f"{change:+.0%}"
+
+
+def _error_summary(value: Any) -> Dict[str, Any]:
+    # Cached GetErrorLogs values are a dict, a JSON string of one, or "" when nothing was logged
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value.strip() else {}
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+class Suspect:
+    __slots__ = ("name", "kind", "node", "alert", "metric", "logs", "score", "evidence")
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.node = ""
+        self.alert = self.metric = self.logs = self.score = 0.0
+        self.evidence: List[str] = []
+
+
+def rank_anomalies(alerts: List[Dict[str, Any]], services: List[str],
+                   metrics: Optional[Tuple[List[str], Dict[str, List[Optional[float]]]]] = None,
+                   error_logs: Optional[Dict[str, Any]] = None, graph: Any = None,
+                   placement: Optional[Dict[str, str]] = None) -> List[Suspect]:
+    """
+    Score every service and node. `metrics` is load_metrics() output, `error_logs` maps a
+    service to its error-log summary, `graph` is an optional tools.dependency_graph.ServiceGraph
+    and `placement` maps a service to the node its pod runs on.
+    """
+    suspects: Dict[str, Suspect] = {name: Suspect(name, "Service") for name in services}
+
+    def suspect(name: str, kind: str) -> Suspect:
+        if name not in suspects:
+            suspects[name] = Suspect(name, kind)
+        return suspects[name]
+
+    for alert in alerts:
+        if alert.get("status", "ABNORMAL") != "ABNORMAL" or not alert.get("name"):
+            continue
+        entry = suspect(alert["name"], alert.get("type") or "Service")
+        evidence = alert.get("evidence") or []
+        largest = max((abs(float(p)) for e in evidence for p in _PERCENT.findall(e)), default=0.0)
+        entry.alert = max(entry.alert, 0.5 + 0.25 * min(2.0, math.log10(1 + largest / 100)))
+        entry.evidence.extend(e.split(" | ")[0] for e in evidence[:2])
+
+    if metrics is not None:
+        times, columns = metrics
+        per_entity: Dict[str, List[Tuple[float, Optional[float], str]]] = {}
+        for column, (deviation, change) in metric_deviations(times, columns, alert_window(alerts)).items():
+            entity, metric = split_entity(column)
+            per_entity.setdefault(entity, []).append((deviation, change, metric))
+        for entity, deviations in per_entity.items():
+            kind = "Service" if entity in suspects and suspects[entity].kind == "Service" else "Node"
+            entry = suspect(entity, kind)
+            deviations.sort(key=lambda d: d[0], reverse=True)
+            top = deviations[0][0]
+            entry.metric = top / (top + 5)
+            entry.evidence.extend(f"{m} {_change(c)} (dev {_deviation(d)})" for d, c, m in deviations[:2] if d >= 3)
+
+    for service, value in (error_logs or {}).items():
+        summary = _error_summary(value)
+        errors = summary.get("total_errors") or 0
+        if not errors:
+            continue
+        entry = suspect(service, "Service")
+        entry.logs = float(summary.get("total_error_ratio") or 0.0) * min(1.0, errors / 10)
+        patterns = summary.get("patterns") or []
+        sample = (patterns[0].get("sample") or "")[:80] if patterns else ""
+        entry.evidence.append(f"{errors} error logs ({entry.logs:.0%} weighted)" + (f": {sample}" if sample else ""))
+
+    for entry in suspects.values():
+        entry.score = sum(weight * getattr(entry, signal) for signal, weight in WEIGHTS.items())
+        entry.node = (placement or {}).get(entry.name, "") if entry.kind == "Service" else ""
+
+    def anomalous_downstream(entry: Suspect) -> int:
+        if graph is None or entry.name not in graph:
+            return 0
+        return sum(1 for d in graph.downstream(entry.name) if d in suspects and suspects[d].score >= ANOMALOUS_SCORE)
+
+    return sorted(suspects.values(), key=lambda s: (-round(s.score, 2), anomalous_downstream(s), s.name))
+
+
+def render_ranking(ranking: List[Suspect], sources: List[str], top: int = 10) -> str:
+    scored = [s for s in ranking if s.score > 0]
+    if not scored:
+        return f"No anomalies found in {', '.join(sources) or 'any signal'}: every service and node looks normal."
+    lines = [f"[Anomaly Ranking] {len(scored)} of {len(ranking)} entities show anomalies "
+             f"(signals: {', '.join(sources)}; score = "
+             + " + ".join(f"{w} x {s}" for s, w in WEIGHTS.items()) + ")"]
+    rows = [[str(i), s.name, s.kind, s.node or "-", f"{s.score:.2f}", f"{s.alert:.2f}", f"{s.metric:.2f}", f"{s.logs:.2f}"]
+            for i, s in enumerate(scored[:top], 1)]
+    lines.append(render_table(["RANK", "ENTITY", "TYPE", "NODE", "SCORE", "ALERT", "METRIC", "LOGS"], rows).rstrip("\n"))
+    lines.append("[Evidence]")
+    for i, s in enumerate(scored[:top], 1):
+        lines.append(f"{i}. {s.name}: " + ("; ".join(s.evidence) or "weak signals only"))
+    if scored[0].score < ANOMALOUS_SCORE:
+        lines.append("[Note] No entity has a strong telemetry anomaly. The fault may stop Pods from running at all "
+                     "(scheduling, startup, admission); check their states with GetResources.")
+    return "\n".join(lines)
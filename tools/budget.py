@@ -0,0 +1,211 @@
+"""
+Per-case step budget for the diagnosis agent.
+
+`max_iter` is the only bound CrewAI puts on an agent, so a case that keeps
+re-running the same tool call burns every iteration. StepBudget sits between
+the tools and KubernetesTools and watches the calls as they happen:
+
+  * an identical repeat of an earlier call is not executed again; the agent is
+    pointed at the earlier step instead
+  * `stall_patience` consecutive calls that produce nothing new (an output seen
+    before, or an error) count as a stall
+  * the per-case token and wall-clock budgets are checked on every call
+
+Once the repeat limit, a stall or a budget is hit, every further tool call
+returns FINAL_ANSWER_DIRECTIVE so the agent stops investigating and answers
+with the evidence it has.
+"""
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .store import TOOL_NAMES
+
+FINAL_ANSWER_DIRECTIVE = (
+    "STOP: the diagnosis budget for this case is exhausted ({reason}). "
+    "Do not call any more tools. Give your Final Answer now, in the required output format, "
+    "based on the evidence you have already gathered."
+)
+REPEAT_NOTICE = (
+    "You already made this exact call at step {step} and its output has not changed. "
+    "Re-read that observation instead of repeating the call, or try a different tool or argument."
+)
+
+
+class StepBudget:
+    """
+    :param max_repeats: identical repeated calls tolerated before forcing the answer (0 disables)
+    :param stall_patience: consecutive calls without new output tolerated (0 disables)
+    :param max_tokens: per-case LLM token budget, fed by record_usage (0 disables)
+    :param max_seconds: per-case wall-clock budget from start() (0 disables)
+    """
+
+    def __init__(self, max_repeats: int = 2, stall_patience: int = 4,
+                 max_tokens: int = 0, max_seconds: float = 0):
+        self.max_repeats = max_repeats
+        self.stall_patience = stall_patience
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        """Reset the counters; call once per case before the agent runs."""
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.steps = 0
+            self.repeats = 0
+            self.no_progress = 0
+            self.tokens = 0
+            self.stop_reason: Optional[str] = None
+            self.forced_calls = 0
+            self._seen_calls: Dict[tuple, int] = {}
+            self._seen_outputs = set()
+
+    @classmethod
+    def from_config(cls, budget_conf: Optional[Dict[str, Any]]) -> Optional["StepBudget"]:
+        """Build from the optional `diagnosis.budget` section of config.yaml; None when disabled."""
+        budget_conf = budget_conf or {}
+        if not budget_conf.get("enabled", False):
+            return None
+        return cls(
+            max_repeats=budget_conf.get("max_repeats", 2),
+            stall_patience=budget_conf.get("stall_patience", 4),
+            max_tokens=budget_conf.get("max_tokens", 0),
+            max_seconds=budget_conf.get("max_seconds", 0),
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def record_usage(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        with self._lock:
+            self.tokens += int(prompt_tokens or 0) + int(completion_tokens or 0)
+
+    def _check_limits(self):
+        # Called with the lock held; the first reason to trip is kept
+        if self.stop_reason:
+            return
+        if self.max_repeats and self.repeats > self.max_repeats:
+            self.stop_reason = f"{self.repeats} repeated identical tool calls"
+        elif self.stall_patience and self.no_progress >= self.stall_patience:
+            self.stop_reason = f"{self.no_progress} consecutive tool calls returned nothing new"
+        elif self.max_tokens and self.tokens >= self.max_tokens:
+            self.stop_reason = f"token budget of {self.max_tokens} reached"
+        elif self.max_seconds and self.elapsed >= self.max_seconds:
+            self.stop_reason = f"time budget of {self.max_seconds}s reached"
+
+    def guard(self, tool_name: str, call_key: tuple, execute: Callable[[], Any]) -> Any:
+        """Run one tool call under the budget; returns the tool output or a notice for the agent."""
+        with self._lock:
+            self._check_limits()
+            if self.stop_reason:
+                self.forced_calls += 1
+                return FINAL_ANSWER_DIRECTIVE.format(reason=self.stop_reason)
+            self.steps += 1
+            step = self.steps
+            earlier_step = self._seen_calls.get(call_key)
+            if earlier_step is not None:
+                return self._repeat() or REPEAT_NOTICE.format(step=earlier_step)
+            self._seen_calls[call_key] = step
+
+        output = execute()
+
+        text = str(output)
+        digest = hashlib.sha1(text.encode("utf-8", "replace")).digest()
+        with self._lock:
+            if digest in self._seen_outputs or text.startswith("Error"):
+                self.no_progress += 1
+            else:
+                self._seen_outputs.add(digest)
+                self.no_progress = 0
+        return output
+
+    def _repeat(self) -> Optional[str]:
+        # Called with the lock held
+        self.repeats += 1
+        self.no_progress += 1
+        self._check_limits()
+        if self.stop_reason:
+            self.forced_calls += 1
+            return FINAL_ANSWER_DIRECTIVE.format(reason=self.stop_reason)
+        return None
+
+    def record_repeat(self) -> Optional[str]:
+        """
+        Count a repeated call answered above the budget (tools.memo); returns the
+        final-answer directive when this repeat exhausts the budget.
+        """
+        with self._lock:
+            self._check_limits()
+            if self.stop_reason:
+                self.forced_calls += 1
+                return FINAL_ANSWER_DIRECTIVE.format(reason=self.stop_reason)
+            self.steps += 1
+            return self._repeat()
+
+    def wrap(self, k8s_tools: Any) -> "BudgetedTools":
+        return BudgetedTools(k8s_tools, self)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "steps": self.steps,
+                "repeats": self.repeats,
+                "tokens": self.tokens,
+                "elapsed_s": round(self.elapsed, 3),
+                "stopped": self.stop_reason is not None,
+                "stop_reason": self.stop_reason,
+                "calls_after_stop": self.forced_calls,
+            }
+
+
+class BudgetedTools:
+    """KubernetesTools proxy that routes every tool method through a StepBudget."""
+
+    def __init__(self, k8s_tools: Any, budget: StepBudget):
+        self._k8s_tools = k8s_tools
+        self._budget = budget
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._k8s_tools, name)
+        if name not in TOOL_NAMES or not callable(attr):
+            return attr
+        signature = inspect.signature(attr)
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            # Positional and keyword spellings of the same call share one key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            call_key = (name, tuple(sorted((k, repr(v)) for k, v in bound.arguments.items())))
+            return self._budget.guard(name, call_key, lambda: attr(*args, **kwargs))
+        return call
+
+
+def litellm_usage_callback(budget: StepBudget):
+    """
+    LiteLLM success callback that feeds each completion's token usage into the budget;
+    pass it to `crewai.LLM(callbacks=[...])`. Imported lazily, litellm ships with crewai.
+    """
+    from litellm.integrations.custom_logger import CustomLogger
+
+    class _BudgetUsageLogger(CustomLogger):
+        def log_success_event(self, kwargs, response_obj, start_time, end_time):
+            usage = getattr(response_obj, "usage", None)
+            if usage is None and isinstance(response_obj, dict):
+                usage = response_obj.get("usage")
+            usage = usage or {}
+            if not isinstance(usage, dict):
+                usage = {"prompt_tokens": getattr(usage, "prompt_tokens", 0),
+                         "completion_tokens": getattr(usage, "completion_tokens", 0)}
+            budget.record_usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+        async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+            self.log_success_event(kwargs, response_obj, start_time, end_time)
+
+    return _BudgetUsageLogger()
@@ -1,8 +1,11 @@
+import copy
+import functools
 import os
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Optional, Type, List
-from .implement import KubernetesTools
+from typing import Any, Dict, Optional, Type, List
+from .memo import ToolResultMemo, memoized
+from .store import MAX_PARALLEL_CALLS, PARALLEL_TOOL, call_tools_parallel, load_case, render_parallel_results
 from typing import Literal
 
 BoutiqueServiceName=Literal['adservice','cartservice','checkoutservice','currencyservice','emailservice','frontend','paymentservice','productcatalogservice','recommendationservice','redis-cart','shippingservice']
@@ -13,324 +16,542 @@ ClusterScopeResource = {
 }
 NodeName=Literal['master','worker-01','worker-02','worker-03']
 SystemServiceName=Literal['kube-schedule','kubelet', 'kube-proxy','containerd']
+ToolName=Literal['GetResources','DescribeResource','GetAppYAML','GetServiceDependencies','GetServiceCallChains','GetRecentLogs','GetLogsInTimeRange','CheckServiceConnectivity','GetClusterConfiguration','GetAlerts','GetAnomalyRanking','GetErrorLogs','CheckNodeServiceStatus','SearchSnapshot']
 
-def create_k8s_tools(case_path: str):
-    if not os.path.exists(case_path):
-            raise FileNotFoundError(f"Snapshot file not found: {case_path}")
-    k8s_tools_instance = KubernetesTools(
-        case_path=case_path
+_SCHEMA_CACHE: Dict[Any, Dict[str, Any]] = {}
+
+
+class SnapshotToolInput(BaseModel):
+    """Base of the tool input models; the JSON schema is built once per model and reused for every case."""
+
+    @classmethod
+    def model_json_schema(cls, *args, **kwargs) -> Dict[str, Any]:
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        if key not in _SCHEMA_CACHE:
+            _SCHEMA_CACHE[key] = super().model_json_schema(*args, **kwargs)
+        # Callers may mutate the schema, so hand out a copy
+        return copy.deepcopy(_SCHEMA_CACHE[key])
+
+
+class SnapshotTool(BaseTool):
+    """
+    Base of the snapshot tools; `k8s_tools` is the per-case KubernetesTools instance they
+    read from, `memo` the per-case ToolResultMemo shared by all tools of the case.
+    """
+    k8s_tools: Any = Field(default=None, exclude=True)
+    memo: Any = Field(default=None, exclude=True)
+
+
+class GetResourcesInput(SnapshotToolInput):
+    """(Updated) Input parameters for the GetResources tool"""
+    resource_type: str = Field(description="**REQUIRED**. The type of resource to list. (e.g., 'pods', 'services', 'deployments', 'nodes').")
+    namespace: Optional[str] = Field(
+        default=None,
+        description=(
+        "The Kubernetes namespace to query. "
+        "**CRITICAL**: If the `resource_type` is a namespaced resource (e.g., 'pods', 'deployments', 'services'), "
+        "you MUST provide the namespace (default is 'boutique'). "
+        "However, if the `resource_type` is a cluster-scoped resource (e.g., 'nodes', 'persistentvolumes'), "
+        "DO NOT include the `namespace` parameter in your tool call at all."
+        )
     )
+    name: Optional[str] = Field(default=None, description="Optional. The specific name of the resource to retrieve a single item (e.g., 'checkoutservice-xyz'). If omitted, returns a list of all resources.")
+    show_labels: bool = Field(default=False, description="If True, adds `--show-labels`. **MUTUALLY EXCLUSIVE** with `output_wide` and `label_selector`. Do not set this if you use the others.")
+    output_wide: bool = Field(default=False, description="If True, adds `-o wide` to show extra info like Node IP. **MUTUALLY EXCLUSIVE** with `show_labels` and `label_selector`.")
+    label_selector: Optional[str] = Field(default=None, description="Filter by label (e.g., 'app=frontend'). **MUTUALLY EXCLUSIVE** with `show_labels` and `output_wide`. **SUPPORTED ONLY FOR**: pods, services, deployments, and persistentvolumeclaims (PVCs).")
 
-    class GetResourcesInput(BaseModel):
-        """(Updated) Input parameters for the GetResources tool"""
-        resource_type: str = Field(description="**REQUIRED**. The type of resource to list. (e.g., 'pods', 'services', 'deployments', 'nodes').")
-        namespace: Optional[str] = Field(
-            default=None,
-            description=(
-            "The Kubernetes namespace to query. "
-            "**CRITICAL**: If the `resource_type` is a namespaced resource (e.g., 'pods', 'deployments', 'services'), "
-            "you MUST provide the namespace (default is 'boutique'). "
-            "However, if the `resource_type` is a cluster-scoped resource (e.g., 'nodes', 'persistentvolumes'), "
-            "DO NOT include the `namespace` parameter in your tool call at all."
+class GetResourcesTool(SnapshotTool):
+    name: str = "GetResources"
+    description: str = (
+    "Simulates `kubectl get` to retrieve resource lists or details. "
+    "Use this tool FIRST to verify the status of Pods or Nodes. "
+    "IMPORTANT: The options `show_labels`, `output_wide`, and `label_selector` are mutually exclusive—you can only use ONE at a time."
+    )
+    args_schema: Type[BaseModel] = GetResourcesInput
+
+    @memoized
+    def _run(
+        self,
+        resource_type: str,
+        namespace: Optional[str] = None,
+        name: Optional[str] = None,
+        show_labels: bool = False,
+        output_wide: bool = False,
+        label_selector: Optional[str] = None
+    ) -> str:
+        try:
+            if resource_type in ClusterScopeResource:
+                default_namespace = "boutique"
+            else:
+                default_namespace = namespace
+            return self.k8s_tools.GetResources(
+                resource_type=resource_type,                   
+                namespace=default_namespace,
+                name=name,
+                show_labels=show_labels,
+                output_wide=output_wide,
+                label_selector=label_selector
             )
+        except ValueError as e:
+            # Convert Python exceptions into strings the LLM can understand
+            return f"Error: {e}"
+
+
+class DescribeResourceInput(SnapshotToolInput):
+    """(Updated) Input parameters for the DescribeResource tool"""
+    resource_type: str = Field(description="**REQUIRED**. The type of resource to describe (e.g., 'pod', 'node', 'service', 'pvc').")
+    name: str = Field(description="**REQUIRED**. The EXACT name of the specific resource to inspect (e.g., 'checkoutservice-7d9b7c9-xyz'). You cannot describe 'all' resources; you must target a specific instance found via GetResources.")
+    namespace: Optional[str] = Field(
+        default=None,
+        description=(
+        "The Kubernetes namespace to query. "
+        "**CRITICAL**: If the `resource_type` is a namespaced resource (e.g., 'pods', 'deployments', 'services'), "
+        "you MUST provide the namespace (default is 'boutique'). "
+        "However, if the `resource_type` is a cluster-scoped resource (e.g., 'nodes', 'persistentvolumes'), "
+        "DO NOT include the `namespace` parameter in your tool call at all."
         )
-        name: Optional[str] = Field(default=None, description="Optional. The specific name of the resource to retrieve a single item (e.g., 'checkoutservice-xyz'). If omitted, returns a list of all resources.")
-        show_labels: bool = Field(default=False, description="If True, adds `--show-labels`. **MUTUALLY EXCLUSIVE** with `output_wide` and `label_selector`. Do not set this if you use the others.")
-        output_wide: bool = Field(default=False, description="If True, adds `-o wide` to show extra info like Node IP. **MUTUALLY EXCLUSIVE** with `show_labels` and `label_selector`.")
-        label_selector: Optional[str] = Field(default=None, description="Filter by label (e.g., 'app=frontend'). **MUTUALLY EXCLUSIVE** with `show_labels` and `output_wide`. **SUPPORTED ONLY FOR**: pods, services, deployments, and persistentvolumeclaims (PVCs).")
-
-    class GetResourcesTool(BaseTool):
-        name: str = "GetResources"
-        description: str = (
-        "Simulates `kubectl get` to retrieve resource lists or details. "
-        "Use this tool FIRST to verify the status of Pods or Nodes. "
-        "IMPORTANT: The options `show_labels`, `output_wide`, and `label_selector` are mutually exclusive—you can only use ONE at a time."
-        )
-        args_schema: Type[BaseModel] = GetResourcesInput
-
-        def _run(
-            self,
-            resource_type: str,
-            namespace: Optional[str] = None,
-            name: Optional[str] = None,
-            show_labels: bool = False,
-            output_wide: bool = False,
-            label_selector: Optional[str] = None
-        ) -> str:
-            try:
-                if resource_type in ClusterScopeResource:
-                    default_namespace = "boutique"
-                else:
-                    default_namespace = namespace
-                return k8s_tools_instance.GetResources(
-                    resource_type=resource_type,                   
-                    namespace=default_namespace,
-                    name=name,
-                    show_labels=show_labels,
-                    output_wide=output_wide,
-                    label_selector=label_selector
-                )
-            except ValueError as e:
-                # Convert Python exceptions into strings the LLM can understand
-                return f"Error: {e}"
-
-
-    class DescribeResourceInput(BaseModel):
-        """(Updated) Input parameters for the DescribeResource tool"""
-        resource_type: str = Field(description="**REQUIRED**. The type of resource to describe (e.g., 'pod', 'node', 'service', 'pvc').")
-        name: str = Field(description="**REQUIRED**. The EXACT name of the specific resource to inspect (e.g., 'checkoutservice-7d9b7c9-xyz'). You cannot describe 'all' resources; you must target a specific instance found via GetResources.")
-        namespace: Optional[str] = Field(
-            default=None,
-            description=(
-            "The Kubernetes namespace to query. "
-            "**CRITICAL**: If the `resource_type` is a namespaced resource (e.g., 'pods', 'deployments', 'services'), "
-            "you MUST provide the namespace (default is 'boutique'). "
-            "However, if the `resource_type` is a cluster-scoped resource (e.g., 'nodes', 'persistentvolumes'), "
-            "DO NOT include the `namespace` parameter in your tool call at all."
+    )
+class DescribeResourceTool(SnapshotTool):
+    name: str = "DescribeResource"
+    description: str = (
+    "Simulates `kubectl describe`. Use this tool when you find a Pod in a non-Running state (e.g., Pending, CrashLoopBackOff) or a Node in NotReady state. " 
+    "It provides critical 'Events' (at the bottom of the output) and 'Conditions' which are essential for identifying why a resource is failing."
+    "DO NOT use this tool to describe 'namespaces',Namespace-level details such as ResourceQuota can be retrieved directly via the `GetResources` tool "
+    )
+    args_schema: Type[BaseModel] = DescribeResourceInput
+
+    @memoized
+    def _run(self, resource_type: str,
+             name: str,
+             namespace: Optional[str] = None) -> str:
+        # (Updated) Call the Python instance
+        try:
+            if resource_type in ClusterScopeResource:
+                default_namespace = "boutique"
+            else:
+                default_namespace = namespace
+            return self.k8s_tools.DescribeResource(
+                resource_type=resource_type,
+                name=name,
+                namespace=default_namespace
             )
-        )
-    class DescribeResourceTool(BaseTool):
-        name: str = "DescribeResource"
-        description: str = (
-        "Simulates `kubectl describe`. Use this tool when you find a Pod in a non-Running state (e.g., Pending, CrashLoopBackOff) or a Node in NotReady state. " 
-        "It provides critical 'Events' (at the bottom of the output) and 'Conditions' which are essential for identifying why a resource is failing."
-        "DO NOT use this tool to describe 'namespaces',Namespace-level details such as ResourceQuota can be retrieved directly via the `GetResources` tool "
-        )
-        args_schema: Type[BaseModel] = DescribeResourceInput
-
-        def _run(self, resource_type: str,
-                 name: str,
-                 namespace: Optional[str] = None) -> str:
-            # (Updated) Call the Python instance
-            try:
-                if resource_type in ClusterScopeResource:
-                    default_namespace = "boutique"
-                else:
-                    default_namespace = namespace
-                return k8s_tools_instance.DescribeResource(
-                    resource_type=resource_type,
-                    name=name,
-                    namespace=default_namespace
-                )
-            except ValueError as e:
-                return f"Error: {e}"
-
-    class GetAppYAMLInput(BaseModel):
-        app_name: BoutiqueServiceName = Field(description=f"**REQUIRED**. The name of the microservice to inspect (e.g., 'frontend', 'redis-cart', 'adservice').")
-        
-    class GetAppYAMLTool(BaseTool):
-        name: str = "GetAppYAML"
-        description: str = (
-        "Retrieves the raw YAML configuration file (Source of Truth) for a specific service. "
-        "Use this tool to perform **Static Configuration Analysis**. "
-        "It is essential for checking defined Resource Limits (CPU/Memory), Liveness/Readiness Probes, Environment Variables, and Image Tags. "
-        )
-        args_schema: Type[BaseModel] = GetAppYAMLInput
-
-        def _run(self, app_name: str) -> str:
-            # (Updated) Call the Python instance
-            try:
-                validated_input = GetAppYAMLInput(
-                app_name=app_name
-                )
-                return k8s_tools_instance.GetAppYAML(app_name=validated_input.app_name)
-            except (ValueError, FileNotFoundError) as e:
-                return f"Error: {e}"
-
-
-    class GetRecentLogsInput(BaseModel):
-        """(Updated) Input parameters for the GetPodLogs tool"""
-        namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace")
-        service_name: BoutiqueServiceName = Field(description="**REQUIRED**. The high-level **Microservice Name** (e.g., 'frontend', 'cartservice', 'redis-cart'). Do NOT provide the full specific Pod name (like 'frontend-7d9b7c9-xyz'). Just provide the service name, and the tool will automatically show the logs for you.")
-        
-    class GetRecentLogsTool(BaseTool):
-        name: str = "GetRecentLogs"
-        description: str = (
-        "Retrieves the raw, complete standard output logs from the container. "
-        "This tool is most effective when the Pod is **NOT in a normal Running state** (e.g., CrashLoopBackOff, ImagePullBackOff, or immediate startup failure), where you need to see the raw startup sequence to diagnose why it crashed. "
-        "**CONTRAST**: "
-        "- Use `GetErrorLogs` for running services with many logs. "
-        "- Use `GetRecentLogs` (this tool) for startup failures or hard crashes where every single line matters."
+        except ValueError as e:
+            return f"Error: {e}"
+
+class GetAppYAMLInput(SnapshotToolInput):
+    app_name: BoutiqueServiceName = Field(description=f"**REQUIRED**. The name of the microservice to inspect (e.g., 'frontend', 'redis-cart', 'adservice').")
+    
+class GetAppYAMLTool(SnapshotTool):
+    name: str = "GetAppYAML"
+    description: str = (
+    "Retrieves the raw YAML configuration file (Source of Truth) for a specific service. "
+    "Use this tool to perform **Static Configuration Analysis**. "
+    "It is essential for checking defined Resource Limits (CPU/Memory), Liveness/Readiness Probes, Environment Variables, and Image Tags. "
     )
-        args_schema: Type[BaseModel] = GetRecentLogsInput
-
-        def _run(self, namespace: str, service_name: str) -> str:
-            # (Updated) Call the Python instance
-            try:
-                validated_input = GetRecentLogsInput(
-                namespace=namespace,
-                service_name=service_name
-                )
-                return k8s_tools_instance.GetRecentLogs(
-                    namespace=validated_input.namespace,
-                    service_name=validated_input.service_name
-                )
-            except ValueError as e:
-                return f"Error: {e}"
-
-    class GetErrorLogsInput(BaseModel):
-        namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace.")
-        service_name: BoutiqueServiceName = Field(description="**REQUIRED**. The high-level **Microservice Name** (e.g., 'frontend', 'cartservice', 'redis-cart').")
-
-    class GetErrorLogsTool(BaseTool):
-        name: str = "GetErrorLogs"
-        description: str = (
-            "Retrieves a **Statistical Summary** of application error logs, grouped by error templates/patterns (including count and frequency). "
-            "**WHEN TO USE**: "
-            "1. **Performance Faults**: When a service is **Running** and handling traffic, raw logs (`GetRecentLogs`) are often too noisy (thousands of lines). Use this tool to get a clean signal. "
-            "2. **Pattern Recognition**: Use this to quickly identify the *type* of exception (e.g., 'Connection Refused', 'Timeout') dominating the errors. "
-            "**CONTRAST**: "
-            "- Use `GetErrorLogs` (this tool) for running services with many logs. "
-            "- Use `GetRecentLogs` for startup failures or hard crashes where every single line matters."
-        )
-        args_schema: Type[BaseModel] = GetErrorLogsInput
-        def _run(self, namespace: str, service_name: str) -> str:
+    args_schema: Type[BaseModel] = GetAppYAMLInput
+
+    @memoized
+    def _run(self, app_name: str) -> str:
         # (Updated) Call the Python instance
-            try:
-                validated_input = GetErrorLogsInput(
-                namespace=namespace,
-                service_name=service_name
-                )
-                return k8s_tools_instance.GetErrorLogs(
-                    namespace=validated_input.namespace,
-                    service_name=validated_input.service_name
-                )
-            except ValueError as e:
-                return f"Error: {e}"
-            
-    class CheckServiceConnectivityInput(BaseModel):
-        """(Updated) Input parameters for the CheckServiceConnectivity tool"""
-        service_name: BoutiqueServiceName= Field(
-        description="**REQUIRED**. The target Service DNS name. You must choose from the predefined list."
-        )
-        port: int = Field(description="**REQUIRED**. The target TCP port number to test (e.g., 6379, 8080). **TIP**: You should verify the correct port number using `GetResources` or `GetAppYAML` first; do not guess.")
-        namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace. ")
-
-    class CheckServiceConnectivityTool(BaseTool):
-        name: str = "CheckServiceConnectivity"
-        description: str = (
-        "Performs an **Active Network Reachability Test**. "
-        "It spins up a temporary ephemeral pod inside the cluster and attempts a TCP handshake (`nc -zv`) to the target service. "
-        "**Use Cases**: "
-        "1. Distinguish between Application crashes (app is reachable but returns error) vs. Network failures (app is unreachable). "
-        "2. Verify if Kubernetes Service discovery (DNS/IP routing) is working. "
-        "3. Check if Network Policies are blocking traffic."
-        )
-        args_schema: Type[BaseModel] = CheckServiceConnectivityInput
-
-        def _run(self, service_name: str, port: int, namespace: str) -> str:
-            # (Updated) Call the Python instance
-            try:
-                validated_input = CheckServiceConnectivityInput(
-                service_name=service_name,
-                port=port,
-                namespace=namespace
-                )
-                return k8s_tools_instance.CheckServiceConnectivity(
-                    service_name=validated_input.service_name,
-                    port=validated_input.port,
-                    namespace=validated_input.namespace
-                )
-            except ValueError as e:
-                return f"Error: {e}"
-
-                
-
-    class GetServiceDependenciesInput(BaseModel):
-        """(Added) Input parameters for the GetServiceDependencies tool"""
-        service_name: BoutiqueServiceName = Field(description=f"**REQUIRED**. The name of the service (We recommend using 'frontend' to obtain the global topology at one time).")
-       
-    class GetServiceDependenciesTool(BaseTool):
-        name: str = "GetServiceDependencies"
-        description: str = (
-        "Retrieves the Topology (Upstream/Downstream relationships) of a service. "
-        "**CRITICAL USE CASE**: Use this for **Performance Issues** (Latency/Slowness) or **Cascading Failures**. "
-        "Use this tool to trace the 'Call Graph' downwards and find the **Most Downstream Service** in the chain, as that is usually the Root Cause of the bottleneck."
-        )
-        args_schema: Type[BaseModel] = GetServiceDependenciesInput
-
-        def _run(self, service_name: str) -> str:
-            try:
-                validated_input = GetServiceDependenciesInput(
-                service_name=service_name
-                )
-                return k8s_tools_instance.GetServiceDependencies(validated_input.service_name)
-            except ValueError as e:
-                return f"Error: {e}"
-
-    class GetClusterConfigurationTool(BaseTool):
-        name: str = "GetClusterConfiguration"
-        description: str = (
-        "Retrieves a **Holistic Health Summary** of all nodes in the cluster. "
-        "It reveals critical scheduling constraints that `GetResources` hides, specifically: "
-        "1. **Node Taints**: Why a pod is refused on a node. "
-        "2. **Node Conditions**: MemoryPressure, DiskPressure, or PIDPressure. "
-        "3. **Allocatable Resources**: Total CPU/Memory capacity available. "
-        "4. **Node Labels**: Crucial for NodeAffinity/NodeSelector matching. "
-        "Use this instead of running `DescribeResource` on every single node."
-        )
+        try:
+            validated_input = GetAppYAMLInput(
+            app_name=app_name
+            )
+            return self.k8s_tools.GetAppYAML(app_name=validated_input.app_name)
+        except (ValueError, FileNotFoundError) as e:
+            return f"Error: {e}"
+
+
+class GetRecentLogsInput(SnapshotToolInput):
+    """(Updated) Input parameters for the GetPodLogs tool"""
+    namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace")
+    service_name: BoutiqueServiceName = Field(description="**REQUIRED**. The high-level **Microservice Name** (e.g., 'frontend', 'cartservice', 'redis-cart'). Do NOT provide the full specific Pod name (like 'frontend-7d9b7c9-xyz'). Just provide the service name, and the tool will automatically show the logs for you.")
+    
+class GetRecentLogsTool(SnapshotTool):
+    name: str = "GetRecentLogs"
+    description: str = (
+    "Retrieves the raw, complete standard output logs from the container. "
+    "This tool is most effective when the Pod is **NOT in a normal Running state** (e.g., CrashLoopBackOff, ImagePullBackOff, or immediate startup failure), where you need to see the raw startup sequence to diagnose why it crashed. "
+    "**CONTRAST**: "
+    "- Use `GetErrorLogs` for running services with many logs. "
+    "- Use `GetRecentLogs` (this tool) for startup failures or hard crashes where every single line matters."
+)
+    args_schema: Type[BaseModel] = GetRecentLogsInput
+
+    @memoized
+    def _run(self, namespace: str, service_name: str) -> str:
+        # (Updated) Call the Python instance
+        try:
+            validated_input = GetRecentLogsInput(
+            namespace=namespace,
+            service_name=service_name
+            )
+            return self.k8s_tools.GetRecentLogs(
+                namespace=validated_input.namespace,
+                service_name=validated_input.service_name
+            )
+        except ValueError as e:
+            return f"Error: {e}"
+
+class GetLogsInTimeRangeInput(SnapshotToolInput):
+    namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace")
+    service_name: BoutiqueServiceName = Field(description="**REQUIRED**. The high-level **Microservice Name** (e.g., 'frontend', 'cartservice'). Do NOT provide the full Pod name.")
+    time_range: Optional[str] = Field(default=None, description="Optional. The window as 'YYYY-MM-DD HH:MM:SS ~ YYYY-MM-DD HH:MM:SS' in cluster time, exactly like the `time_range` of an alert from `GetAlerts` or the `time` of metrics. If omitted, the time range of the case's alerts is used, or, when the case has no alerts, the whole span of the service's logs (the latest `lines` are shown).")
+    lines: int = Field(default=100, ge=1, description="Maximum number of lines to return; the latest lines of the window are kept (default 100).")
+
+class GetLogsInTimeRangeTool(SnapshotTool):
+    name: str = "GetLogsInTimeRange"
+    description: str = (
+    "Retrieves the log lines a service wrote **within a time window**, e.g. the `time_range` of an alert. "
+    "Use it to see what a service logged while an anomaly was happening, instead of reading the whole tail with `GetRecentLogs`: "
+    "the window returns only the relevant lines. "
+    "If the window is empty, the output tells you the time span the logs cover."
+    )
+    args_schema: Type[BaseModel] = GetLogsInTimeRangeInput
+
+    @memoized
+    def _run(self, namespace: str, service_name: str, time_range: Optional[str] = None, lines: int = 100) -> str:
+        try:
+            validated_input = GetLogsInTimeRangeInput(
+            namespace=namespace,
+            service_name=service_name,
+            time_range=time_range,
+            lines=lines
+            )
+            return self.k8s_tools.GetLogsInTimeRange(
+                namespace=validated_input.namespace,
+                service_name=validated_input.service_name,
+                time_range=validated_input.time_range,
+                lines=validated_input.lines
+            )
+        except ValueError as e:
+            return f"Error: {e}"
+
+class GetErrorLogsInput(SnapshotToolInput):
+    namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace.")
+    service_name: BoutiqueServiceName = Field(description="**REQUIRED**. The high-level **Microservice Name** (e.g., 'frontend', 'cartservice', 'redis-cart').")
+
+class GetErrorLogsTool(SnapshotTool):
+    name: str = "GetErrorLogs"
+    description: str = (
+        "Retrieves a **Statistical Summary** of application error logs, grouped by error templates/patterns (including count and frequency). "
+        "**WHEN TO USE**: "
+        "1. **Performance Faults**: When a service is **Running** and handling traffic, raw logs (`GetRecentLogs`) are often too noisy (thousands of lines). Use this tool to get a clean signal. "
+        "2. **Pattern Recognition**: Use this to quickly identify the *type* of exception (e.g., 'Connection Refused', 'Timeout') dominating the errors. "
+        "**CONTRAST**: "
+        "- Use `GetErrorLogs` (this tool) for running services with many logs. "
+        "- Use `GetRecentLogs` for startup failures or hard crashes where every single line matters."
+    )
+    args_schema: Type[BaseModel] = GetErrorLogsInput
+    @memoized
+    def _run(self, namespace: str, service_name: str) -> str:
+    # (Updated) Call the Python instance
+        try:
+            validated_input = GetErrorLogsInput(
+            namespace=namespace,
+            service_name=service_name
+            )
+            return self.k8s_tools.GetErrorLogs(
+                namespace=validated_input.namespace,
+                service_name=validated_input.service_name
+            )
+        except ValueError as e:
+            return f"Error: {e}"
         
-        def _run(self) -> str:
-            # _run method also has no arguments
-            try:
-                return k8s_tools_instance.GetClusterConfiguration()
-            except Exception as e:
-                return f"Error: {e}"
+class CheckServiceConnectivityInput(SnapshotToolInput):
+    """(Updated) Input parameters for the CheckServiceConnectivity tool"""
+    service_name: BoutiqueServiceName= Field(
+    description="**REQUIRED**. The target Service DNS name. You must choose from the predefined list."
+    )
+    port: int = Field(description="**REQUIRED**. The target TCP port number to test (e.g., 6379, 8080). **TIP**: You should verify the correct port number using `GetResources` or `GetAppYAML` first; do not guess.")
+    namespace: str = Field(description="**REQUIRED**. The Kubernetes namespace. ")
+
+class CheckServiceConnectivityTool(SnapshotTool):
+    name: str = "CheckServiceConnectivity"
+    description: str = (
+    "Performs an **Active Network Reachability Test**. "
+    "It spins up a temporary ephemeral pod inside the cluster and attempts a TCP handshake (`nc -zv`) to the target service. "
+    "**Use Cases**: "
+    "1. Distinguish between Application crashes (app is reachable but returns error) vs. Network failures (app is unreachable). "
+    "2. Verify if Kubernetes Service discovery (DNS/IP routing) is working. "
+    "3. Check if Network Policies are blocking traffic."
+    )
+    args_schema: Type[BaseModel] = CheckServiceConnectivityInput
+
+    @memoized
+    def _run(self, service_name: str, port: int, namespace: str) -> str:
+        # (Updated) Call the Python instance
+        try:
+            validated_input = CheckServiceConnectivityInput(
+            service_name=service_name,
+            port=port,
+            namespace=namespace
+            )
+            return self.k8s_tools.CheckServiceConnectivity(
+                service_name=validated_input.service_name,
+                port=validated_input.port,
+                namespace=validated_input.namespace
+            )
+        except ValueError as e:
+            return f"Error: {e}"
+
             
-    class GetAlertsTool(BaseTool):
-        name: str = "GetAlerts"
-        description: str = (
-        "Retrieves active alerts triggered by metric anomalies (e.g., High Latency, Error Rate Spikes, CPU Saturation). "
-        "**WHEN TO USE**: Strictly for **Performance Faults** (e.g., user reports 'slow' or 'timeout') on services that are already **Running**. "
-        "**INTERPRETATION LOGIC**: "
-        "1. If returns **Alerts**: You have found a performance bottleneck "
-        "2. If returns **Empty**: It implies the service is handling traffic normally (no metric anomaly). "
-        "**WARNING**: DO NOT use this tool for **Startup/Scheduling Faults** (e.g., Pending, CrashLoopBackOff) or other early-stage lifecycle failures. "
-        "Because if a Pod never started, it generates no traffic metrics, so this tool will return empty. This does NOT mean the service is healthy. "
-        )
-        
-        def _run(self) -> str:
-            # _run method also has no arguments
-            try:
-                return k8s_tools_instance.GetAlerts()
-            except Exception as e:
-                return f"Error: {e}"
-                
-    class CheckNodeServiceStatusInput(BaseModel):
-        node_name: NodeName = Field(description="**REQUIRED**. The target Node Name (e.g., 'worker-01').")
-        service_name: SystemServiceName = Field(description="**REQUIRED**. The system component name to inspect. Valid targets typically include: 'kubelet', 'kube-proxy', 'containerd', or 'kube-scheduler'. ")
+
+class GetServiceDependenciesInput(SnapshotToolInput):
+    """(Added) Input parameters for the GetServiceDependencies tool"""
+    service_name: BoutiqueServiceName = Field(description=f"**REQUIRED**. The name of the service (We recommend using 'frontend' to obtain the global topology at one time).")
    
-    class CheckNodeServiceStatusTool(BaseTool):
-        name: str = "CheckNodeServiceStatus"
-        description: str = (
-            "Checks the systemd/operating status of critical Kubernetes infrastructure components on a specific Node. "
-            "Use this when you have verified that the Application Configuration (`GetAppYAML`) is correct, yet the Pod fails to start or behave as expected. "
-            "If the App logic is fine, the issue likely lies in the underlying Infrastructure layer."
+class GetServiceDependenciesTool(SnapshotTool):
+    name: str = "GetServiceDependencies"
+    description: str = (
+    "Retrieves the Topology (Upstream/Downstream relationships) of a service. "
+    "**CRITICAL USE CASE**: Use this for **Performance Issues** (Latency/Slowness) or **Cascading Failures**. "
+    "Use this tool to trace the 'Call Graph' downwards and find the **Most Downstream Service** in the chain, as that is usually the Root Cause of the bottleneck."
+    )
+    args_schema: Type[BaseModel] = GetServiceDependenciesInput
+
+    @memoized
+    def _run(self, service_name: str) -> str:
+        try:
+            validated_input = GetServiceDependenciesInput(
+            service_name=service_name
             )
+            return self.k8s_tools.GetServiceDependencies(validated_input.service_name)
+        except ValueError as e:
+            return f"Error: {e}"
 
-        args_schema: Type[BaseModel] = CheckNodeServiceStatusInput
+class GetServiceCallChainsInput(SnapshotToolInput):
+    service_name: BoutiqueServiceName = Field(description="**REQUIRED**. The service whose call chains you want (e.g., 'cartservice').")
+    direction: Literal['both', 'upstream', 'downstream'] = Field(default="both", description="'upstream' for the chains of callers leading to the service, 'downstream' for the chains of services it depends on, 'both' (default) for all of them.")
 
-        def _run(self,node_name: str, service_name: str) -> str:
+class GetServiceCallChainsTool(SnapshotTool):
+    name: str = "GetServiceCallChains"
+    description: str = (
+    "Returns the **complete call chains** through a service in one call: every upstream path from the entrypoint down to it, "
+    "every downstream path from it to the leaf services and databases, plus its direct and transitive fan-in/fan-out. "
+    "Use it instead of calling `GetServiceDependencies` hop by hop when tracing **Performance Issues** or **Cascading Failures**: "
+    "a fault in a service shows up in every service on its upstream chains, and the most downstream unhealthy service on a chain is usually the Root Cause."
+    )
+    args_schema: Type[BaseModel] = GetServiceCallChainsInput
+
+    @memoized
+    def _run(self, service_name: str, direction: str = "both") -> str:
+        try:
+            validated_input = GetServiceCallChainsInput(
+            service_name=service_name,
+            direction=direction
+            )
+            return self.k8s_tools.GetServiceCallChains(validated_input.service_name, validated_input.direction)
+        except ValueError as e:
+            return f"Error: {e}"
+
+class GetClusterConfigurationTool(SnapshotTool):
+    name: str = "GetClusterConfiguration"
+    description: str = (
+    "Retrieves a **Holistic Health Summary** of all nodes in the cluster. "
+    "It reveals critical scheduling constraints that `GetResources` hides, specifically: "
+    "1. **Node Taints**: Why a pod is refused on a node. "
+    "2. **Node Conditions**: MemoryPressure, DiskPressure, or PIDPressure. "
+    "3. **Allocatable Resources**: Total CPU/Memory capacity available. "
+    "4. **Node Labels**: Crucial for NodeAffinity/NodeSelector matching. "
+    "Use this instead of running `DescribeResource` on every single node."
+    )
+    
+    @memoized
+    def _run(self) -> str:
         # _run method also has no arguments
-            try:
-                validated_input = CheckNodeServiceStatusInput(
-                node_name=node_name,
-                service_name=service_name
-                )
-                return k8s_tools_instance.CheckNodeServiceStatus(validated_input.node_name,validated_input.service_name)
-            except Exception as e:
-                return f"Error: {e}"
+        try:
+            return self.k8s_tools.GetClusterConfiguration()
+        except Exception as e:
+            return f"Error: {e}"
+        
+class GetAlertsTool(SnapshotTool):
+    name: str = "GetAlerts"
+    description: str = (
+    "Retrieves active alerts triggered by metric anomalies (e.g., High Latency, Error Rate Spikes, CPU Saturation). "
+    "**WHEN TO USE**: Strictly for **Performance Faults** (e.g., user reports 'slow' or 'timeout') on services that are already **Running**. "
+    "**INTERPRETATION LOGIC**: "
+    "1. If returns **Alerts**: You have found a performance bottleneck "
+    "2. If returns **Empty**: It implies the service is handling traffic normally (no metric anomaly). "
+    "**WARNING**: DO NOT use this tool for **Startup/Scheduling Faults** (e.g., Pending, CrashLoopBackOff) or other early-stage lifecycle failures. "
+    "Because if a Pod never started, it generates no traffic metrics, so this tool will return empty. This does NOT mean the service is healthy. "
+    )
+    
+    @memoized
+    def _run(self) -> str:
+        # _run method also has no arguments
+        try:
+            return self.k8s_tools.GetAlerts()
+        except Exception as e:
+            return f"Error: {e}"
             
+class GetAnomalyRankingInput(SnapshotToolInput):
+    top: int = Field(default=10, ge=1, description="How many of the highest-scoring services and nodes to list (default 10).")
+
+class GetAnomalyRankingTool(SnapshotTool):
+    name: str = "GetAnomalyRanking"
+    description: str = (
+    "Scores **every service and node at once** on three signals, alerts, metric deviations (metrics.csv) and error-log rates, "
+    "and returns a **ranked suspect list** with the evidence behind each score and the node each service runs on. "
+    "**WHEN TO USE**: As the first telemetry step for **Performance** or **Infrastructure** faults, instead of calling `GetAlerts` and `GetErrorLogs` service by service. "
+    "Then confirm the top suspects with the targeted tools. "
+    "**NOTE**: It cannot see startup or scheduling faults (Pending, CrashLoopBackOff); a Pod that never ran produces no telemetry."
+    )
+    args_schema: Type[BaseModel] = GetAnomalyRankingInput
+
+    @memoized
+    def _run(self, top: int = 10) -> str:
+        try:
+            validated_input = GetAnomalyRankingInput(top=top)
+            return self.k8s_tools.GetAnomalyRanking(validated_input.top)
+        except ValueError as e:
+            return f"Error: {e}"
+
+class CheckNodeServiceStatusInput(SnapshotToolInput):
+    node_name: NodeName = Field(description="**REQUIRED**. The target Node Name (e.g., 'worker-01').")
+    service_name: SystemServiceName = Field(description="**REQUIRED**. The system component name to inspect. Valid targets typically include: 'kubelet', 'kube-proxy', 'containerd', or 'kube-scheduler'. ")
+   
+class CheckNodeServiceStatusTool(SnapshotTool):
+    name: str = "CheckNodeServiceStatus"
+    description: str = (
+        "Checks the systemd/operating status of critical Kubernetes infrastructure components on a specific Node. "
+        "Use this when you have verified that the Application Configuration (`GetAppYAML`) is correct, yet the Pod fails to start or behave as expected. "
+        "If the App logic is fine, the issue likely lies in the underlying Infrastructure layer."
+        )
+
+    args_schema: Type[BaseModel] = CheckNodeServiceStatusInput
+
+    @memoized
+    def _run(self,node_name: str, service_name: str) -> str:
+    # _run method also has no arguments
+        try:
+            validated_input = CheckNodeServiceStatusInput(
+            node_name=node_name,
+            service_name=service_name
+            )
+            return self.k8s_tools.CheckNodeServiceStatus(validated_input.node_name,validated_input.service_name)
+        except Exception as e:
+            return f"Error: {e}"
+
+
+class SearchSnapshotInput(SnapshotToolInput):
+    query: str = Field(description="**REQUIRED**. Words to look for, e.g. 'FailedScheduling', 'ImagePullBackOff', 'redis-cart 6379', 'OOMKilled'. A line matches when it contains every word (case-insensitive).")
+    limit: int = Field(default=20, ge=1, description="Maximum number of distinct matching lines to return (default 20).")
+
+class SearchSnapshotTool(SnapshotTool):
+    name: str = "SearchSnapshot"
+    description: str = (
+    "Full-text search across **everything recorded for this case**: all `kubectl get`/`describe` outputs, YAMLs, alerts, error-log summaries and raw log lines. "
+    "Returns each matching line with the source it came from (the tool call that would show it, or `logs.json:<service>`). "
+    "**WHEN TO USE**: When you know a symptom keyword (an event reason such as `FailedScheduling`, an error such as `connection refused`) "
+    "but not which resource or service mentions it. Then inspect the reported source with the matching tool."
+    )
+    args_schema: Type[BaseModel] = SearchSnapshotInput
+
+    @memoized
+    def _run(self, query: str, limit: int = 20) -> str:
+        try:
+            validated_input = SearchSnapshotInput(query=query, limit=limit)
+            return self.k8s_tools.SearchSnapshot(validated_input.query, validated_input.limit)
+        except ValueError as e:
+            return f"Error: {e}"
+
+
+class ToolCallInput(SnapshotToolInput):
+    tool_name: ToolName = Field(description="**REQUIRED**. The tool to call (e.g., 'GetResources', 'GetAlerts').")
+    arguments: Dict[str, Any] = Field(default_factory=dict, description="The arguments of that tool, exactly as you would pass them to it directly (e.g., {\"resource_type\": \"pods\", \"namespace\": \"boutique\"}). Use {} for tools without arguments.")
+
+class RunToolsInParallelInput(SnapshotToolInput):
+    calls: List[ToolCallInput] = Field(min_length=1, max_length=MAX_PARALLEL_CALLS, description=f"**REQUIRED**. 1 to {MAX_PARALLEL_CALLS} independent tool calls.")
+
+class RunToolsInParallelTool(SnapshotTool):
+    name: str = PARALLEL_TOOL
+    description: str = (
+    "Runs several **independent** diagnostic tool calls at once and returns all their outputs in one observation, "
+    "each under a `### [n] <tool> <arguments>` header. "
+    "Use it when you already know the next calls and none depends on another's output, e.g. the initial survey "
+    "`GetResources` (pods), `GetResources` (nodes), `GetAlerts` and `GetClusterConfiguration`. "
+    "Do NOT use it for calls whose arguments depend on an earlier result (e.g. describing a Pod you have not listed yet)."
+    )
+    args_schema: Type[BaseModel] = RunToolsInParallelInput
+
+    @memoized
+    def _run(self, calls: List[Any]) -> str:
+        try:
+            specs = [call.model_dump() if hasattr(call, "model_dump") else dict(call) for call in calls]
+            return render_parallel_results(call_tools_parallel(self.k8s_tools, specs))
+        except Exception as e:
+            return f"Error: {e}"
+
+
+TOOL_CLASSES = (
+    GetResourcesTool,
+    DescribeResourceTool,
+    GetAppYAMLTool,
+    GetRecentLogsTool,
+    GetLogsInTimeRangeTool,
+    CheckServiceConnectivityTool,
+    GetClusterConfigurationTool,
+    GetServiceDependenciesTool,
+    GetServiceCallChainsTool,
+    GetErrorLogsTool,
+    GetAlertsTool,
+    GetAnomalyRankingTool,
+    CheckNodeServiceStatusTool,
+    SearchSnapshotTool,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _tool_prototypes() -> tuple:
+    # Validation and description generation happen here, once per process
+    return tuple(tool_class() for tool_class in TOOL_CLASSES)
+
+
+@functools.lru_cache(maxsize=None)
+def _parallel_tool_prototype() -> RunToolsInParallelTool:
+    return RunToolsInParallelTool()
+
+
+@functools.lru_cache(maxsize=None)
+def _tool_schemas() -> tuple:
+    return tuple(
+        {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.args_schema.model_json_schema(),
+            },
+        }
+        for tool in _tool_prototypes()
+    )
+
+
+def get_tool_schemas() -> List[Dict[str, Any]]:
+    """OpenAI-style function schemas of the tools, serialized once per process."""
+    return copy.deepcopy(list(_tool_schemas()))
+
+
+def create_k8s_tools(case_path: str, budget=None, memo_conf: Optional[Dict[str, Any]] = None,
+                     parallel: bool = False):
+    """
+    Tools bound to one case's snapshot. With a StepBudget (tools.budget), every call
+    goes through it so repeated calls, stalls and exhausted budgets end the diagnosis.
+    `memo_conf` is the `diagnosis.memoize` section; repeated calls are memoized only when it is enabled.
+    `parallel` adds RunToolsInParallel, letting the model batch independent calls in one step.
+    """
+    if not os.path.exists(case_path):
+            raise FileNotFoundError(f"Snapshot file not found: {case_path}")
+    # Revisited cases (retries, strategy sweeps) come from the process-wide case cache
+    k8s_tools_instance = load_case(case_path)
+    memo = ToolResultMemo.from_config(memo_conf, k8s_tools_instance.case_id, budget)
+    if budget is not None:
+        k8s_tools_instance = budget.wrap(k8s_tools_instance)
+    # Shallow copies of the prototypes skip validation and schema generation
+    prototypes = _tool_prototypes() + ((_parallel_tool_prototype(),) if parallel else ())
     tools_list = [
-    GetResourcesTool(),
-    DescribeResourceTool(),
-    GetAppYAMLTool(),
-    GetRecentLogsTool(),
-    CheckServiceConnectivityTool(),
-    GetClusterConfigurationTool(),
-    GetServiceDependenciesTool(),
-    GetErrorLogsTool(),
-    GetAlertsTool(),
-    CheckNodeServiceStatusTool()
+        prototype.model_copy(update={"k8s_tools": k8s_tools_instance, "memo": memo})
+        for prototype in prototypes
     ]
-    return tools_list
\ No newline at end of file
+    return tools_list
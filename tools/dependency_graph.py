@@ -0,0 +1,168 @@
+"""
+Service call graph of the application, built from the GetServiceDependencies trees.
+
+Every case records the same per-service trees in tool_cache.json. ServiceGraph
+parses them once into adjacency lists. `shared_graph` keeps one instance per
+distinct set of trees, so all cases of a process share a single graph.
+GetServiceCallChains uses it to answer, in one call, what would otherwise take
+one GetServiceDependencies call per hop: the full upstream and downstream
+chains of a service, and its direct and transitive fan-in and fan-out.
+"""
+import hashlib
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+_TREE_LINE = re.compile(r"^((?:│   |    )*)(?:├── |└── )(\S+)(.*)$")
+_GRAPHS: Dict[bytes, "ServiceGraph"] = {}
+_GRAPHS_LOCK = threading.Lock()
+DIRECTIONS = ("both", "upstream", "downstream")
+
+
+class ServiceGraph:
+    def __init__(self):
+        self.calls: Dict[str, List[str]] = {}      # service -> direct downstream services, in tree order
+        self.callers: Dict[str, List[str]] = {}    # service -> direct upstream services
+        self.databases: Set[str] = set()
+        self.entrypoints: Set[str] = set()
+
+    def add_service(self, service: str):
+        self.calls.setdefault(service, [])
+        self.callers.setdefault(service, [])
+
+    def add_call(self, caller: str, callee: str):
+        self.add_service(caller)
+        self.add_service(callee)
+        if callee not in self.calls[caller]:
+            self.calls[caller].append(callee)
+            self.callers[callee].append(caller)
+
+    def add_tree(self, text: str):
+        """Merge one GetServiceDependencies output into the graph."""
+        lines = text.splitlines()
+        for line in lines:
+            if line.startswith("[Service]:"):
+                service = line.split(":", 1)[1].strip()
+                if "(Entrypoint)" in service:
+                    service = service.replace("(Entrypoint)", "").strip()
+                    self.entrypoints.add(service)
+                self.add_service(service)
+            elif line.startswith("[Upstream (Called By)]:"):
+                for caller in line.split(":", 1)[1].split(","):
+                    caller = caller.strip()
+                    if caller and not caller.startswith("("):
+                        self.add_call(caller, service)
+            elif "(None - Leaf Database)" in line:
+                self.databases.add(service)
+        # Tree lines: a node's parent is the last node one level up
+        parents: List[str] = []
+        for line in lines:
+            match = _TREE_LINE.match(line)
+            if match is None:
+                if line and not line.startswith(("[", "(", " ")):
+                    parents = [line.strip()]
+                continue
+            depth = len(match.group(1)) // 4 + 1
+            node = match.group(2)
+            if "(Database)" in match.group(3):
+                self.databases.add(node)
+            del parents[depth:]
+            if parents:
+                self.add_call(parents[-1], node)
+            parents.append(node)
+
+    @classmethod
+    def from_tool_cache(cls, tool_cache: Dict[str, object]) -> "ServiceGraph":
+        graph = cls()
+        for command_key, value in tool_cache.items():
+            if command_key.startswith("GetServiceDependencies:") and isinstance(value, str):
+                graph.add_tree(value)
+        return graph
+
+    def __contains__(self, service: str) -> bool:
+        return service in self.calls
+
+    def _chains(self, service: str, edges: Dict[str, List[str]]) -> List[List[str]]:
+        # Every maximal path from `service` along `edges`; cycles are cut at the repeated node
+        chains = []
+        stack: List[Tuple[str, List[str]]] = [(service, [service])]
+        while stack:
+            node, path = stack.pop()
+            nexts = [n for n in edges.get(node, ()) if n not in path]
+            if not nexts:
+                chains.append(path)
+            for n in reversed(nexts):
+                stack.append((n, path + [n]))
+        return chains
+
+    def downstream_chains(self, service: str) -> List[List[str]]:
+        """Call chains from `service` down to the leaf services it reaches."""
+        return [chain for chain in self._chains(service, self.calls) if len(chain) > 1]
+
+    def upstream_chains(self, service: str) -> List[List[str]]:
+        """Call chains from the entry points (or other roots) down to `service`."""
+        return [chain[::-1] for chain in self._chains(service, self.callers) if len(chain) > 1]
+
+    def _reachable(self, service: str, edges: Dict[str, List[str]]) -> List[str]:
+        seen, order, frontier = {service}, [], [service]
+        while frontier:
+            following = []
+            for node in frontier:
+                for n in edges.get(node, ()):
+                    if n not in seen:
+                        seen.add(n)
+                        order.append(n)
+                        following.append(n)
+            frontier = following
+        return order
+
+    def downstream(self, service: str) -> List[str]:
+        """Every service `service` depends on, nearest first."""
+        return self._reachable(service, self.calls)
+
+    def upstream(self, service: str) -> List[str]:
+        """Every service whose requests can pass through `service`, nearest first."""
+        return self._reachable(service, self.callers)
+
+    def _name(self, service: str) -> str:
+        return f"{service} (Database)" if service in self.databases else service
+
+    def render(self, service: str, direction: str = "both") -> str:
+        lines = [f"[Service]: {self._name(service)}" + (" (Entrypoint)" if service in self.entrypoints else "")]
+        if direction in ("both", "upstream"):
+            callers, upstream = self.callers[service], self.upstream(service)
+            lines.append(f"[Fan-in]: {len(callers)} direct caller(s) ({', '.join(callers) or 'User Traffic'}); "
+                         f"{len(upstream)} transitive ({', '.join(upstream) or 'none'})")
+        if direction in ("both", "downstream"):
+            calls, downstream = self.calls[service], self.downstream(service)
+            lines.append(f"[Fan-out]: {len(calls)} direct callee(s) ({', '.join(calls) or 'none'}); "
+                         f"{len(downstream)} transitive ({', '.join(downstream) or 'none'})")
+        if direction in ("both", "upstream"):
+            chains = self.upstream_chains(service)
+            lines.append(f"[Upstream Chains] ({len(chains)}):")
+            lines.extend("  " + " -> ".join(map(self._name, chain)) for chain in chains)
+            if not chains:
+                lines.append("  (None - called by user traffic only)")
+        if direction in ("both", "downstream"):
+            chains = self.downstream_chains(service)
+            lines.append(f"[Downstream Chains] ({len(chains)}):")
+            lines.extend("  " + " -> ".join(map(self._name, chain)) for chain in chains)
+            if not chains:
+                lines.append("  (None - Leaf Database)" if service in self.databases else "  (None - Leaf Service)")
+        return "\n".join(lines)
+
+
+def shared_graph(tool_cache: Dict[str, object]) -> Optional[ServiceGraph]:
+    """The graph of a case's dependency trees, shared by every case that recorded the same trees."""
+    trees = sorted((k, v) for k, v in tool_cache.items()
+                   if k.startswith("GetServiceDependencies:") and isinstance(v, str))
+    if not trees:
+        return None
+    digest = hashlib.sha1("\0".join(k + "\0" + v for k, v in trees).encode("utf-8")).digest()
+    graph = _GRAPHS.get(digest)
+    if graph is None:
+        with _GRAPHS_LOCK:
+            graph = _GRAPHS.get(digest)
+            if graph is None:
+                graph = _GRAPHS[digest] = ServiceGraph.from_tool_cache(dict(trees))
+    return graph
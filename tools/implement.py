@@ -1,8 +1,21 @@
 import shlex
 import os
 import json
+import logging
 import subprocess
-from typing import Optional
+import sys
+from typing import Callable, Optional
+from .anomaly import alert_window, load_metrics, rank_anomalies, render_ranking
+from .dependency_graph import DIRECTIONS, ServiceGraph, shared_graph
+from .k8s_model import MODEL_CLASSES, ClusterState, _get_key
+from .log_index import LOCAL_UTC_OFFSET_HOURS, LogIndex, format_local, parse_time_range
+from .metrics import instrument, tool_metrics
+from .names import NameIndex, did_you_mean, workload_of
+from .search import DEFAULT_LIMIT, SnapshotSearchIndex
+
+logger = logging.getLogger(__name__)
+
+RESOLVED_NOTE = '{resource_type} "{name}" not found in namespace "{namespace}"; showing "{resolved}" instead.\n'
 
 # boutique 服务列表
 BOUTIQUE=['adservice','cartservice','checkoutservice','currencyservice','emailservice','frontend','paymentservice','productcatalogservice','recommendationservice','redis-cart','shippingservice']
@@ -31,6 +44,16 @@ RESOURCE_ALIASES_DB = {
     "resourcequota": "resourcequota","resourcequotas":"resourcequota"
 }
 
+def _deep_size(value) -> int:
+    """sys.getsizeof of a parsed JSON value and everything it holds."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + _deep_size(v) for k, v in value.items())
+    elif isinstance(value, list):
+        size += sum(_deep_size(v) for v in value)
+    return size
+
+
 def normalize_resource_type(resource_type):
     if not resource_type:
         return None
@@ -38,17 +61,157 @@ def normalize_resource_type(resource_type):
     return RESOURCE_ALIASES_DB.get(key)
 
 
+_UNRESOLVED = object()
+
+
 class KubernetesTools:
-    def __init__(self,case_path):
-        
+    def __init__(self,case_path, compact=False):
+        """
+        :param compact: drop the `kubectl get` views the object model (k8s_model) renders
+                        byte-identically, keeping one copy of the state in memory
+        """
+        # "<category>/<case>" label used by the tool metrics
+        self.case_id = "/".join(os.path.normpath(case_path).split(os.sep)[-2:])
+        self.case_path = case_path
         tool_cache_path=os.path.join(case_path, "tool_cache.json")
         raw_log_path=os.path.join(case_path,"raw_data", "logs.json")
         with open(tool_cache_path, 'r', encoding='utf-8') as f:
             self.tool_cache = json.load(f)
-        with open(raw_log_path, 'r', encoding='utf-8') as f:
-            self.raw_logs = json.load(f)
+        # performance and some infrastructure cases ship without logs.json
+        self.raw_logs = {}
+        if os.path.exists(raw_log_path):
+            with open(raw_log_path, 'r', encoding='utf-8') as f:
+                self.raw_logs = json.load(f)
+        self._cluster_state = None
+        self._name_index = None
+        self._log_index = None
+        self._search_index = None
+        # Resolved on first use; None is a valid value (a case without dependency trees)
+        self._service_graph = _UNRESOLVED
+        # Size of the parsed snapshot, measured on the first footprint() call (CaseCache only)
+        self._loaded_bytes = None
+        if compact:
+            self.compact()
 
-   
+    @property
+    def cluster_state(self) -> ClusterState:
+        # Parsed on first use; cases that never miss a GetResources view never pay for it
+        if self._cluster_state is None:
+            self._cluster_state = ClusterState.from_tool_cache(self.tool_cache)
+        return self._cluster_state
+
+    @property
+    def name_index(self) -> NameIndex:
+        if self._name_index is None:
+            # compact() may have dropped named views; their names are still in the object model
+            state = self._cluster_state
+            extra = ((kind, state.namespace, obj.name) for kind in state.kinds() if kind != "events"
+                     for obj in state.list(kind)) if state is not None else ()
+            self._name_index = NameIndex.from_tool_cache(self.tool_cache, extra)
+        return self._name_index
+
+    @property
+    def log_index(self) -> LogIndex:
+        if self._log_index is None:
+            self._log_index = LogIndex(self.raw_logs)
+        return self._log_index
+
+    @property
+    def search_index(self) -> SnapshotSearchIndex:
+        if self._search_index is None:
+            # Views dropped by compact() are searched through their rendered lists
+            state = self._cluster_state
+            extra = []
+            if state is not None:
+                for kind in state.kinds():
+                    key = _get_key(kind, state.namespace)
+                    if key not in self.tool_cache:
+                        extra.append((key, state.render_get(kind) or ""))
+            self._search_index = SnapshotSearchIndex.build(self.tool_cache, self.raw_logs, extra)
+        return self._search_index
+
+    def footprint(self) -> int:
+        """Approximate bytes held by this case: the parsed snapshot plus the search index once built."""
+        if self._loaded_bytes is None:
+            self._loaded_bytes = _deep_size(self.tool_cache) + _deep_size(self.raw_logs)
+        return self._loaded_bytes + (self._search_index.nbytes if self._search_index is not None else 0)
+
+    def compact(self) -> int:
+        """Drop cached views the object model reproduces exactly; returns the number dropped."""
+        state = self.cluster_state
+        dropped = []
+        for command_key, value in self.tool_cache.items():
+            if not command_key.startswith("GetResources:"):
+                continue
+            params = json.loads(command_key.split(":", 1)[1])
+            if params.get("namespace") != state.namespace:
+                continue
+            if params.get("label_selector"):
+                try:
+                    rendered = state.render_selected(params["resource_type"], params["label_selector"])
+                except ValueError:
+                    continue
+            else:
+                rendered = state.render_get(params["resource_type"], params.get("name", ""),
+                                            params.get("output_wide", False), params.get("show_labels", False))
+            if rendered is not None and rendered == value:
+                dropped.append(command_key)
+        for command_key in dropped:
+            del self.tool_cache[command_key]
+        return len(dropped)
+
+    def _lookup(self, command_key: str, render: Optional[Callable[[], Optional[str]]] = None,
+                label: Optional[str] = None):
+        """
+        Snapshot lookup that records a hit or miss; a miss still raises KeyError. `render`
+        builds the answer from the object model when the exact view was never captured.
+        `label` names the hit in the metrics, e.g. "resolved".
+        """
+        tool_name = command_key.split(":", 1)[0]
+        logger.debug(command_key)
+        try:
+            result = self.tool_cache[command_key]
+        except KeyError:
+            rendered = render() if render is not None else None
+            if rendered is not None:
+                tool_metrics.observe_lookup(tool_name, hit=True, result=label or "rendered", case=self.case_id)
+                return rendered
+            tool_metrics.observe_lookup(tool_name, hit=False, case=self.case_id)
+            raise
+        tool_metrics.observe_lookup(tool_name, hit=True, result=label, case=self.case_id)
+        return result
+
+    def _render_get(self, resource_type: str, namespace: str, name: Optional[str],
+                    show_labels: bool, output_wide: bool) -> Optional[str]:
+        if resource_type not in MODEL_CLASSES or namespace != self.cluster_state.namespace:
+            return None
+        return self.cluster_state.render_get(resource_type, name or "", output_wide, show_labels)
+
+    def _render_selected(self, resource_type: str, namespace: str, label_selector: str) -> Optional[str]:
+        if resource_type not in MODEL_CLASSES or namespace != self.cluster_state.namespace:
+            return None
+        try:
+            return self.cluster_state.render_selected(resource_type, label_selector)
+        except ValueError as e:
+            return f"Error: {e}"
+
+    def _resolve_name(self, resource_type: str, namespace: str, name: str,
+                      fetch: Callable[[str], str]):
+        """
+        After a miss on `name`: (note + output for the resolved name, []) when the name index
+        finds the intended object, else (None, ranked suggestions). fetch(name) may raise KeyError.
+        """
+        resolved, suggestions = self.name_index.lookup(resource_type, namespace, name)
+        if resolved is None or resolved == name:
+            return None, suggestions
+        try:
+            output = fetch(resolved)
+        except KeyError:
+            return None, [resolved]
+        note = RESOLVED_NOTE.format(resource_type=resource_type, name=name, namespace=namespace, resolved=resolved)
+        return note + output, []
+
+    @instrument
     def GetResources(
         self,
         resource_type: str,
@@ -85,18 +248,29 @@ class KubernetesTools:
                 "Error: Only one of '--show-labels', '-o wide', or '-l <selector>' can be specified at a time for kubectl get."
             )
         
+        if label_selector and not name:
+            render = lambda: self._render_selected(resource_type_norm, namespace, label_selector)
+        else:
+            render = lambda: self._render_get(resource_type_norm, namespace, name, show_labels, output_wide)
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key, render)
         except KeyError:
 
             if name:
-                return f"Error from server (NotFound): {resource_type_norm} \"{name}\" not found in namespace \"{namespace}\""
+                resolved_key = lambda n: f"GetResources:{json.dumps({**params, 'name': n}, ensure_ascii=False,separators=(',', ':'))}"
+                output, suggestions = self._resolve_name(resource_type_norm, namespace, name, lambda n: self._lookup(
+                    resolved_key(n), lambda: self._render_get(resource_type_norm, namespace, n, show_labels, output_wide),
+                    label="resolved"))
+                if output is not None:
+                    return output
+                return f"Error from server (NotFound): {resource_type_norm} \"{name}\" not found in namespace \"{namespace}\"" + did_you_mean(suggestions)
             else:
                 return f"No resources found in {namespace} namespace."
         except Exception as e:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
     
  
+    @instrument
     def DescribeResource(
         self,
         resource_type: str,
@@ -122,18 +296,23 @@ class KubernetesTools:
         }
 
         command_key = f"DescribeResource:{json.dumps(params, ensure_ascii=False,separators=(',', ':'))}"
-        print(command_key)
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
             if name:
-                return f"Error from server (NotFound): {resource_type} \"{name}\" not found in namespace \"{namespace}\""
+                output, suggestions = self._resolve_name(resource_type_norm, namespace, name, lambda n: self._lookup(
+                    f"DescribeResource:{json.dumps({**params, 'name': n}, ensure_ascii=False,separators=(',', ':'))}",
+                    label="resolved"))
+                if output is not None:
+                    return output
+                return f"Error from server (NotFound): {resource_type} \"{name}\" not found in namespace \"{namespace}\"" + did_you_mean(suggestions)
             else:
                 return "Error: resource name is required for 'describe' command."
         except Exception as e:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
     
  
+    @instrument
     def GetAppYAML(
         self, app_name: str,
         ) -> str:
@@ -145,10 +324,9 @@ class KubernetesTools:
         
         params = {"app_name": app_name}
         command_key = f"GetAppYAML:{json.dumps(params,separators=(',', ':'))}"
-        print(command_key)
       
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
             
             error_msg = f"Error: YAML configuration for '{app_name}' is not recorded."
@@ -157,6 +335,7 @@ class KubernetesTools:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
     
 
+    @instrument
     def GetServiceDependencies(
         self, service_name: str
     ) -> str:
@@ -168,9 +347,8 @@ class KubernetesTools:
         
         params = {"service_name": service_name}
         command_key = f"GetServiceDependencies:{json.dumps(params,separators=(',', ':'))}"
-        print(command_key)
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
             error_msg = f" Error: Dependencies for '{service_name}' not recorded in trace data."
             return error_msg
@@ -178,6 +356,32 @@ class KubernetesTools:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
 
 
+    @property
+    def service_graph(self) -> Optional[ServiceGraph]:
+        if self._service_graph is _UNRESOLVED:
+            self._service_graph = shared_graph(self.tool_cache)
+        return self._service_graph
+
+    @instrument
+    def GetServiceCallChains(
+        self, service_name: str, direction: str = "both"
+    ) -> str:
+        if not service_name:
+            raise ValueError("Error: 'GetServiceCallChains' command requires a specific 'service_name'.")
+        if service_name not in BOUTIQUE:
+            raise ValueError(f"Error: Resource '{service_name}' is not in the allowed list of boutique services. Allowed: {BOUTIQUE}")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Error: 'direction' must be one of {list(DIRECTIONS)}, got '{direction}'.")
+
+        graph = self.service_graph
+        if graph is None or service_name not in graph:
+            tool_metrics.observe_lookup("GetServiceCallChains", hit=False, case=self.case_id)
+            return f"Error: Dependencies for '{service_name}' not recorded in trace data."
+        tool_metrics.observe_lookup("GetServiceCallChains", hit=True, case=self.case_id)
+        return graph.render(service_name, direction)
+
+
+    @instrument
     def GetRecentLogs(
         self,
         namespace: str,
@@ -191,15 +395,65 @@ class KubernetesTools:
         if namespace != "boutique":
             return ""
         
+        logger.debug("GetRecentLogs:%s", service_name)
         try:
-            return self.raw_logs[service_name][-lines:]
+            recent_logs = self.raw_logs[service_name][-lines:]
         except KeyError:
+            tool_metrics.observe_lookup("GetRecentLogs", hit=False, case=self.case_id)
             error_msg = f" Error: The query result of GetRecentLogs was not found in records. Please check whether the parameters are correct (such as whether the resource type, name, namespace exist or are misspelled) to avoid invalid function calls."
             return error_msg
         except Exception as e:
             return f"An unexpected error occurred during snapshot lookup for GetRecentLogs:{service_name}: {e}"
+        tool_metrics.observe_lookup("GetRecentLogs", hit=True, case=self.case_id)
+        return recent_logs
 
     
+    @instrument
+    def GetLogsInTimeRange(
+        self,
+        namespace: str,
+        service_name: str,
+        time_range: str = None,
+        lines: int = 100
+    ) -> str:
+        if not service_name:
+            raise ValueError("Error: GetLogsInTimeRange requires a specific 'service_name'.")
+        if not namespace:
+            raise ValueError("Error: GetLogsInTimeRange requires a specific 'namespace'.")
+        if namespace != "boutique":
+            return ""
+        if time_range:
+            try:
+                start, end = parse_time_range(time_range)
+            except ValueError as e:
+                raise ValueError(f"Error: {e}")
+
+        index = self.log_index.service(service_name)
+        if index is None:
+            tool_metrics.observe_lookup("GetLogsInTimeRange", hit=False, case=self.case_id)
+            return f"Error: Logs of '{service_name}' are not available in the dataset."
+        tool_metrics.observe_lookup("GetLogsInTimeRange", hit=True, case=self.case_id)
+        span = index.span()
+        zone = f"UTC{LOCAL_UTC_OFFSET_HOURS:+03d}:00"
+        if span is None:
+            return f"[Logs] {service_name} has no timestamped log lines; use GetRecentLogs instead."
+        if not time_range:
+            # Default: the alerts' time range; cases with logs usually have no alerts, so else the
+            # whole log span (the last `lines` of it are shown)
+            window = alert_window(self._alerts())
+            start, end = parse_time_range(f"{window[0]} ~ {window[1]}") if window else span
+        offsets = index.window(start, end)
+        header = (f"[Logs] {service_name}, {format_local(start)} ~ {format_local(end)} ({zone}): "
+                  f"{len(offsets)} of {len(index.lines)} lines")
+        if not offsets:
+            return (header + f". The logs cover {format_local(span[0])} ~ {format_local(span[1])} ({zone}); "
+                    "pick a time range inside it.")
+        if len(offsets) > lines:
+            header += f", showing the last {lines}"
+            offsets = offsets[-lines:]
+        return "\n".join([header] + [str(index.lines[offset]) for offset in offsets])
+
+    @instrument
     def CheckServiceConnectivity(
         self,
         service_name: str,
@@ -224,21 +478,20 @@ class KubernetesTools:
             "port": port
         }
         command_key = f"CheckServiceConnectivity:{json.dumps(params,separators=(',', ':'))}"
-        print(command_key)
 
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
             return f"Connection failed"
         except Exception as e:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
 
+    @instrument
     def GetClusterConfiguration(self) -> str:
    
         command_key = "GetClusterConfiguration:{}"
-        print(command_key)
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
             error_msg = f"Error: Cluster configuration snapshot is not available in the dataset."
             return error_msg
@@ -246,18 +499,65 @@ class KubernetesTools:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
         
 
+    @instrument
     def GetAlerts(self) -> str:
         command_key = "GetAlerts:{}"
 
-        print(command_key)
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
             error_msg = f"Error: Cluster alerts is not available in the dataset."
             return error_msg
         except Exception as e:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
 
+    def _alerts(self) -> list:
+        alerts = self.tool_cache.get("GetAlerts:{}")
+        if isinstance(alerts, str):
+            try:
+                alerts = json.loads(alerts) if alerts.strip() else {}
+            except ValueError:
+                alerts = {}
+        return alerts.get("alerts") or [] if isinstance(alerts, dict) else []
+
+    @instrument
+    def GetAnomalyRanking(self, top: int = 10) -> str:
+        try:
+            top = int(top)
+        except (ValueError, TypeError):
+            raise ValueError(f"Error: 'top' must be an integer, got {type(top).__name__}")
+        if top < 1:
+            raise ValueError("Error: 'top' must be at least 1.")
+
+        alerts = self._alerts()
+        error_logs = {}
+        for command_key, value in self.tool_cache.items():
+            if command_key.startswith("GetErrorLogs:"):
+                error_logs[json.loads(command_key.split(":", 1)[1]).get("service_name", "")] = value
+        metrics_path = os.path.join(self.case_path, "raw_data", "metrics.csv")
+        metrics = load_metrics(metrics_path) if os.path.exists(metrics_path) else None
+        placement = {workload_of(pod.name): pod.node for pod in self.cluster_state.list("pods") if pod.node}
+
+        sources = ["alerts"] + (["metrics"] if metrics else []) + (["error logs"] if error_logs else [])
+        ranking = rank_anomalies(alerts, BOUTIQUE, metrics, error_logs, self.service_graph, placement)
+        tool_metrics.observe_lookup("GetAnomalyRanking", hit=True, case=self.case_id)
+        return render_ranking(ranking, sources, top)
+
+    @instrument
+    def SearchSnapshot(self, query: str, limit: int = DEFAULT_LIMIT) -> str:
+        if not query or not query.strip():
+            raise ValueError("Error: 'SearchSnapshot' requires a non-empty 'query'.")
+        try:
+            limit = int(limit)
+        except (ValueError, TypeError):
+            raise ValueError(f"Error: 'limit' must be an integer, got {type(limit).__name__}")
+        if limit < 1:
+            raise ValueError("Error: 'limit' must be at least 1.")
+        output = self.search_index.render(query, limit)
+        tool_metrics.observe_lookup("SearchSnapshot", hit=output.startswith("[Search]"), case=self.case_id)
+        return output
+
+    @instrument
     def GetErrorLogs(
             self,
             namespace: str,
@@ -272,9 +572,8 @@ class KubernetesTools:
             "service_name": service_name
             }
         command_key = f"GetErrorLogs:{json.dumps(params,separators=(',', ':'))}"
-        print(command_key)
         try:
-            log_summary_data = self.tool_cache[command_key]
+            log_summary_data = self._lookup(command_key)
 
             return json.dumps(log_summary_data, indent=2, ensure_ascii=False)
         except KeyError:
@@ -283,6 +582,7 @@ class KubernetesTools:
         except Exception as e:
             return f"An unexpected error occurred during snapshot lookup for '{command_key}': {e}"
 
+    @instrument
     def CheckNodeServiceStatus(self, node_name: str, service_name: str) -> str:
 
         if not node_name:
@@ -296,10 +596,9 @@ class KubernetesTools:
             "service_name": service_name
         }
         command_key = f"CheckNodeServiceStatus:{json.dumps(params,separators=(',', ':'))}"
-        print(command_key)
 
         try:
-            return self.tool_cache[command_key]
+            return self._lookup(command_key)
         except KeyError:
 
             error_msg = f"Error: Status information for cluster control plane components is not available in the dataset"
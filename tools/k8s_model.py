@@ -0,0 +1,305 @@
+"""
+Structured object model of a case snapshot, with kubectl-style rendering.
+
+tool_cache.json stores every `kubectl get` view (plain, -o wide, --show-labels,
+per name) as its own pre-rendered string. ClusterState parses the list views
+once into compact __slots__ objects (pods, nodes, services, deployments, PVCs,
+resource quotas, events). It can then render any view on demand, including
+combinations that were never captured.
+
+Tables are parsed by the column offsets of their header, as kubectl's
+tabwriter aligns every cell to its header. Rendering uses the same layout:
+each column is as wide as its widest cell, plus 3 spaces of padding.
+"""
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from .labels import LabelIndex, parse_selector
+
+_HEADER_CELL = re.compile(r"\S+(?: \S+)*")
+COLUMN_PADDING = 3
+
+
+def parse_table(text: str) -> Tuple[List[str], List[List[str]]]:
+    """(headers, rows) of a kubectl table; ([], []) for empty or non-table output."""
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    if not lines or not lines[0].startswith(("NAME", "LAST SEEN")):
+        return [], []
+    cells = list(_HEADER_CELL.finditer(lines[0]))
+    headers = [cell.group() for cell in cells]
+    starts = [cell.start() for cell in cells]
+    rows = []
+    for line in lines[1:]:
+        row = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else None
+            row.append(line[start:end].strip())
+        rows.append(row)
+    return headers, rows
+
+
+def render_table(headers: List[str], rows: Iterable[List[str]]) -> str:
+    rows = list(rows)
+    widths = [max([len(headers[i])] + [len(row[i]) for row in rows]) for i in range(len(headers))]
+    lines = []
+    for row in [headers] + rows:
+        cells = [cell.ljust(widths[i] + COLUMN_PADDING) for i, cell in enumerate(row[:-1])]
+        lines.append("".join(cells) + row[-1])
+    return "\n".join(lines) + "\n"
+
+
+def parse_labels(text: str) -> Dict[str, str]:
+    """`app=frontend,tier=web` -> dict; `<none>` and empty give {}."""
+    labels = {}
+    if not text or text == "<none>":
+        return labels
+    for pair in text.split(","):
+        key, _, value = pair.partition("=")
+        if key:
+            labels[key] = value
+    return labels
+
+
+class K8sObject:
+    """
+    One row of a resource list. `values` follows the class COLUMNS + WIDE_COLUMNS; the
+    LABELS column is kept parsed in `labels`.
+    """
+    __slots__ = ("name", "namespace", "labels", "values")
+    KIND = ""
+    COLUMNS: Tuple[str, ...] = ("NAME",)
+    WIDE_COLUMNS: Tuple[str, ...] = ()
+    _INDEX: Dict[str, int] = {}
+
+    def __init__(self, name: str, namespace: str, values: Tuple[str, ...], labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.namespace = namespace
+        self.values = values
+        self.labels = labels
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._INDEX = {column: i for i, column in enumerate(cls.COLUMNS + cls.WIDE_COLUMNS)}
+
+    def get(self, column: str, default: str = "") -> str:
+        i = self._INDEX.get(column)
+        return self.values[i] if i is not None and i < len(self.values) and self.values[i] is not None else default
+
+    def row(self, columns: Iterable[str]) -> List[str]:
+        row = []
+        for column in columns:
+            if column == "LABELS":
+                row.append(",".join(f"{k}={v}" for k, v in self.labels.items()) if self.labels else "<none>")
+            else:
+                row.append(self.get(column, "<none>"))
+        return row
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.namespace}/{self.name})"
+
+
+class Pod(K8sObject):
+    __slots__ = ()
+    KIND = "pods"
+    COLUMNS = ("NAME", "READY", "STATUS", "RESTARTS", "AGE")
+    WIDE_COLUMNS = ("IP", "NODE", "NOMINATED NODE", "READINESS GATES")
+
+    @property
+    def status(self) -> str:
+        return self.get("STATUS")
+
+    @property
+    def node(self) -> str:
+        return self.get("NODE")
+
+    @property
+    def healthy(self) -> bool:
+        ready, _, total = self.get("READY").partition("/")
+        return self.status == "Running" and ready == total
+
+
+class Node(K8sObject):
+    __slots__ = ()
+    KIND = "nodes"
+    COLUMNS = ("NAME", "STATUS", "ROLES", "AGE", "VERSION")
+    WIDE_COLUMNS = ("INTERNAL-IP", "EXTERNAL-IP", "OS-IMAGE", "KERNEL-VERSION", "CONTAINER-RUNTIME")
+
+    @property
+    def status(self) -> str:
+        return self.get("STATUS")
+
+
+class Service(K8sObject):
+    __slots__ = ()
+    KIND = "services"
+    COLUMNS = ("NAME", "TYPE", "CLUSTER-IP", "EXTERNAL-IP", "PORT(S)", "AGE")
+    WIDE_COLUMNS = ("SELECTOR",)
+
+    @property
+    def selector(self) -> Dict[str, str]:
+        return parse_labels(self.get("SELECTOR"))
+
+
+class Deployment(K8sObject):
+    __slots__ = ()
+    KIND = "deployments"
+    COLUMNS = ("NAME", "READY", "UP-TO-DATE", "AVAILABLE", "AGE")
+    WIDE_COLUMNS = ("CONTAINERS", "IMAGES", "SELECTOR")
+
+    @property
+    def selector(self) -> Dict[str, str]:
+        return parse_labels(self.get("SELECTOR"))
+
+
+class PersistentVolumeClaim(K8sObject):
+    __slots__ = ()
+    KIND = "persistentvolumeclaims"
+    COLUMNS = ("NAME", "STATUS", "VOLUME", "CAPACITY", "ACCESS MODES", "STORAGECLASS", "VOLUMEATTRIBUTESCLASS", "AGE")
+    WIDE_COLUMNS = ("VOLUMEMODE",)
+
+
+class ResourceQuota(K8sObject):
+    __slots__ = ()
+    KIND = "resourcequota"
+    COLUMNS = ("NAME", "AGE", "REQUEST", "LIMIT")
+
+
+class Event(K8sObject):
+    __slots__ = ()
+    KIND = "events"
+    COLUMNS = ("LAST SEEN", "TYPE", "REASON", "OBJECT", "MESSAGE")
+
+
+MODEL_CLASSES: Dict[str, Type[K8sObject]] = {
+    cls.KIND: cls for cls in (Pod, Node, Service, Deployment, PersistentVolumeClaim, ResourceQuota, Event)
+}
+
+
+def _get_key(resource_type: str, namespace: str, name: str = "", **flags) -> str:
+    # Same key layout as KubernetesTools.GetResources
+    params = {"resource_type": resource_type, "name": name, "namespace": namespace, **flags}
+    return f"GetResources:{json.dumps(params, ensure_ascii=False, separators=(',', ':'))}"
+
+
+class ClusterState:
+    """Objects of the modelled kinds in one case snapshot, in kubectl list order."""
+
+    def __init__(self, namespace: str = "boutique"):
+        self.namespace = namespace
+        self.objects: Dict[str, Dict[str, K8sObject]] = {kind: {} for kind in MODEL_CLASSES}
+        self._label_indexes: Dict[str, LabelIndex] = {}
+
+    @classmethod
+    def from_tool_cache(cls, tool_cache: Dict[str, object], namespace: str = "boutique") -> "ClusterState":
+        state = cls(namespace)
+        for kind, model in MODEL_CLASSES.items():
+            plain = tool_cache.get(_get_key(kind, namespace))
+            headers, rows = parse_table(plain if isinstance(plain, str) else "")
+            if not headers:
+                continue
+            columns = model.COLUMNS + model.WIDE_COLUMNS
+            table = {}
+            for i, row in enumerate(rows):
+                values = dict(zip(headers, row))
+                # events have no NAME column; their position keeps them unique and ordered
+                name = values.get("NAME", str(i))
+                table[name] = values
+            for flags, extra in (({"output_wide": True}, model.WIDE_COLUMNS), ({"show_labels": True}, ("LABELS",))):
+                if not extra:
+                    continue
+                view = tool_cache.get(_get_key(kind, namespace, **flags))
+                view_headers, view_rows = parse_table(view if isinstance(view, str) else "")
+                for row in view_rows:
+                    values = dict(zip(view_headers, row))
+                    target = table.get(values.get("NAME"))
+                    if target is not None:
+                        for column in extra:
+                            if column in values:
+                                target[column] = values[column]
+            objects = state.objects[kind]
+            for name, values in table.items():
+                labels = parse_labels(values["LABELS"]) if "LABELS" in values else None
+                objects[name] = model(name, namespace, tuple(values.get(c) for c in columns), labels)
+        return state
+
+    def kinds(self) -> List[str]:
+        return [kind for kind, objects in self.objects.items() if objects]
+
+    def has(self, kind: str) -> bool:
+        return bool(self.objects.get(kind))
+
+    def find(self, kind: str, name: str) -> Optional[K8sObject]:
+        return self.objects.get(kind, {}).get(name)
+
+    def list(self, kind: str) -> List[K8sObject]:
+        return list(self.objects.get(kind, {}).values())
+
+    def columns(self, kind: str, output_wide: bool = False, show_labels: bool = False) -> Tuple[str, ...]:
+        model = MODEL_CLASSES[kind]
+        if output_wide:
+            return model.COLUMNS + model.WIDE_COLUMNS
+        if show_labels and kind != "events":
+            return model.COLUMNS + ("LABELS",)
+        return model.COLUMNS
+
+    def can_render(self, kind: str, output_wide: bool = False, show_labels: bool = False) -> bool:
+        """Whether the snapshot captured the columns this view needs."""
+        objects = self.list(kind)
+        if not objects:
+            return False
+        if show_labels and not output_wide and kind != "events":
+            return all(obj.labels is not None for obj in objects)
+        if output_wide:
+            model = MODEL_CLASSES[kind]
+            return all(obj.get(column, None) is not None for obj in objects for column in model.WIDE_COLUMNS)
+        return True
+
+    def render(self, kind: str, objects: Iterable[K8sObject], output_wide: bool = False,
+               show_labels: bool = False) -> str:
+        objects = list(objects)
+        if not objects:
+            return f"No resources found in {self.namespace} namespace."
+        columns = self.columns(kind, output_wide, show_labels)
+        return render_table(list(columns), [obj.row(columns) for obj in objects])
+
+    def render_get(self, kind: str, name: str = "", output_wide: bool = False,
+                   show_labels: bool = False) -> Optional[str]:
+        """
+        `kubectl get <kind> [name] [-o wide|--show-labels]`; None when the view cannot be
+        rendered from the snapshot (kind not modelled, columns never captured, unknown name).
+        """
+        if kind not in MODEL_CLASSES or not self.can_render(kind, output_wide, show_labels):
+            return None
+        if name:
+            obj = self.find(kind, name)
+            return self.render(kind, [obj], output_wide, show_labels) if obj is not None else None
+        return self.render(kind, self.list(kind), output_wide, show_labels)
+
+    def label_index(self, kind: str) -> Optional[LabelIndex]:
+        """Label postings of a kind; None when its labels were never captured."""
+        if kind not in self._label_indexes:
+            objects = self.list(kind)
+            if not objects or any(obj.labels is None for obj in objects):
+                return None
+            self._label_indexes[kind] = LabelIndex((obj.name, obj.labels) for obj in objects)
+        return self._label_indexes[kind]
+
+    def select(self, kind: str, selector: str) -> Optional[List[K8sObject]]:
+        """Objects matching a label selector (ValueError if it does not parse); None if not answerable."""
+        requirements = parse_selector(selector)
+        index = self.label_index(kind)
+        if index is None:
+            return None
+        objects = self.objects[kind]
+        return [objects[name] for name in index.select(requirements)]
+
+    def render_selected(self, kind: str, selector: str) -> Optional[str]:
+        """`kubectl get <kind> -l <selector>`; None when the kind or its labels are not in the snapshot."""
+        if kind not in MODEL_CLASSES:
+            return None
+        selected = self.select(kind, selector)
+        if selected is None:
+            return None
+        return self.render(kind, selected)
+
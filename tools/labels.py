@@ -0,0 +1,111 @@
+"""
+Kubernetes label selectors evaluated against the snapshot's object model.
+
+Supports the kubectl `-l` grammar: equality (`app=frontend`, `app==frontend`,
+`tier!=cache`), set-based (`env in (prod,staging)`, `env notin (dev)`),
+existence (`app`, `!app`) and comma-separated combinations of them.
+LabelIndex keeps per (key, value) postings so equality and `in` terms narrow
+the candidates before the remaining terms are checked.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+_SET_TERM = re.compile(r"^\s*([A-Za-z0-9._/-]+)\s+(in|notin)\s+\(([^)]*)\)\s*$")
+_EQ_TERM = re.compile(r"^\s*([A-Za-z0-9._/-]+)\s*(==|=|!=)\s*([A-Za-z0-9._-]*)\s*$")
+_EXISTS_TERM = re.compile(r"^\s*(!?)\s*([A-Za-z0-9._/-]+)\s*$")
+
+
+class Requirement:
+    __slots__ = ("key", "op", "values")
+
+    def __init__(self, key: str, op: str, values: FrozenSet[str] = frozenset()):
+        self.key = key
+        self.op = op            # "in", "notin", "exists", "!exists"
+        self.values = values
+
+    def matches(self, labels: Dict[str, str]) -> bool:
+        if self.op == "in":
+            return labels.get(self.key) in self.values
+        if self.op == "notin":
+            return labels.get(self.key) not in self.values
+        if self.op == "exists":
+            return self.key in labels
+        return self.key not in labels
+
+    def __repr__(self):
+        return f"Requirement({self.key} {self.op} {sorted(self.values)})"
+
+
+def _split_terms(selector: str) -> List[str]:
+    # Commas separate terms, except inside the parentheses of a set term
+    terms, depth, start = [], 0, 0
+    for i, char in enumerate(selector):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            terms.append(selector[start:i])
+            start = i + 1
+    terms.append(selector[start:])
+    return terms
+
+
+def parse_selector(selector: str) -> List[Requirement]:
+    """Parse a label selector; raises ValueError like kubectl's `unable to parse requirement`."""
+    requirements = []
+    for term in _split_terms(selector or ""):
+        if not term.strip():
+            continue
+        match = _SET_TERM.match(term)
+        if match:
+            values = frozenset(v.strip() for v in match.group(3).split(",") if v.strip())
+            requirements.append(Requirement(match.group(1), match.group(2), values))
+            continue
+        match = _EQ_TERM.match(term)
+        if match:
+            op = "notin" if match.group(2) == "!=" else "in"
+            requirements.append(Requirement(match.group(1), op, frozenset({match.group(3)})))
+            continue
+        match = _EXISTS_TERM.match(term)
+        if match:
+            requirements.append(Requirement(match.group(2), "!exists" if match.group(1) else "exists"))
+            continue
+        raise ValueError(f"unable to parse requirement: {term.strip()!r}")
+    return requirements
+
+
+class LabelIndex:
+    """Label postings of one resource kind; `select` returns matches in the original order."""
+
+    def __init__(self, items: Iterable[Tuple[str, Dict[str, str]]]):
+        self.order: List[str] = []
+        self.labels: Dict[str, Dict[str, str]] = {}
+        self.postings: Dict[Tuple[str, str], Set[str]] = {}
+        for name, labels in items:
+            self.order.append(name)
+            self.labels[name] = labels
+            for pair in labels.items():
+                self.postings.setdefault(pair, set()).add(name)
+
+    def _candidates(self, requirement: Requirement) -> Optional[Set[str]]:
+        if requirement.op != "in":
+            return None
+        names = set()
+        for value in requirement.values:
+            names |= self.postings.get((requirement.key, value), set())
+        return names
+
+    def select(self, requirements: List[Requirement]) -> List[str]:
+        candidates = None
+        rest = []
+        for requirement in requirements:
+            names = self._candidates(requirement)
+            if names is None:
+                rest.append(requirement)
+            else:
+                candidates = names if candidates is None else candidates & names
+        if candidates is not None and not candidates:
+            return []
+        pool = self.order if candidates is None else [name for name in self.order if name in candidates]
+        return [name for name in pool if all(r.matches(self.labels[name]) for r in rest)]
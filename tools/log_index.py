@@ -0,0 +1,179 @@
+"""
+Time-indexed view of a case's raw_data/logs.json.
+
+Each service logs in its own format: log4j JSON (`instant.epochSecond` and
+`nanoOfSecond`), Go/zap JSON with an ISO `timestamp`, pino JSON with epoch
+milliseconds in `time`, Python JSON with epoch seconds in `timestamp`, lines
+that start with an ISO timestamp, and Redis's `1:M 21 Nov 2025 11:49:19.579`.
+parse_log_time reads all of them with regexes and never decodes the JSON.
+
+LogIndex keeps, per service, the line timestamps as a sorted array('d') with
+the matching line offsets in an array('I'), so a time window is two bisects.
+Lines without a timestamp (stack traces, .NET continuation lines) take the
+time of the line before them. A service is indexed the first time it is queried.
+
+Alert `time_range`s and metrics.csv `time` are naive cluster-local timestamps
+(UTC+8 in this benchmark, LOCAL_UTC_OFFSET_HOURS). Log times are epoch based,
+so windows are converted to epoch seconds before the search.
+"""
+import bisect
+import re
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+LOCAL_UTC_OFFSET_HOURS = 8
+
+_EPOCH_INSTANT = re.compile(r'"epochSecond"\s*:\s*(\d+)\s*,\s*"nanoOfSecond"\s*:\s*(\d+)')
+_EPOCH_NUMBER = re.compile(r'"(?:time|timestamp|ts)"\s*:\s*(\d{9,13}(?:\.\d+)?)[,}\s]')
+_ISO_FIELD = re.compile(r'"(?:timestamp|time|ts)"\s*:\s*"(\d{4}-\d{2}-\d{2}[T ][^"]+)"')
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d+))?\s*(Z|[+-]\d{2}:?\d{2})?")
+_REDIS = re.compile(r"^\d+:[A-Z] (\d{1,2}) (\w{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?")
+_MONTHS = {m: i for i, m in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                       "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+_RANGE = re.compile(r"^\s*(.+?)\s*~\s*(.+?)\s*$")
+
+
+def _epoch(year, month, day, hour, minute, second, fraction: Optional[str], offset_seconds: int) -> float:
+    moment = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=timezone.utc)
+    value = moment.timestamp() - offset_seconds
+    return value + float("0." + fraction) if fraction else value
+
+
+def _offset_seconds(zone: Optional[str], default: int) -> int:
+    if not zone:
+        return default
+    if zone == "Z":
+        return 0
+    sign = -1 if zone[0] == "-" else 1
+    digits = zone[1:].replace(":", "")
+    return sign * (int(digits[:2]) * 3600 + int(digits[2:4]) * 60)
+
+
+def parse_iso(text: str, default_offset_hours: float = 0) -> Optional[float]:
+    """Epoch seconds of an ISO-8601 timestamp; naive ones are taken at `default_offset_hours` from UTC."""
+    match = _ISO.match(text.strip())
+    if match is None:
+        return None
+    *fields, fraction, zone = match.groups()
+    return _epoch(*fields, fraction, _offset_seconds(zone, int(default_offset_hours * 3600)))
+
+
+def parse_log_time(line: str) -> Optional[float]:
+    """Epoch seconds of a log line, or None when it carries no timestamp."""
+    if not line:
+        return None
+    if line[0] == "{":
+        match = _EPOCH_INSTANT.search(line)
+        if match:
+            return int(match.group(1)) + int(match.group(2)) / 1e9
+        match = _EPOCH_NUMBER.search(line)
+        if match:
+            value = float(match.group(1))
+            return value / 1000 if value > 1e11 else value
+        match = _ISO_FIELD.search(line)
+        return parse_iso(match.group(1)) if match else None
+    if line[0].isdigit():
+        match = _REDIS.match(line)
+        if match:
+            day, month, year, hour, minute, second, fraction = match.groups()
+            if month in _MONTHS:
+                return _epoch(year, _MONTHS[month], day, hour, minute, second, fraction, 0)
+            return None
+        return parse_iso(line)
+    return None
+
+
+def parse_time_range(text: str, utc_offset_hours: float = LOCAL_UTC_OFFSET_HOURS) -> Tuple[float, float]:
+    """
+    `"2025-12-25 15:57:53 ~ 2025-12-25 15:59:48"` (an alert time_range, cluster-local time)
+    -> (start, end) epoch seconds. Either side may also be an epoch number or a zoned ISO time.
+    """
+    match = _RANGE.match(text or "")
+    if match is None:
+        raise ValueError(f"time range must look like 'YYYY-MM-DD HH:MM:SS ~ YYYY-MM-DD HH:MM:SS', got '{text}'")
+    bounds = []
+    for side in match.groups():
+        try:
+            value = float(side)
+            bounds.append(value / 1000 if value > 1e11 else value)
+            continue
+        except ValueError:
+            pass
+        value = parse_iso(side, utc_offset_hours)
+        if value is None:
+            raise ValueError(f"unrecognized time '{side}'")
+        bounds.append(value)
+    start, end = bounds
+    if end < start:
+        raise ValueError(f"time range ends before it starts: '{text}'")
+    return start, end
+
+
+def format_local(epoch: float, utc_offset_hours: float = LOCAL_UTC_OFFSET_HOURS) -> str:
+    zone = timezone(timedelta(hours=utc_offset_hours))
+    return datetime.fromtimestamp(epoch, zone).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ServiceLogIndex:
+    __slots__ = ("lines", "times", "offsets", "timed")
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        stamped = []
+        current = None
+        pending = []
+        for offset, line in enumerate(lines):
+            value = parse_log_time(line if isinstance(line, str) else str(line))
+            if value is None:
+                if current is None:
+                    pending.append(offset)
+                    continue
+                value = current
+            else:
+                # Lines before the first timestamp belong to the first stamped event
+                for waiting in pending:
+                    stamped.append((value, waiting))
+                pending = []
+            current = value
+            stamped.append((value, offset))
+        self.timed = current is not None
+        stamped.sort()
+        self.times = array("d", (t for t, _ in stamped))
+        self.offsets = array("I", (o for _, o in stamped))
+
+    def span(self) -> Optional[Tuple[float, float]]:
+        return (self.times[0], self.times[-1]) if self.times else None
+
+    def window(self, start: float, end: float) -> List[int]:
+        """Offsets of the lines stamped within [start, end], in log order."""
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_right(self.times, end)
+        return sorted(self.offsets[lo:hi])
+
+
+class LogIndex:
+    """Per-service time indexes over a logs.json mapping, built on first query."""
+
+    def __init__(self, raw_logs: Dict[str, List[str]]):
+        self.raw_logs = raw_logs
+        self._services: Dict[str, ServiceLogIndex] = {}
+        self._lock = threading.Lock()
+
+    def service(self, service_name: str) -> Optional[ServiceLogIndex]:
+        index = self._services.get(service_name)
+        if index is None:
+            lines = self.raw_logs.get(service_name)
+            if lines is None:
+                return None
+            index = ServiceLogIndex(lines)
+            with self._lock:
+                index = self._services.setdefault(service_name, index)
+        return index
+
+    def window(self, service_name: str, start: float, end: float) -> Optional[List[str]]:
+        index = self.service(service_name)
+        if index is None:
+            return None
+        return [index.lines[offset] for offset in index.window(start, end)]
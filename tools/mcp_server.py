@@ -0,0 +1,260 @@
+"""
+Model Context Protocol (MCP) endpoint serving one benchmark case from the SnapshotStore.
+
+Implements the JSON-RPC 2.0 subset an MCP client needs for tools
+(initialize, ping, tools/list, tools/call), with newline-delimited messages.
+
+stdio:   python -m tools.mcp_server --case scheduling/3
+socket:  python -m tools.mcp_server --case scheduling/3 --socket /tmp/opsbench.sock
+         python -m tools.mcp_server --case scheduling/3 --port 8766
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from .implement import BOUTIQUE
+from .store import TOOL_NAMES, SnapshotStore, call_tool
+
+PROTOCOL_VERSION = "2024-11-05"
+SERVER_INFO = {"name": "cloud-opsbench", "version": "1.0.0"}
+
+_NAMESPACE = {"type": "string", "description": "The Kubernetes namespace (default 'boutique').", "default": "boutique"}
+_SERVICE = {"type": "string", "enum": BOUTIQUE, "description": "The microservice name."}
+
+TOOL_SPECS = {
+    "GetResources": {
+        "description": "Simulates `kubectl get` to list resources or a single resource. "
+                       "`show_labels`, `output_wide` and `label_selector` are mutually exclusive.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "resource_type": {"type": "string", "description": "Resource type, e.g. 'pods', 'services', 'nodes'."},
+                "namespace": _NAMESPACE,
+                "name": {"type": "string", "description": "Optional resource name."},
+                "show_labels": {"type": "boolean", "default": False},
+                "output_wide": {"type": "boolean", "default": False},
+                "label_selector": {"type": "string", "description": "Label filter, e.g. 'app=frontend'."},
+            },
+            "required": ["resource_type"],
+        },
+    },
+    "DescribeResource": {
+        "description": "Simulates `kubectl describe` for one resource, including conditions and events.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "resource_type": {"type": "string", "description": "Resource type, e.g. 'pod', 'node', 'pvc'."},
+                "name": {"type": "string", "description": "Exact resource name."},
+                "namespace": _NAMESPACE,
+            },
+            "required": ["resource_type", "name"],
+        },
+    },
+    "GetAppYAML": {
+        "description": "Returns the deployment configuration YAML of a service.",
+        "inputSchema": {"type": "object", "properties": {"app_name": _SERVICE}, "required": ["app_name"]},
+    },
+    "GetServiceDependencies": {
+        "description": "Returns the upstream/downstream dependency tree of a service.",
+        "inputSchema": {"type": "object", "properties": {"service_name": _SERVICE}, "required": ["service_name"]},
+    },
+    "GetServiceCallChains": {
+        "description": "Returns every upstream and downstream call chain through a service, with its fan-in and fan-out.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"service_name": _SERVICE,
+                           "direction": {"type": "string", "enum": ["both", "upstream", "downstream"], "default": "both"}},
+            "required": ["service_name"],
+        },
+    },
+    "GetRecentLogs": {
+        "description": "Returns the most recent raw log lines of a service.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"service_name": _SERVICE, "namespace": _NAMESPACE,
+                           "lines": {"type": "integer", "default": 50}},
+            "required": ["service_name"],
+        },
+    },
+    "GetLogsInTimeRange": {
+        "description": "Returns the log lines a service wrote within a time window (default: the alerts' time range, else the service's whole log span; the last `lines` are shown).",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"service_name": _SERVICE, "namespace": _NAMESPACE,
+                           "time_range": {"type": "string", "description": "'YYYY-MM-DD HH:MM:SS ~ YYYY-MM-DD HH:MM:SS', cluster time."},
+                           "lines": {"type": "integer", "default": 100}},
+            "required": ["service_name"],
+        },
+    },
+    "CheckServiceConnectivity": {
+        "description": "Tests TCP reachability of a service port from inside the cluster.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"service_name": _SERVICE, "port": {"type": "integer"}, "namespace": _NAMESPACE},
+            "required": ["service_name", "port"],
+        },
+    },
+    "GetClusterConfiguration": {
+        "description": "Returns node resources, labels, taints and conditions for the whole cluster.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    "GetAlerts": {
+        "description": "Returns active metric anomaly alerts (latency, error rate, saturation).",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    "GetAnomalyRanking": {
+        "description": "Ranks every service and node by combined alert, metric-deviation and error-log evidence.",
+        "inputSchema": {"type": "object", "properties": {"top": {"type": "integer", "default": 10, "minimum": 1}}},
+    },
+    "GetErrorLogs": {
+        "description": "Returns a statistical summary of a service's error log patterns.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"service_name": _SERVICE, "namespace": _NAMESPACE},
+            "required": ["service_name"],
+        },
+    },
+    "CheckNodeServiceStatus": {
+        "description": "Checks the systemd status of a Kubernetes component on a node.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "node_name": {"type": "string", "enum": ["master", "worker-01", "worker-02", "worker-03"]},
+                "service_name": {"type": "string", "enum": ["kube-scheduler", "kubelet", "kube-proxy", "containerd"]},
+            },
+            "required": ["node_name", "service_name"],
+        },
+    },
+    "SearchSnapshot": {
+        "description": "Full-text search over every recorded tool output and log line of the case; returns matching lines with their source.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"query": {"type": "string", "description": "Words that must all appear in a line."},
+                           "limit": {"type": "integer", "default": 20, "minimum": 1}},
+            "required": ["query"],
+        },
+    },
+}
+
+
+class MCPToolServer:
+    """Transport-independent MCP request handling for one fault case."""
+
+    def __init__(self, store: SnapshotStore, case_id: str):
+        self.case_id = case_id
+        self.k8s_tools = store.get(case_id)
+        self.tools = [{"name": name, **TOOL_SPECS[name]} for name in TOOL_NAMES]
+
+    def handle(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the JSON-RPC response for a message, or None for notifications."""
+        method = message.get("method")
+        msg_id = message.get("id")
+        if msg_id is None:
+            return None
+        try:
+            result = self._dispatch(method, message.get("params") or {})
+        except (TypeError, KeyError) as e:
+            return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": -32602, "message": f"Invalid params: {e}"}}
+        except LookupError as e:
+            return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": -32601, "message": str(e)}}
+        except Exception as e:
+            # Any other tool failure is answered, so it never takes down the serve loop
+            return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": -32603, "message": f"Internal error: {e}"}}
+        return {"jsonrpc": "2.0", "id": msg_id, "result": result}
+
+    def _dispatch(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == "initialize":
+            return {
+                "protocolVersion": params.get("protocolVersion", PROTOCOL_VERSION),
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": SERVER_INFO,
+                "instructions": f"Diagnostic tools for Cloud-OpsBench fault case {self.case_id}.",
+            }
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {"tools": self.tools}
+        if method == "tools/call":
+            return self._call_tool(params["name"], params.get("arguments") or {})
+        raise LookupError(f"Method not found: {method}")
+
+    def _call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        # Tool failures are reported in the result so the model can react to them
+        try:
+            output = call_tool(self.k8s_tools, name, arguments)
+            is_error = False
+        except (ValueError, TypeError) as e:
+            output = str(e)
+            is_error = True
+        text = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, indent=2)
+        return {"content": [{"type": "text", "text": text}], "isError": is_error}
+
+    def serve(self, rfile: TextIO, wfile: TextIO):
+        """Serve newline-delimited JSON-RPC messages until EOF."""
+        for line in rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}}
+            else:
+                response = self.handle(message)
+            if response is not None:
+                wfile.write(json.dumps(response, ensure_ascii=False) + "\n")
+                wfile.flush()
+
+
+def _socket_handler(mcp_server: MCPToolServer):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = (line.decode("utf-8") for line in self.rfile)
+            writer = _SocketWriter(self.wfile)
+            mcp_server.serve(reader, writer)
+    return Handler
+
+
+class _SocketWriter:
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str):
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a Cloud-OpsBench case as MCP tools")
+    parser.add_argument("--case", required=True, help="Case id, e.g. 'scheduling/3'")
+    parser.add_argument("--benchmark-root", default="benchmark", help="Root directory of the fault cases")
+    parser.add_argument("--socket", help="Listen on this Unix domain socket instead of stdio")
+    parser.add_argument("--port", type=int, help="Listen on this localhost TCP port instead of stdio")
+    cli_args = parser.parse_args()
+
+    mcp = MCPToolServer(SnapshotStore(cli_args.benchmark_root), cli_args.case)
+    if cli_args.socket:
+        if os.path.exists(cli_args.socket):
+            os.remove(cli_args.socket)
+        server = socketserver.ThreadingUnixStreamServer(cli_args.socket, _socket_handler(mcp))
+    elif cli_args.port:
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", cli_args.port), _socket_handler(mcp))
+    else:
+        # stdout carries the protocol; diagnostics go to stderr
+        sys.stdout = sys.stderr
+        mcp.serve(sys.stdin, sys.__stdout__)
+        sys.exit(0)
+
+    server.daemon_threads = True
+    print(f"MCP server for case {cli_args.case} listening on {cli_args.socket or f'127.0.0.1:{cli_args.port}'}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,89 @@
+"""
+Per-case memoization of tool results for the agent tools in tools/definition.py.
+
+Snapshots are static, so a repeated call with the same arguments would return
+the same observation, and the whole text would be sent back to the LLM again.
+ToolResultMemo remembers the step at which each distinct call was first
+answered. A repeat gets a one-line reference to that observation instead. It is
+only used when the reference is shorter than the output itself, and never for
+excluded tools.
+
+The repeated call still goes through CrewAI, so it stays in the trace and in
+the process metrics. tool_metrics records it with status "memoized".
+"""
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .metrics import tool_metrics
+
+MEMO_REFERENCE = (
+    "[Same call as step {step}: the snapshot has not changed, so the output is identical to that "
+    "observation ({size} characters). Re-read it above instead of repeating the call.]"
+)
+
+
+class ToolResultMemo:
+    """
+    :param case_id: "<category>/<case>" label used for the tool metrics
+    :param budget: optional StepBudget (tools.budget) that memoized repeats are counted against
+    :param exclude: tool names whose repeats are always answered in full
+    """
+
+    def __init__(self, case_id: str, budget: Any = None, exclude: Iterable[str] = ()):
+        self.case_id = case_id
+        self.budget = budget
+        self.exclude = frozenset(exclude)
+        self.calls = 0
+        self.memoized = 0
+        self._first_seen: Dict[tuple, Tuple[int, int]] = {}   # call key -> (step, output size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, memo_conf: Optional[Dict[str, Any]], case_id: str,
+                    budget: Any = None) -> Optional["ToolResultMemo"]:
+        """Build from the optional `diagnosis.memoize` section of config.yaml; None when disabled."""
+        memo_conf = memo_conf or {}
+        # Opt-in: memo references change what the agent observes, so runs are not comparable to baselines
+        if not memo_conf.get("enabled", False):
+            return None
+        return cls(case_id, budget, memo_conf.get("exclude") or ())
+
+    def call(self, tool_name: str, call_key: tuple, execute: Callable[[], Any]) -> Any:
+        t0 = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+            step = self.calls
+            earlier = self._first_seen.get(call_key)
+        if earlier is not None and tool_name not in self.exclude:
+            earlier_step, size = earlier
+            reference = MEMO_REFERENCE.format(step=earlier_step, size=size)
+            if size > len(reference):
+                with self._lock:
+                    self.memoized += 1
+                directive = self.budget.record_repeat() if self.budget is not None else None
+                tool_metrics.observe_call(tool_name, self.case_id, (time.perf_counter() - t0) * 1000, "memoized")
+                return directive or reference
+        output = execute()
+        with self._lock:
+            self._first_seen.setdefault(call_key, (step, len(str(output))))
+        return output
+
+
+def memoized(run):
+    """Route a SnapshotTool._run through the tool's `memo` (a ToolResultMemo) when it has one."""
+    signature = inspect.signature(run)
+
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        memo = getattr(self, "memo", None)
+        if memo is None:
+            return run(self, *args, **kwargs)
+        # Positional, keyword and defaulted spellings of the same call share one key
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        call_key = (self.name, tuple(sorted((k, repr(v)) for k, v in bound.arguments.items() if k != "self")))
+        return memo.call(self.name, call_key, lambda: run(self, *args, **kwargs))
+    return wrapper
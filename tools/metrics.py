@@ -0,0 +1,259 @@
+"""
+Tool-call metrics for the snapshot tools.
+
+Every KubernetesTools method is timed per tool and per case, and every snapshot
+lookup is counted as a hit or a miss (the KeyError fallbacks). Metrics can be
+exported as Prometheus text on a local port or appended to a JSON-lines file.
+"""
+import bisect
+import contextlib
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+# Upper bounds in milliseconds; snapshot lookups are usually well under 1 ms
+LATENCY_BUCKETS_MS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 50, 100, 500)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 4),
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): n for bound, n in self.cumulative()},
+        }
+
+
+class ToolMetrics:
+    """Thread-safe registry of tool-call counters and latency histograms."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = defaultdict(int)           # (tool, status) -> count
+            self.case_calls = defaultdict(int)      # (case, status) -> count
+            self.case_tool_calls = defaultdict(int)  # (case, tool, status) -> count
+            self.lookups = defaultdict(int)         # (tool, "hit"|"miss"|"rendered") -> count
+            self.case_lookups = defaultdict(int)    # (case, tool, result) -> count
+            self.tool_latency: Dict[str, Histogram] = {}
+            self.case_latency: Dict[str, Histogram] = {}
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Record nothing from the current thread inside the block, e.g. for harness-side tool calls."""
+        previous = getattr(self._local, "paused", False)
+        self._local.paused = True
+        try:
+            yield
+        finally:
+            self._local.paused = previous
+
+    def _recording(self) -> bool:
+        return self.enabled and not getattr(self._local, "paused", False)
+
+    def observe_call(self, tool: str, case: str, elapsed_ms: float, status: str = "ok"):
+        if not self._recording():
+            return
+        with self._lock:
+            self.calls[(tool, status)] += 1
+            self.case_calls[(case, status)] += 1
+            self.case_tool_calls[(case, tool, status)] += 1
+            if tool not in self.tool_latency:
+                self.tool_latency[tool] = Histogram(self.buckets)
+            if case not in self.case_latency:
+                self.case_latency[case] = Histogram(self.buckets)
+            self.tool_latency[tool].observe(elapsed_ms)
+            self.case_latency[case].observe(elapsed_ms)
+
+    def observe_lookup(self, tool: str, hit: bool, result: Optional[str] = None, case: Optional[str] = None):
+        """`result` overrides the hit/miss label, e.g. "rendered" for answers built from the object model."""
+        if not self._recording():
+            return
+        result = result or ("hit" if hit else "miss")
+        with self._lock:
+            self.lookups[(tool, result)] += 1
+            if case is not None:
+                self.case_lookups[(case, tool, result)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for tool, hist in self.tool_latency.items():
+                tools[tool] = {
+                    "calls": {status: n for (t, status), n in self.calls.items() if t == tool},
+                    "lookups": {result: n for (t, result), n in self.lookups.items() if t == tool},
+                    "latency": hist.to_dict(),
+                }
+            cases = {}
+            for case, hist in self.case_latency.items():
+                cases[case] = {
+                    "calls": {status: n for (c, status), n in self.case_calls.items() if c == case},
+                    "latency": hist.to_dict(),
+                }
+            return {"timestamp": time.time(), "tools": tools, "cases": cases}
+
+    def case_snapshot(self, case: str) -> Dict[str, Any]:
+        """Calls, lookups and latency of one case only; unaffected by cases running alongside it."""
+        with self._lock:
+            tools: Dict[str, Dict[str, Any]] = {}
+            for (c, tool, status), n in self.case_tool_calls.items():
+                if c == case:
+                    tools.setdefault(tool, {"calls": {}, "lookups": {}})["calls"][status] = n
+            for (c, tool, result), n in self.case_lookups.items():
+                if c == case:
+                    tools.setdefault(tool, {"calls": {}, "lookups": {}})["lookups"][result] = n
+            hist = self.case_latency.get(case)
+            return {"timestamp": time.time(), "case": case, "tools": tools,
+                    "latency": hist.to_dict() if hist is not None else None}
+
+    def write_jsonl(self, path: str, case: Optional[str] = None, **extra):
+        """
+        Append a snapshot (plus any extra fields) as one JSON line: the process-wide one, or
+        only `case`'s metrics when given.
+        """
+        snapshot = self.case_snapshot(case) if case is not None else self.snapshot()
+        record = {**extra, **snapshot}
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP opsbench_tool_calls_total Tool calls by tool and status.",
+            "# TYPE opsbench_tool_calls_total counter",
+        ]
+        with self._lock:
+            for (tool, status), n in sorted(self.calls.items()):
+                lines.append(f'opsbench_tool_calls_total{{tool="{tool}",status="{status}"}} {n}')
+            lines += [
+                "# HELP opsbench_snapshot_lookups_total Snapshot lookups by tool and result (hit/miss/rendered).",
+                "# TYPE opsbench_snapshot_lookups_total counter",
+            ]
+            for (tool, result), n in sorted(self.lookups.items()):
+                lines.append(f'opsbench_snapshot_lookups_total{{tool="{tool}",result="{result}"}} {n}')
+            lines += _prometheus_histogram("opsbench_tool_call_duration_ms", "Tool call latency per tool.",
+                                           "tool", self.tool_latency)
+            lines += _prometheus_histogram("opsbench_case_tool_call_duration_ms", "Tool call latency per case.",
+                                           "case", self.case_latency)
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_histogram(name: str, help_text: str, label: str, histograms: Dict[str, Histogram]):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, hist in sorted(histograms.items()):
+        for bound, total in hist.cumulative():
+            le = "+Inf" if bound == float("inf") else bound
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {total}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {hist.sum:.6f}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {hist.count}')
+    return lines
+
+
+# Process-wide registry used by KubernetesTools
+tool_metrics = ToolMetrics()
+
+
+def instrument(method):
+    """Time a KubernetesTools method and record it under the method name and the instance's case."""
+    tool_name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        status = "ok"
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            tool_metrics.observe_call(tool_name, self.case_id, (time.perf_counter() - t0) * 1000, status)
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: ToolMetrics = tool_metrics
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.registry.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.registry.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", registry: ToolMetrics = tool_metrics) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+    handler = type("BoundMetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="opsbench-metrics", daemon=True).start()
+    return server
+
+
+def configure_metrics(metrics_conf: Optional[Dict[str, Any]] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Apply the optional `metrics` section of config.yaml:
+      enabled:         record tool metrics (default true)
+      log_level:       level of the `tools` logger, e.g. "DEBUG" to see every lookup key
+      prometheus_port: serve /metrics on localhost when > 0
+    """
+    metrics_conf = metrics_conf or {}
+    tool_metrics.enabled = metrics_conf.get("enabled", True)
+
+    tools_logger = logging.getLogger("tools")
+    tools_logger.setLevel(str(metrics_conf.get("log_level", "WARNING")).upper())
+    if not tools_logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        tools_logger.addHandler(handler)
+
+    port = metrics_conf.get("prometheus_port") or 0
+    if port > 0:
+        server = start_metrics_server(port)
+        print(f"✅ Tool metrics served on http://127.0.0.1:{port}/metrics")
+        return server
+    return None
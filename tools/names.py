@@ -0,0 +1,111 @@
+"""
+Per-case name index for resolving near-miss resource names.
+
+Agents often pass a deployment name (`emailservice`), a pod name from another
+run (`emailservice-b78fc569b-h9dtk`) or a typo where DescribeResource and
+GetResources need the exact name of an object in the snapshot. NameIndex groups
+the snapshot's names by kind and namespace, and by workload (the name without
+its ReplicaSet hash and pod suffix). `lookup` returns the intended name when
+that is unambiguous, otherwise a ranked list of suggestions:
+
+  1. exact or case-insensitive match
+  2. a pod name asked for as a deployment or service: its workload
+  3. the only object of the same workload, or of the only workload starting with the name
+     (a prefix of at least MIN_PREFIX_LENGTH characters; shorter ones only get suggestions)
+  4. objects of the closest workloads by edit distance (suggestions only)
+"""
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# `<workload>-<replicaset hash>[-<pod suffix>]`; the hash always holds a digit, which
+# keeps names such as `frontend-external` whole
+_WORKLOAD_SUFFIX = re.compile(r"-(?=[a-z0-9]*\d)[a-z0-9]{6,10}(?:-[a-z0-9]{5})?$")
+NAMED_TOOLS = ("GetResources", "DescribeResource")
+MAX_SUGGESTIONS = 3
+# Shorter prefixes ("a", "em") are never resolved, so the agent is not answered about objects it did not name
+MIN_PREFIX_LENGTH = 3
+
+
+def workload_of(name: str) -> str:
+    """`emailservice-b78fc569b-6xl4x` -> `emailservice`; other names are returned unchanged."""
+    return _WORKLOAD_SUFFIX.sub("", name)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance of a and b, or limit + 1 as soon as it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class NameIndex:
+    def __init__(self):
+        # (kind, namespace) -> {lowercased name: name}, {workload: [names]}
+        self._names: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._workloads: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+
+    def add(self, kind: str, namespace: str, name: str):
+        names = self._names.setdefault((kind, namespace), {})
+        lowered = name.lower()
+        if not name or lowered in names:
+            return
+        names[lowered] = name
+        self._workloads.setdefault((kind, namespace), {}).setdefault(workload_of(lowered), []).append(name)
+
+    @classmethod
+    def from_tool_cache(cls, tool_cache: Dict[str, object], extra: Iterable[Tuple[str, str, str]] = ()) -> "NameIndex":
+        """
+        Index the names found in the cached command keys of the named tools, plus `extra`
+        (kind, namespace, name) triples, e.g. the objects of a ClusterState.
+        """
+        index = cls()
+        for command_key in tool_cache:
+            tool_name, _, arguments = command_key.partition(":")
+            if tool_name not in NAMED_TOOLS or '"name":""' in arguments:
+                continue
+            params = json.loads(arguments)
+            index.add(params.get("resource_type", ""), params.get("namespace", ""), params.get("name", ""))
+        for kind, namespace, name in extra:
+            index.add(kind, namespace, name)
+        return index
+
+    def lookup(self, kind: str, namespace: str, name: str) -> Tuple[Optional[str], List[str]]:
+        """(resolved name, []) when the intended object is unambiguous, else (None, ranked suggestions)."""
+        names = self._names.get((kind, namespace))
+        if not names or not name:
+            return None, []
+        query = name.strip().lower()
+        if query in names:
+            return names[query], []
+        workloads = self._workloads[(kind, namespace)]
+        base = workload_of(query)
+        if base != query and base in names:
+            return names[base], []
+        group = workloads.get(base)
+        if group is None:
+            prefixed = [w for w in workloads if w.startswith(base)]
+            group = workloads[prefixed[0]] if len(prefixed) == 1 else [n for w in sorted(prefixed) for n in workloads[w]]
+            if group and len(base) < MIN_PREFIX_LENGTH:
+                return None, group[:MAX_SUGGESTIONS]
+        if len(group) == 1:
+            return group[0], []
+        if group:
+            return None, group[:MAX_SUGGESTIONS]
+        limit = max(2, len(base) // 4)
+        ranked = sorted((edit_distance(base, w, limit), w) for w in workloads)
+        return None, [n for d, w in ranked if d <= limit for n in workloads[w]][:MAX_SUGGESTIONS]
+
+
+def did_you_mean(suggestions: List[str]) -> str:
+    if not suggestions:
+        return ""
+    return " Did you mean: " + ", ".join(f'"{s}"' for s in suggestions) + "?"
@@ -0,0 +1,133 @@
+"""
+Full-text search over one case snapshot.
+
+SnapshotSearchIndex is an inverted index over every line of every tool_cache
+response and every raw log line. Lines are tokenized into lowercase
+alphanumeric runs, so `redis-cart:6379` is indexed as `redis`, `cart` and
+`6379`. A query matches the lines that contain all of its tokens; the postings
+are sorted line ids, intersected smallest first. The index is built once per
+case, on the first search. Identical lines from different sources (a pod row
+in several `kubectl get` views) are collapsed into one hit that lists how many
+other sources contain it.
+"""
+import json
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+SNIPPET_CHARS = 200
+DEFAULT_LIMIT = 20
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _as_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, indent=2)
+
+
+def snippet(line: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """The line, cut to `width` characters around the query (or its first token)."""
+    line = line.strip()
+    if len(line) <= width:
+        return line
+    lowered = line.lower()
+    at = lowered.find(query.strip().lower())
+    if at < 0:
+        tokens = tokenize(query)
+        at = lowered.find(tokens[0]) if tokens else 0
+    start = max(0, min(at - width // 4, len(line) - width))
+    return ("..." if start else "") + line[start:start + width] + ("..." if start + width < len(line) else "")
+
+
+class SnapshotSearchIndex:
+    def __init__(self):
+        self.sources: List[str] = []
+        self.lines: List[str] = []
+        self.line_source = array("I")     # line id -> source id
+        self.line_number = array("I")     # line id -> 1-based line number within its source
+        self.postings: Dict[str, array] = {}
+        self.nbytes = 0                   # approximate memory footprint, set by build()
+
+    def add_source(self, source: str, lines: Iterable[str]):
+        source_id = len(self.sources)
+        self.sources.append(source)
+        postings = self.postings
+        for number, line in enumerate(lines, 1):
+            if not isinstance(line, str):
+                line = str(line)
+            if not line.strip():
+                continue
+            line_id = len(self.lines)
+            self.lines.append(line)
+            self.line_source.append(source_id)
+            self.line_number.append(number)
+            for token in set(_TOKEN.findall(line.lower())):
+                posting = postings.get(token)
+                if posting is None:
+                    posting = postings[token] = array("I")
+                posting.append(line_id)
+
+    @classmethod
+    def build(cls, tool_cache: Dict[str, object], raw_logs: Dict[str, List[str]],
+              extra_views: Iterable[Tuple[str, str]] = ()) -> "SnapshotSearchIndex":
+        """Index every tool_cache response, every log line and any `extra_views` (source, text)."""
+        index = cls()
+        for command_key, value in tool_cache.items():
+            index.add_source(command_key, _as_text(value).splitlines())
+        for source, text in extra_views:
+            index.add_source(source, text.splitlines())
+        # Log lines are shared with raw_logs; the split tool_cache lines are the index's own
+        own_lines = sum(map(sys.getsizeof, index.lines))
+        for service, lines in raw_logs.items():
+            index.add_source(f"logs.json:{service}", lines)
+        index.nbytes = (own_lines + sys.getsizeof(index.lines) + sys.getsizeof(index.postings)
+                        + sum(sys.getsizeof(token) + sys.getsizeof(posting) for token, posting in index.postings.items())
+                        + sys.getsizeof(index.line_source) + sys.getsizeof(index.line_number))
+        return index
+
+    def search(self, query: str) -> List[int]:
+        """Ids of the lines containing every token of the query, in index order."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        postings = []
+        for token in set(tokens):
+            posting = self.postings.get(token)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+            if not matches:
+                return []
+        return sorted(matches)
+
+    def render(self, query: str, limit: int = DEFAULT_LIMIT) -> str:
+        tokens = tokenize(query)
+        if not tokens:
+            return "Error: The search query has no searchable words (letters or digits)."
+        line_ids = self.search(query)
+        if not line_ids:
+            return f"No matches for '{query}' in this snapshot."
+        # Collapse identical lines; the first source in index order represents them
+        hits: Dict[str, List[int]] = {}
+        for line_id in line_ids:
+            hits.setdefault(self.lines[line_id].strip(), []).append(line_id)
+        sources_hit = len({self.line_source[i] for i in line_ids})
+        lines = [f"[Search] '{query}': {len(line_ids)} matching lines ({len(hits)} distinct) in {sources_hit} sources"
+                 + (f", showing the first {limit}" if len(hits) > limit else "")]
+        for text, ids in list(hits.items())[:limit]:
+            first = ids[0]
+            others = len({self.line_source[i] for i in ids}) - 1
+            lines.append(f"- {self.sources[self.line_source[first]]} (line {self.line_number[first]})"
+                         + (f" [+{others} more sources]" if others else ""))
+            lines.append(f"  {snippet(text, query)}")
+        return "\n".join(lines)
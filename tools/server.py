@@ -0,0 +1,192 @@
+"""
+Local HTTP tool server backed by a shared SnapshotStore.
+
+Run:    python -m tools.server --categories scheduling startup --port 8765
+Call:   POST /call  {"case": "scheduling/3", "tool": "GetResources", "args": {"resource_type": "pods"}}
+Other:  GET /health, GET /cases, GET /tools, GET /metrics (Prometheus text)
+
+With --max-cache-mb the store keeps the most recently used cases within that
+footprint and reloads evicted ones on demand; /health reports the cache stats.
+"""
+import argparse
+import http.client
+import json
+import queue
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from .metrics import tool_metrics
+from .store import TOOL_NAMES, CaseNotFoundError, SnapshotStore
+
+
+class ToolRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive so pooled clients reuse their connections
+    protocol_version = "HTTP/1.1"
+    store: SnapshotStore = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "cases": len(self.store.loaded_cases()),
+                                  "case_cache": self.store.cache.stats()})
+        elif self.path == "/cases":
+            self._send_json(200, {"cases": self.store.loaded_cases()})
+        elif self.path == "/tools":
+            self._send_json(200, {"tools": list(TOOL_NAMES)})
+        elif self.path == "/metrics":
+            body = (tool_metrics.to_prometheus() + self.store.cache.to_prometheus()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"ok": False, "error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/call":
+            self._send_json(404, {"ok": False, "error": f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            case_id = request["case"]
+            tool_name = request["tool"]
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"ok": False, "error": f"Malformed request: {e}"})
+            return
+
+        try:
+            t0 = time.perf_counter()
+            result = self.store.call(case_id, tool_name, request.get("args"))
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+        except CaseNotFoundError as e:
+            self._send_json(404, {"ok": False, "error": str(e)})
+            return
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"ok": False, "error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, {"ok": True, "result": result, "elapsed_ms": round(elapsed_ms, 4)})
+
+
+def create_server(store: SnapshotStore, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    handler = type("BoundToolRequestHandler", (ToolRequestHandler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class ToolServerError(Exception):
+    pass
+
+
+class ToolClient:
+    """Thread-safe client for the tool server with a pool of keep-alive connections."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, pool_size: int = 8, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        # A pooled connection may have been closed by the server; retry once on a fresh one
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                raw = response.read()
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                if attempt == 1:
+                    raise
+                continue
+            except BaseException:
+                # e.g. socket.timeout: the connection may hold a half-read response, never reuse it
+                conn.close()
+                raise
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                conn.close()
+                raise ToolServerError(f"HTTP {response.status}: response body is not JSON")
+            # Only a cleanly read response leaves the connection reusable
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            if response.status != 200:
+                raise ToolServerError(data.get("error", f"HTTP {response.status}"))
+            return data
+
+    def call(self, case_id: str, tool_name: str, **args) -> Any:
+        return self._request("POST", "/call", {"case": case_id, "tool": tool_name, "args": args})["result"]
+
+    def cases(self):
+        return self._request("GET", "/cases")["cases"]
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Cloud-OpsBench diagnostic tools over local HTTP")
+    parser.add_argument("--benchmark-root", default="benchmark", help="Root directory of the fault cases")
+    parser.add_argument("--categories", nargs="*", help="Categories to preload (default: all)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--compact", action="store_true", help="Drop cached views the object model re-renders identically")
+    parser.add_argument("--max-cache-mb", type=float, default=0,
+                        help="Evict least recently used cases beyond this many MB in memory (0 keeps every case)")
+    cli_args = parser.parse_args()
+
+    max_bytes = int(cli_args.max_cache_mb * 1024 * 1024) or None
+    snapshot_store = SnapshotStore(cli_args.benchmark_root, compact=cli_args.compact, max_bytes=max_bytes)
+    t0 = time.perf_counter()
+    loaded = snapshot_store.preload(cli_args.categories)
+    print(f"✅ Preloaded {loaded} fault cases in {time.perf_counter() - t0:.2f}s")
+
+    tool_server = create_server(snapshot_store, cli_args.host, cli_args.port)
+    print(f"Tool server listening on http://{cli_args.host}:{cli_args.port}")
+    try:
+        tool_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tool_server.server_close()
@@ -0,0 +1,277 @@
+import ast
+import inspect
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .implement import KubernetesTools
+
+# Names of the KubernetesTools methods exposed to agents
+TOOL_NAMES = (
+    "GetResources",
+    "DescribeResource",
+    "GetAppYAML",
+    "GetServiceDependencies",
+    "GetServiceCallChains",
+    "GetRecentLogs",
+    "GetLogsInTimeRange",
+    "CheckServiceConnectivity",
+    "GetClusterConfiguration",
+    "GetAlerts",
+    "GetAnomalyRanking",
+    "GetErrorLogs",
+    "CheckNodeServiceStatus",
+    "SearchSnapshot",
+)
+DEFAULT_NAMESPACE = "boutique"
+# Multi-call tool (tools/definition.py); its sub-calls are expanded back into steps by util.py
+PARALLEL_TOOL = "RunToolsInParallel"
+MAX_PARALLEL_CALLS = 8
+# Ceiling of the process-wide case cache used by create_k8s_tools (a loaded case is ~0.5-3 MB)
+DEFAULT_CASE_CACHE_BYTES = 512 * 1024 * 1024
+
+_CALLING_RE = re.compile(r"^tool_name='(\w+)' arguments=(\{.*\})$", re.S)
+_BARE_KEY_RE = re.compile(r"([{,]\s*)([A-Za-z_]\w*)\s*:")
+
+
+class CaseNotFoundError(KeyError):
+    pass
+
+
+def call_tool(k8s_tools: KubernetesTools, tool_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+    """Dispatch a tool call by name; fills the default namespace when the tool takes one."""
+    if tool_name not in TOOL_NAMES:
+        raise ValueError(f"Unknown tool '{tool_name}'. Available: {', '.join(TOOL_NAMES)}")
+    method = getattr(k8s_tools, tool_name)
+    args = dict(args or {})
+    if "namespace" in inspect.signature(method).parameters:
+        args.setdefault("namespace", DEFAULT_NAMESPACE)
+    return method(**args)
+
+
+def call_tools_parallel(k8s_tools: KubernetesTools, calls: List[Dict[str, Any]],
+                        max_workers: int = MAX_PARALLEL_CALLS) -> List[Tuple[str, Dict[str, Any], str]]:
+    """
+    Run several independent tool calls concurrently. Each call is {"tool_name", "arguments"};
+    returns (tool_name, arguments, output) in request order, errors rendered as "Error: ...".
+    """
+    def run(call):
+        tool_name = call.get("tool_name", "")
+        args = call.get("arguments") or {}
+        try:
+            return tool_name, args, str(call_tool(k8s_tools, tool_name, args))
+        except (ValueError, TypeError, FileNotFoundError) as e:
+            message = str(e)
+            return tool_name, args, message if message.startswith("Error") else f"Error: {message}"
+
+    if len(calls) <= 1:
+        return [run(call) for call in calls]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as pool:
+        return list(pool.map(run, calls))
+
+
+_SECTION_RE = re.compile(r"^### \[(\d+)\] (\w+) (\{.*\})$", re.M)
+
+
+def render_parallel_results(results: List[Tuple[str, Dict[str, Any], str]]) -> str:
+    """One observation for a multi-call step; split_parallel_observation reverses it."""
+    sections = []
+    for i, (tool_name, args, output) in enumerate(results, 1):
+        sections.append(f"### [{i}] {tool_name} {json.dumps(args, ensure_ascii=False, sort_keys=True)}\n{output}")
+    return "\n\n".join(sections)
+
+
+def split_parallel_observation(text: str) -> List[Tuple[str, Dict[str, Any], str]]:
+    matches = list(_SECTION_RE.finditer(text or ""))
+    results = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        try:
+            args = json.loads(match.group(3))
+        except ValueError:
+            args = {}
+        results.append((match.group(2), args, text[match.end() + 1:end].rstrip("\n")))
+    return results
+
+
+def parse_expert_call(calling: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Parse the `calling` field of an expert trajectory step, e.g.
+    "tool_name='DescribeResource' arguments={namespace: 'boutique', resource_type: 'pod', name: 'x'}"
+    """
+    match = _CALLING_RE.match(calling.strip())
+    if not match:
+        raise ValueError(f"Unrecognized tool call: {calling[:120]}")
+    # Argument keys are unquoted; quote them so the dict is a Python literal
+    args = ast.literal_eval(_BARE_KEY_RE.sub(r'\1"\2":', match.group(2)))
+    return match.group(1), args
+
+
+class CaseCache:
+    """
+    Thread-safe LRU cache of loaded KubernetesTools, bounded by their approximate memory
+    footprint (KubernetesTools.footprint) instead of a case count; max_bytes=None is unbounded.
+    A case's footprint is re-read on every hit, since its search index is built lazily.
+    The case just loaded is never evicted, even when it alone exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Any, Tuple[KubernetesTools, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, load: Callable[[], KubernetesTools]) -> KubernetesTools:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self._resize(key, entry[0])
+                return entry[0]
+            self.misses += 1
+        # Load and measure outside the lock so slow parses do not serialize other readers
+        k8s_tools = load()
+        size = k8s_tools.footprint()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another thread loaded the same case meanwhile; keep its instance
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries[key] = (k8s_tools, size)
+            self.bytes += size
+            self._evict()
+            return k8s_tools
+
+    def _resize(self, key: Any, k8s_tools: KubernetesTools):
+        size = k8s_tools.footprint()
+        self.bytes += size - self._entries[key][1]
+        self._entries[key] = (k8s_tools, size)
+        self._evict()
+
+    def _evict(self):
+        # The most recently used entry stays
+        while self.max_bytes is not None and self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> List[Any]:
+        """Cached keys, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def to_prometheus(self, prefix: str = "opsbench_case_cache") -> str:
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text in (
+            ("hits", "counter", "Case cache lookups served from memory."),
+            ("misses", "counter", "Case cache lookups that loaded the case from disk."),
+            ("evictions", "counter", "Cases evicted to stay under the byte ceiling."),
+            ("entries", "gauge", "Cases held in memory."),
+            ("bytes", "gauge", "Approximate bytes held by the cached cases."),
+        ):
+            metric = f"{prefix}_{name}_total" if kind == "counter" else f"{prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {stats[name]}"]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide cache shared by every load_case caller (agent runs, interactive tests, warm starts)
+case_cache = CaseCache(DEFAULT_CASE_CACHE_BYTES)
+
+
+def load_case(case_path: str, compact: bool = False) -> KubernetesTools:
+    """The KubernetesTools of a case directory, loaded once and kept in the process-wide case_cache."""
+    key = (os.path.abspath(case_path), compact)
+    return case_cache.get(key, lambda: KubernetesTools(case_path, compact=compact))
+
+
+class SnapshotStore:
+    """
+    Process-wide store of loaded fault cases, keyed by "<category>/<case>"
+    (e.g. "scheduling/3"). Cases are parsed once and shared by every caller.
+    """
+
+    def __init__(self, benchmark_root: str = "benchmark", compact: bool = False,
+                 max_bytes: Optional[int] = None):
+        self.benchmark_root = benchmark_root
+        # compact: keep only the views the object model cannot re-render (KubernetesTools.compact)
+        self.compact = compact
+        # max_bytes: evict least recently used cases beyond this footprint (None keeps every case)
+        self._cases = CaseCache(max_bytes)
+
+    def case_path(self, case_id: str) -> str:
+        return os.path.join(self.benchmark_root, *case_id.strip("/").split("/"))
+
+    def available_cases(self, categories: Optional[Iterable[str]] = None) -> List[str]:
+        """All case ids on disk, optionally restricted to some categories."""
+        if categories is None:
+            categories = sorted(
+                d for d in os.listdir(self.benchmark_root)
+                if os.path.isdir(os.path.join(self.benchmark_root, d))
+            )
+        case_ids = []
+        for category in categories:
+            category_path = os.path.join(self.benchmark_root, category)
+            if not os.path.isdir(category_path):
+                raise CaseNotFoundError(f"Fault category not found: {category_path}")
+            for case in os.listdir(category_path):
+                if os.path.exists(os.path.join(category_path, case, "tool_cache.json")):
+                    case_ids.append(f"{category}/{case}")
+        return sorted(case_ids)
+
+    def get(self, case_id: str) -> KubernetesTools:
+        def load():
+            path = self.case_path(case_id)
+            if not os.path.exists(os.path.join(path, "tool_cache.json")):
+                raise CaseNotFoundError(f"Fault case not found: {case_id}")
+            return KubernetesTools(path, compact=self.compact)
+        return self._cases.get(case_id, load)
+
+    def preload(self, categories: Optional[Iterable[str]] = None) -> int:
+        """Load the cases (at most what max_bytes holds); returns the number in memory."""
+        for case_id in self.available_cases(categories):
+            self.get(case_id)
+        return len(self._cases)
+
+    def loaded_cases(self) -> List[str]:
+        return sorted(self._cases.keys())
+
+    @property
+    def cache(self) -> CaseCache:
+        return self._cases
+
+    def call(self, case_id: str, tool_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        return call_tool(self.get(case_id), tool_name, args)
@@ -0,0 +1,293 @@
+"""
+Partial reader for Langfuse trace.json exports and the trace_index.json sidecar.
+
+A trace dump holds every observation with its full prompt and completion, yet
+evaluation only needs the latency, the tool/LLM observations and their token
+usage. The reader memory-maps the file and walks it with a small scanner that
+skips unwanted values (long prompt strings included) without decoding them. It
+stops as soon as the requested top-level fields are found.
+
+trace_index.json is written next to trace.json at export time (main.py) or on
+first read, and holds the compact summary:
+  {"latency", "total_cost", "observation_count", "tool_calls": [...], "llm_calls": [...],
+   "prompt_tokens", "completion_tokens", "total_tokens"}
+"""
+import json
+import mmap
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from tools.store import TOOL_NAMES
+
+INDEX_FILE = "trace_index.json"
+INDEX_VERSION = 1
+
+_WS = re.compile(rb"[\s,:]*")
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_SCALAR = re.compile(rb"[^,}\]\s]+")
+_TOOL_NAME = re.compile(rb"tool_name='(\w+)'|tool_name=\\\"(\w+)\\\"")
+
+# Observation keys kept by the reader; input/output are never decoded
+OBSERVATION_KEYS = frozenset({
+    "id", "type", "name", "model", "startTime", "start_time", "endTime", "end_time",
+    "parentObservationId", "parent_observation_id", "usage", "usageDetails", "usage_details",
+    "promptTokens", "completionTokens", "totalTokens", "calculatedTotalCost", "calculated_total_cost",
+    "costDetails", "cost_details", "level",
+})
+
+
+class _Scanner:
+    """Minimal JSON walker over a bytes-like buffer; values are decoded only on request."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def _skip_ws(self):
+        self.pos = _WS.match(self.buf, self.pos).end()
+
+    def _string_end(self, pos: int) -> int:
+        """Offset just past the string opening at pos; memchr-speed find() instead of a regex."""
+        buf = self.buf
+        i = pos + 1
+        while True:
+            j = buf.find(b'"', i)
+            if j < 0:
+                raise ValueError("Unterminated JSON string")
+            backslashes = 0
+            while buf[j - 1 - backslashes] == 0x5C:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return j + 1
+            i = j + 1
+
+    def peek(self) -> bytes:
+        self._skip_ws()
+        return self.buf[self.pos:self.pos + 1]
+
+    def skip_value(self):
+        first = self.peek()
+        if first == b'"':
+            self.pos = self._string_end(self.pos)
+        elif first in (b"{", b"["):
+            depth = 0
+            while True:
+                match = _STRUCTURE.search(self.buf, self.pos)
+                if match is None:
+                    raise ValueError("Unterminated JSON container")
+                token = match.group()
+                if token == b'"':
+                    self.pos = self._string_end(match.start())
+                    continue
+                self.pos = match.end()
+                depth += 1 if token in (b"{", b"[") else -1
+                if depth == 0:
+                    return
+        else:
+            self.pos = _SCALAR.match(self.buf, self.pos).end()
+
+    def raw_value(self) -> bytes:
+        self.peek()
+        start = self.pos
+        self.skip_value()
+        return bytes(self.buf[start:self.pos])
+
+    def read_value(self) -> Any:
+        return json.loads(self.raw_value())
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield each key; the caller must consume the value (read_value or skip_value)."""
+        if self.peek() != b"{":
+            raise ValueError(f"Expected an object at offset {self.pos}")
+        self.pos += 1
+        while self.peek() != b"}":
+            start = self.pos
+            self.pos = self._string_end(start)
+            yield json.loads(bytes(self.buf[start:self.pos]))
+        self.pos += 1
+
+    def iter_array(self) -> Iterator[None]:
+        """Yield once per element, positioned at the element; the caller consumes it."""
+        if self.peek() != b"[":
+            raise ValueError(f"Expected an array at offset {self.pos}")
+        self.pos += 1
+        while self.peek() != b"]":
+            yield None
+        self.pos += 1
+
+
+def _open_buffer(path: str):
+    f = open(path, "rb")
+    if os.fstat(f.fileno()).st_size == 0:
+        f.close()
+        raise ValueError(f"Empty trace file: {path}")
+    return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_observation(scanner: _Scanner, keys: Iterable[str]) -> Dict[str, Any]:
+    observation = {}
+    for key in scanner.iter_object():
+        if key in keys:
+            observation[key] = scanner.read_value()
+        elif key == "input" and _is_tool_name(observation.get("name")):
+            # Tool spans carry the called tool's name inside their (short) input
+            match = _TOOL_NAME.search(scanner.raw_value())
+            if match:
+                observation["tool_name"] = (match.group(1) or match.group(2)).decode()
+        else:
+            scanner.skip_value()
+    return observation
+
+
+def read_trace_fields(path: str, fields: Iterable[str] = ("latency",),
+                      observation_keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Read selected top-level fields of a trace dump. With `observation_keys`, the
+    observations are returned too, reduced to those keys.
+    """
+    wanted = set(fields)
+    observation_keys = set(observation_keys) if observation_keys is not None else None
+    result: Dict[str, Any] = {}
+    f, buf = _open_buffer(path)
+    try:
+        scanner = _Scanner(buf)
+        for key in scanner.iter_object():
+            if key in wanted:
+                result[key] = scanner.read_value()
+            elif key == "observations" and observation_keys is not None:
+                if scanner.peek() == b"[":
+                    result["observations"] = [
+                        _read_observation(scanner, observation_keys) for _ in scanner.iter_array()
+                    ]
+                else:
+                    scanner.skip_value()
+            else:
+                scanner.skip_value()
+            if wanted <= result.keys() and (observation_keys is None or "observations" in result):
+                break
+    finally:
+        buf.close()
+        f.close()
+    return result
+
+
+def read_latency(path: str) -> float:
+    return read_trace_fields(path, ("latency",)).get("latency") or 0.0
+
+
+def _is_tool_name(name: Optional[str]) -> bool:
+    return bool(name) and (name in TOOL_NAMES or name.startswith("ToolUsage"))
+
+
+def _first(obj: Dict[str, Any], *names: str):
+    for name in names:
+        value = obj.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _token_usage(observation: Dict[str, Any]) -> Dict[str, int]:
+    # Langfuse has reported usage as usageDetails{input,output,total}, usage{input,output,total}
+    # or flat promptTokens/completionTokens depending on the version
+    details = _first(observation, "usageDetails", "usage_details") or {}
+    usage = observation.get("usage") or {}
+    prompt = _first(details, "input", "prompt_tokens") or _first(usage, "input", "promptTokens") or observation.get("promptTokens") or 0
+    completion = _first(details, "output", "completion_tokens") or _first(usage, "output", "completionTokens") or observation.get("completionTokens") or 0
+    total = _first(details, "total") or _first(usage, "total", "totalTokens") or observation.get("totalTokens") or (prompt + completion)
+    return {"prompt_tokens": int(prompt), "completion_tokens": int(completion), "total_tokens": int(total)}
+
+
+def build_trace_index(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact summary of a trace (a full dict or the partial one from read_trace_fields)."""
+    observations = sorted(trace.get("observations") or [],
+                          key=lambda o: str(_first(o, "startTime", "start_time") or ""))
+    tool_calls: List[Dict[str, Any]] = []
+    llm_calls: List[Dict[str, Any]] = []
+    tool_ids = set()
+    for observation in observations:
+        start = _first(observation, "startTime", "start_time")
+        end = _first(observation, "endTime", "end_time")
+        name = observation.get("name") or ""
+        if observation.get("type") == "GENERATION":
+            llm_calls.append({
+                "name": name,
+                "model": observation.get("model"),
+                "start": start,
+                "end": end,
+                "cost": _first(observation, "calculatedTotalCost", "calculated_total_cost"),
+                **_token_usage(observation),
+            })
+        elif _is_tool_name(name) or observation.get("type") == "TOOL":
+            if _first(observation, "parentObservationId", "parent_observation_id") in tool_ids:
+                continue
+            tool_ids.add(observation.get("id"))
+            tool_name = observation.get("tool_name") or name
+            if "tool_name" not in observation and isinstance(observation.get("input"), (str, dict)):
+                match = _TOOL_NAME.search(json.dumps(observation["input"]).encode("utf-8"))
+                if match:
+                    tool_name = (match.group(1) or match.group(2)).decode()
+            tool_calls.append({"name": tool_name, "start": start, "end": end})
+    return {
+        "version": INDEX_VERSION,
+        "latency": trace.get("latency") or 0.0,
+        "total_cost": _first(trace, "totalCost", "total_cost"),
+        "observation_count": len(observations),
+        "tool_calls": tool_calls,
+        "llm_calls": llm_calls,
+        "prompt_tokens": sum(c["prompt_tokens"] for c in llm_calls),
+        "completion_tokens": sum(c["completion_tokens"] for c in llm_calls),
+        "total_tokens": sum(c["total_tokens"] for c in llm_calls),
+    }
+
+
+def trace_cost(index: Dict[str, Any], prices: Optional[Dict[str, float]] = None) -> float:
+    """
+    Cost of a traced run: the cost Langfuse computed when it has one, otherwise the
+    token counts priced with `prices` ({"input_per_1m": .., "output_per_1m": ..}).
+    """
+    reported = [c["cost"] for c in index.get("llm_calls", []) if c.get("cost") is not None]
+    if reported:
+        return float(sum(reported))
+    if index.get("total_cost"):
+        return float(index["total_cost"])
+    prices = prices or {}
+    return (index.get("prompt_tokens", 0) * prices.get("input_per_1m", 0.0)
+            + index.get("completion_tokens", 0) * prices.get("output_per_1m", 0.0)) / 1e6
+
+
+def write_trace_index(case_dir: str, trace: Dict[str, Any]) -> Dict[str, Any]:
+    index = build_trace_index(trace)
+    tmp_path = os.path.join(case_dir, INDEX_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(case_dir, INDEX_FILE))
+    return index
+
+
+def load_trace_index(case_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    The case's trace index; rebuilt from trace.json with the partial reader when the
+    sidecar is missing, stale or from another version. None when there is no trace.
+    """
+    trace_path = os.path.join(case_dir, "trace.json")
+    index_path = os.path.join(case_dir, INDEX_FILE)
+    try:
+        trace_mtime = os.stat(trace_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    try:
+        if os.stat(index_path).st_mtime_ns >= trace_mtime:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                return index
+    except (FileNotFoundError, ValueError):
+        pass
+    partial = read_trace_fields(trace_path, ("latency", "totalCost", "total_cost"), OBSERVATION_KEYS)
+    try:
+        return write_trace_index(case_dir, partial)
+    except OSError:
+        # Read-only result trees still get the index, just not cached
+        return build_trace_index(partial)
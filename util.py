@@ -0,0 +1,411 @@
+"""
+Post-processing of main.py result directories (<model>_<strategy>/<category>/<case>/).
+
+From each case's Langfuse export (trace.json) three files are derived:
+  result.json                 final answer with `top_3_predictions`
+  llm_traj.json               tool calls in the expert-trajectory format (statistics + diagnostic_trace)
+  llm_trace_evaluation.json   {"step": [...]} labels in the metadata.json `process` format
+
+Every stage records the fingerprint (size, mtime, sha1) of its input in
+<root>/.pipeline_state.json, so repeated runs only reprocess new or changed cases.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from tools.implement import BOUTIQUE, normalize_resource_type
+from tools.store import PARALLEL_TOOL, TOOL_NAMES, parse_expert_call, split_parallel_observation
+
+STATE_FILE = ".pipeline_state.json"
+TRACE_FILE = "trace.json"
+RESULT_FILE = "result.json"
+TRAJ_FILE = "llm_traj.json"
+EVAL_FILE = "llm_trace_evaluation.json"
+
+_TOOL_NAME_RE = re.compile(r"tool_name='(\w+)'")
+# Outputs that mean the action itself was invalid (bad tool, bad arguments, framework error)
+_INVALID_OUTPUT_PREFIXES = ("Error:", "An unexpected error occurred")
+_INVALID_OUTPUT_MARKERS = (
+    "I encountered an error while trying to use the tool",
+    "don't exist",
+    "is not a valid key, value dictionary",
+    "Arguments validation failed",
+)
+
+
+# ---------- fingerprints and pipeline state ----------
+
+def file_fingerprint(path: str, previous: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    size/mtime/sha1 of a file. The hash is only recomputed when size or mtime
+    differ from `previous`, so unchanged files cost one stat().
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        return previous
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1.hexdigest()}
+
+
+def load_state(root_dir: str) -> Dict[str, Any]:
+    path = os.path.join(root_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        # A corrupt manifest only costs a full reprocess
+        return {}
+
+
+def save_state(root_dir: str, state: Dict[str, Any]):
+    path = os.path.join(root_dir, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path: str, data: Any):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _case_dirs(root_dir: str) -> List[str]:
+    if not os.path.isdir(root_dir):
+        return []
+    return sorted(d for d in os.listdir(root_dir) if os.path.isdir(os.path.join(root_dir, d)))
+
+
+# ---------- trace parsing ----------
+
+@functools.lru_cache(maxsize=16)
+def _load_trace_cached(path: str, size: int, mtime_ns: int) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_trace(path: str) -> Dict[str, Any]:
+    # The result and trajectory stages read the same trace; parse it once per version
+    stat = os.stat(path)
+    return _load_trace_cached(path, stat.st_size, stat.st_mtime_ns)
+
+
+def _field(obj: Dict[str, Any], *names: str, default=None):
+    # Langfuse exports use camelCase (by_alias) or snake_case depending on the client version
+    for name in names:
+        if name in obj and obj[name] is not None:
+            return obj[name]
+    return default
+
+
+def _maybe_json(value: Any) -> Any:
+    if isinstance(value, str) and value[:1] in "{[":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _observations(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    observations = trace.get("observations") or []
+    return sorted(observations, key=lambda o: str(_field(o, "startTime", "start_time", default="")))
+
+
+def _format_calling(tool_name: str, args: Dict[str, Any]) -> str:
+    """Render a call like the expert trajectories: tool_name='X' arguments={key: 'value'}."""
+    rendered = ", ".join(f"{key}: {value!r}" for key, value in args.items())
+    return f"tool_name='{tool_name}' arguments={{{rendered}}}"
+
+
+def _tool_step(observation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Tool call recorded by an observation, or None if it is not a tool call."""
+    name = observation.get("name") or ""
+    metadata = observation.get("metadata") or {}
+    attributes = metadata.get("attributes", metadata) if isinstance(metadata, dict) else {}
+    tool_input = _maybe_json(observation.get("input"))
+    output = _maybe_json(observation.get("output"))
+
+    calling = None
+    if isinstance(tool_input, dict) and isinstance(tool_input.get("calling"), str):
+        calling = tool_input["calling"]
+    elif isinstance(tool_input, str) and tool_input.startswith("tool_name="):
+        calling = tool_input
+
+    tool_name = attributes.get("tool.name") if isinstance(attributes, dict) else None
+    if calling:
+        match = _TOOL_NAME_RE.search(calling)
+        tool_name = tool_name or (match.group(1) if match else None)
+    elif name in TOOL_NAMES or (tool_name and observation.get("type") in ("TOOL", "SPAN")):
+        tool_name = tool_name or name
+        args = tool_input.get("arguments", tool_input) if isinstance(tool_input, dict) else {}
+        calling = _format_calling(tool_name, args if isinstance(args, dict) else {})
+    if not tool_name or not calling:
+        return None
+    return {"tool_name": tool_name, "calling": calling, "output": output}
+
+
+def is_invalid_action(step: Dict[str, Any]) -> bool:
+    if step.get("tool_name") not in TOOL_NAMES:
+        return True
+    output = step.get("output")
+    if not isinstance(output, str):
+        return False
+    text = output.strip()
+    return text.startswith(_INVALID_OUTPUT_PREFIXES) or any(marker in text for marker in _INVALID_OUTPUT_MARKERS)
+
+
+def _expand_parallel(step: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The sub-calls of a RunToolsInParallel step, as if they had been made one by one."""
+    output = step.get("output")
+    sections = split_parallel_observation(output) if isinstance(output, str) else []
+    if not sections:
+        try:
+            _, args = parse_expert_call(step["calling"])
+            sections = [(call.get("tool_name", ""), call.get("arguments") or {}, output)
+                        for call in args.get("calls", [])]
+        except (ValueError, SyntaxError, AttributeError):
+            sections = []
+    if not sections:
+        return [step]
+    return [{"tool_name": tool_name, "calling": _format_calling(tool_name, args), "output": sub_output}
+            for tool_name, args, sub_output in sections]
+
+
+def extract_trajectory(trace: Dict[str, Any]) -> Dict[str, Any]:
+    steps = []
+    tool_observation_ids = set()
+    for observation in _observations(trace):
+        # A tool run nested under an already recorded tool span is the same call
+        if _field(observation, "parentObservationId", "parent_observation_id") in tool_observation_ids:
+            continue
+        step = _tool_step(observation)
+        if step:
+            steps.extend(_expand_parallel(step) if step["tool_name"] == PARALLEL_TOOL else [step])
+            tool_observation_ids.add(observation.get("id"))
+    valid = [step for step in steps if not is_invalid_action(step)]
+    return {
+        "statistics": {
+            "valid_tool_call_count": len(valid),
+            "total_trace_steps": len(steps),
+            "history_called_tool_names": [step["tool_name"] for step in steps],
+        },
+        "diagnostic_trace": steps,
+    }
+
+
+def _find_json_with(text: str, key: str) -> Optional[Dict[str, Any]]:
+    """Last JSON object in free text that contains `key` (handles ```json fences and prose)."""
+    decoder = json.JSONDecoder()
+    found = None
+    idx = text.find("{")
+    while idx != -1:
+        try:
+            obj, end = decoder.raw_decode(text, idx)
+        except ValueError:
+            idx = text.find("{", idx + 1)
+            continue
+        if isinstance(obj, dict) and key in obj:
+            found = obj
+        idx = text.find("{", end)
+    return found
+
+
+def extract_final_answer(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """The agent's final JSON answer; empty predictions when the run produced none."""
+    candidates = [trace.get("output")]
+    candidates += [o.get("output") for o in reversed(_observations(trace))]
+    for candidate in candidates:
+        candidate = _maybe_json(candidate)
+        if isinstance(candidate, dict):
+            if "top_3_predictions" in candidate:
+                return candidate
+            candidate = _field(candidate, "raw", "content", "value", default=candidate)
+        text = _as_text(candidate)
+        if "top_3_predictions" not in text:
+            continue
+        answer = _find_json_with(text, "top_3_predictions")
+        if answer is not None:
+            return answer
+    return {"top_3_predictions": []}
+
+
+def _service_of(name: Optional[str]) -> str:
+    # Pod and replica set names carry hash suffixes; the metadata labels use the service name
+    if not name:
+        return ""
+    for service in sorted(BOUTIQUE, key=len, reverse=True):
+        if name == service or name.startswith(service + "-"):
+            return service
+    return name
+
+
+def step_label(tool_name: str, args: Dict[str, Any]) -> str:
+    """Label of a tool call in the metadata.json `process` format, e.g. DescribeResource::pods::adservice."""
+    if tool_name == "GetResources":
+        resource_type = args.get("resource_type") or ""
+        return f"GetResources::{normalize_resource_type(resource_type) or resource_type}"
+    if tool_name == "DescribeResource":
+        resource_type = args.get("resource_type") or ""
+        return f"DescribeResource::{normalize_resource_type(resource_type) or resource_type}::{_service_of(args.get('name'))}"
+    if tool_name == "GetAppYAML":
+        return f"GetAppYAML::{args.get('app_name', '')}"
+    if tool_name in ("GetErrorLogs", "GetRecentLogs", "GetServiceDependencies", "GetServiceCallChains",
+                     "GetLogsInTimeRange"):
+        return f"{tool_name}::{args.get('service_name', '')}"
+    if tool_name == "CheckServiceConnectivity":
+        return f"CheckServiceConnectivity::{args.get('service_name', '')}::{args.get('port', '')}"
+    if tool_name == "CheckNodeServiceStatus":
+        return f"CheckNodeServiceStatus::{args.get('node_name', '')}::{args.get('service_name', '')}"
+    if tool_name == "SearchSnapshot":
+        return f"SearchSnapshot::{args.get('query', '')}"
+    return f"{tool_name}::"
+
+
+def trajectory_to_steps(trajectory: Dict[str, Any]) -> List[str]:
+    steps = []
+    for step in trajectory.get("diagnostic_trace", []):
+        if step.get("tool_name") not in TOOL_NAMES:
+            continue
+        try:
+            tool_name, args = parse_expert_call(step["calling"])
+        except (ValueError, SyntaxError):
+            tool_name, args = step["tool_name"], {}
+        steps.append(step_label(tool_name, args))
+    return steps
+
+
+# ---------- pipeline stages ----------
+
+def _stage_result(case_path: str):
+    trace = load_trace(os.path.join(case_path, TRACE_FILE))
+    _write_json(os.path.join(case_path, RESULT_FILE), extract_final_answer(trace))
+
+
+def _stage_traj(case_path: str):
+    trace = load_trace(os.path.join(case_path, TRACE_FILE))
+    _write_json(os.path.join(case_path, TRAJ_FILE), extract_trajectory(trace))
+
+
+def _stage_evaluation(case_path: str):
+    with open(os.path.join(case_path, TRAJ_FILE), "r", encoding="utf-8") as f:
+        trajectory = json.load(f)
+    _write_json(os.path.join(case_path, EVAL_FILE), {"step": trajectory_to_steps(trajectory)})
+
+
+# stage name -> (input file, output file, function)
+STAGES = {
+    "result": (TRACE_FILE, RESULT_FILE, _stage_result),
+    "traj": (TRACE_FILE, TRAJ_FILE, _stage_traj),
+    "evaluation": (TRAJ_FILE, EVAL_FILE, _stage_evaluation),
+}
+
+
+def run_stage(root_dir: str, stage: str, force: bool = False) -> Dict[str, int]:
+    """Run one stage over every case of a result directory, skipping unchanged inputs."""
+    input_name, output_name, fn = STAGES[stage]
+    state = load_state(root_dir)
+    counts = {"processed": 0, "skipped": 0, "failed": 0}
+    dirty = False
+    for case in _case_dirs(root_dir):
+        case_path = os.path.join(root_dir, case)
+        case_state = state.setdefault(case, {})
+        previous = case_state.get(stage)
+        fingerprint = file_fingerprint(os.path.join(case_path, input_name), previous)
+        if fingerprint is None:
+            continue
+        unchanged = previous is not None and previous.get("sha1") == fingerprint["sha1"]
+        if unchanged and not force and os.path.exists(os.path.join(case_path, output_name)):
+            if fingerprint is not previous:
+                # Touched but identical: remember the new mtime so the next run skips the hash
+                case_state[stage] = fingerprint
+                dirty = True
+            counts["skipped"] += 1
+            continue
+        try:
+            fn(case_path)
+        except Exception as e:
+            print(f"❌ {stage} failed for {case_path}: {e}")
+            counts["failed"] += 1
+            case_state.pop(stage, None)
+            dirty = True
+            continue
+        case_state[stage] = fingerprint
+        counts["processed"] += 1
+        dirty = True
+    if dirty:
+        save_state(root_dir, state)
+    return counts
+
+
+def extract_completed_info_to_result(root_dir: str, force: bool = False) -> Dict[str, int]:
+    """trace.json -> result.json for new or changed cases."""
+    return run_stage(root_dir, "result", force)
+
+
+def batch_extract_traces(root_dir: str, force: bool = False) -> Dict[str, int]:
+    """trace.json -> llm_traj.json for new or changed cases."""
+    return run_stage(root_dir, "traj", force)
+
+
+def process_llm_traj_to_evaluation(root_dir: str, force: bool = False) -> Dict[str, int]:
+    """llm_traj.json -> llm_trace_evaluation.json for new or changed cases."""
+    return run_stage(root_dir, "evaluation", force)
+
+
+def run_pipeline(root_dir: str, force: bool = False) -> Dict[str, Dict[str, int]]:
+    return {stage: run_stage(root_dir, stage, force) for stage in STAGES}
+
+
+# ---------- metrics helpers used by evaluation.py ----------
+
+def count_llm_output_abnormal(llm_traj_path: str) -> int:
+    """Invalid actions of a run: unknown tools, rejected arguments and framework tool errors."""
+    if not os.path.exists(llm_traj_path):
+        return 0
+    try:
+        with open(llm_traj_path, "r", encoding="utf-8") as f:
+            trajectory = json.load(f)
+    except (ValueError, OSError):
+        return 0
+    return sum(1 for step in trajectory.get("diagnostic_trace", []) if is_invalid_action(step))
+
+
+def calculate_redundancy_rate(llm_trace_evaluation_path: str) -> float:
+    """Share of steps that repeat an earlier step."""
+    with open(llm_trace_evaluation_path, "r", encoding="utf-8") as f:
+        steps = json.load(f).get("step", [])
+    if not steps:
+        return 0.0
+    return (len(steps) - len(set(steps))) / len(steps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post-process a Cloud-OpsBench result directory")
+    parser.add_argument("root_dir", help="Result directory of one category, e.g. <workspace>/<model>_<strategy>/startup")
+    parser.add_argument("--force", action="store_true", help="Reprocess every case")
+    cli_args = parser.parse_args()
+    for stage_name, stage_counts in run_pipeline(cli_args.root_dir, cli_args.force).items():
+        print(f"{stage_name}: {stage_counts}")